@@ -0,0 +1,81 @@
+"""Precomputed month x category spending aggregates ("cube") for the dashboard.
+
+Each account keeps a small table of debit sum and count per (month, category),
+built at ingest and adjusted when re-classification moves rows. Dashboard
+metrics and charts read from it instead of re-grouping the raw transactions.
+"""
+
+import datetime
+
+import pandas as pd
+
+CUBE_KEYS = ["month_order", "category"]
+
+
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate spending rows (debit > 0) into month_order x category sums and counts.
+
+    Frames with an ``account`` column (the combined view) keep it as an extra key.
+    """
+    spending = df[df["debit"] > 0]
+    keys = [
+        spending["date"].dt.to_period("M").astype(str).rename("month_order"),
+        spending["category"].astype(str).rename("category"),
+    ]
+    if "account" in spending.columns:
+        keys.insert(0, spending["account"].astype(str).rename("account"))
+    # Sum in float64 even when the rows hold compact float32 amounts
+    cube = (
+        spending["debit"].astype("float64").groupby(keys, observed=True)
+        .agg(debit_sum="sum", count="size")
+        .reset_index()
+    )
+    cube["count"] = cube["count"].astype("int64")
+    return cube
+
+
+def merge_cubes(*cubes: pd.DataFrame) -> pd.DataFrame:
+    """Add cubes together cell by cell, dropping cells that end up empty."""
+    keys = [k for k in ["account"] + CUBE_KEYS if all(k in c.columns for c in cubes)]
+    merged = pd.concat(cubes, ignore_index=True).groupby(keys, observed=True, as_index=False)[["debit_sum", "count"]].sum()
+    return merged[merged["count"] > 0].reset_index(drop=True)
+
+
+def apply_category_moves(cube: pd.DataFrame, moved: pd.DataFrame, old_labels: pd.Series, new_labels: pd.Series) -> pd.DataFrame:
+    """Update a cube for rows whose category changed, without re-aggregating the account.
+
+    ``moved`` holds the affected transactions (date, debit); their contribution is
+    subtracted from the old category cells and added to the new ones.
+    """
+    removed = build_cube(moved.assign(category=old_labels.values))
+    added = build_cube(moved.assign(category=new_labels.values))
+    removed[["debit_sum", "count"]] *= -1
+    return merge_cubes(cube, removed, added)
+
+
+def _month_bounds(month_order: str) -> tuple[datetime.date, datetime.date]:
+    period = pd.Period(month_order, freq="M")
+    return period.start_time.date(), period.end_time.date()
+
+
+def slice_cube(cube: pd.DataFrame, df: pd.DataFrame, start_date: datetime.date, end_date: datetime.date) -> pd.DataFrame:
+    """Cube cells for a date range.
+
+    Months entirely inside the range come straight from the cube; months the
+    range only partly covers are re-aggregated from the raw rows ``df``.
+    """
+    if cube.empty:
+        return cube
+    bounds = {m: _month_bounds(m) for m in cube["month_order"].unique()}
+    full = [m for m, (first, last) in bounds.items() if first >= start_date and last <= end_date]
+    partial = [m for m, (first, last) in bounds.items() if m not in full and first <= end_date and last >= start_date]
+
+    sliced = cube[cube["month_order"].isin(full)]
+    if partial:
+        edge = df[
+            (df["date"].dt.to_period("M").astype(str).isin(partial))
+            & (df["date"] >= pd.Timestamp(start_date))
+            & (df["date"] < pd.Timestamp(end_date) + pd.Timedelta(days=1))
+        ]
+        sliced = pd.concat([sliced, build_cube(edge)], ignore_index=True)
+    return sliced.reset_index(drop=True)
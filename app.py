@@ -1,20 +1,133 @@
+import time
+
+# Start of this script run, for the Performance panel's time to first paint
+SCRIPT_STARTED = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
 from pathlib import Path
 import datetime
+import hmac
 import json
+import logging
+import os
+import re
+import secrets
 import uuid
+from collections import Counter, deque
+
+from categories import AMEX_CATEGORIES, CATEGORIES, EXCLUDED_CATEGORIES
+from classifier import (
+    ClassificationCache,
+    categories_fingerprint,
+    classify_merchants,
+    classify_series,
+    get_matcher,
+    invalidate_matchers,
+    rows_affected_by_edit,
+    transaction_amounts,
+)
+from aggregates import apply_category_moves, build_cube, merge_cubes, slice_cube
+from database import DB_FILENAME, SessionDatabase
+from dedup import TRANSACTION_KEY_COLUMNS, DedupIndex, transaction_hashes
+from merchants import keyword_warning, merchant_ids
+from parsers import iter_td_credit_card_chunks, iter_td_csv_chunks, parse_amex_xls
+from perf import PerfRun
+from search import SearchIndex, get_search_index
+from storage import (
+    AccountDataWriter,
+    account_cube_path,
+    account_data_path,
+    account_date_range,
+    account_dedup_path,
+    account_partitions,
+    account_search_path,
+    append_combined_data,
+    combined_data_path,
+    data_version,
+    migrate_account_storage,
+    read_account_cube,
+    read_account_data,
+    read_combined_manifest,
+    read_partition,
+    read_partition_values,
+    remove_account_data,
+    remove_combined_data,
+    write_account_cube,
+    write_combined_data,
+    write_partition,
+)
 
 # Base data directory
 BASE_DATA_DIR = Path("data/sessions")
 
+# Session ids name directories under BASE_DATA_DIR
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Secret that lets a URL open a session created outside the browser (see issue_session_token)
+SESSION_TOKEN_FILENAME = "access_token"
+
+# "parquet" (default) serves the dashboard from the Parquet store in pandas;
+# "sqlite" pushes its queries down to a per-session SQLite database
+STORAGE_BACKEND = os.environ.get("SPEND_BREAKDOWN_BACKEND", "parquet")
+
+# Stage timings are logged as JSON lines at INFO; set SPEND_BREAKDOWN_LOG_LEVEL=INFO to print them.
+# The handler goes on the app's own logger so root logging is left to whoever imports this.
+_logger = logging.getLogger("spend_breakdown")
+_logger.setLevel(os.environ.get("SPEND_BREAKDOWN_LOG_LEVEL", "WARNING"))
+if not _logger.handlers:
+    _logger.addHandler(logging.StreamHandler())
+    _logger.propagate = False
+
+# Finished upload/render timings kept for the sidebar's Performance panel
+PERF_HISTORY = 10
+
+# Rows per page of the transaction table
+TRANSACTION_PAGE_SIZE = 100
+
+# Sortable transaction table columns (frame column -> header)
+TRANSACTION_COLUMNS = {
+    "date": "Date",
+    "account_name": "Account",
+    "description": "Description",
+    "debit": "Amount",
+    "category": "Category",
+}
+
+
+def issue_session_token(session_id: str) -> str:
+    """Return the token that opens ``session_id`` from a URL, creating it on first use."""
+    token_path = BASE_DATA_DIR / session_id / SESSION_TOKEN_FILENAME
+    if token_path.exists():
+        return token_path.read_text().strip()
+    token_path.parent.mkdir(parents=True, exist_ok=True)
+    token = secrets.token_urlsafe(24)
+    token_path.touch(mode=0o600)
+    token_path.write_text(token)
+    return token
+
+
+def session_token_valid(session_id: str, token: str) -> bool:
+    """Whether ``token`` is the access token issued for ``session_id``."""
+    token_path = BASE_DATA_DIR / session_id / SESSION_TOKEN_FILENAME
+    return bool(token) and token_path.exists() and hmac.compare_digest(token_path.read_text().strip(), token)
+
 
 def get_session_id() -> str:
-    """Get or create a unique session ID for the current user."""
+    """Get or create a unique session ID for the current user.
+
+    ``?session=<id>&token=<token>`` opens a session filled by the headless
+    pipeline in main.py, which issues the token. A session id alone is never
+    trusted, so sessions stay private to whoever holds their link.
+    """
     if "session_id" not in st.session_state:
-        st.session_state.session_id = str(uuid.uuid4())[:8]
+        requested = st.query_params.get("session", "")
+        token = st.query_params.get("token", "")
+        if SESSION_ID_PATTERN.fullmatch(requested) and session_token_valid(requested, token):
+            st.session_state.session_id = requested
+        else:
+            st.session_state.session_id = str(uuid.uuid4())[:8]
     return st.session_state.session_id
 
 
@@ -84,304 +197,6 @@ ACCOUNT_TYPES = {
 }
 
 
-# Category definitions for TD Chequing accounts
-TD_CHEQUING_CATEGORIES = {
-    "mortgage": [
-        "FN               MTG"
-    ],
-    "housing": [
-        "TSCC 1725", "ENERCARE HOME", "ENBRIDGE GAS", "TORONTO HYDRO",
-        "TOR-UTILITIES", "TOR UTILITY", "TORONTO UTILITY"
-    ],
-    "insurance": [
-        "BMO INSURANCE", "WAWANESA INS", "TRUPANION"
-    ],
-    "telecom": [
-        "TELUS COMM", "BELL"
-    ],
-    "credit_card_payment": [
-        "TD VISA PREAUTH", "AMEX BILL PYMT"
-    ],
-    "transfers": [
-        "TFR-TO", "TFR-FR"
-    ],
-    "loans": [
-        "SPL             LOAN", "SCOTIA PLAN", "BANK OF NOVA SC LOAN"
-    ],
-    "investments": [
-        "WS INVESTMENTS"
-    ],
-    "bank_fees": [
-        "MONTHLY ACCOUNT FEE", "WITHDRAWAL FEES", "OVERDRAFT INTEREST",
-        "PODP FEE", "SEND E-TFR FEE", "FX ATM W/D FEE"
-    ],
-    "e_transfers": [
-        "SEND E-TFR"
-    ],
-    "cash_withdrawal": [
-        "ATM W/D", "CASH WITHDRA", "FX ATM W/D"
-    ],
-    "income": [
-        "RIPPLING CANADA", "PEOPLE CENTER", "CANADA LIFE      INS",
-        "MOBILE DEPOSIT", "E-TRANSFER"
-    ],
-    "eating_out": [
-        "DARK HORSE"
-    ]
-}
-
-# Category definitions for TD Credit Card
-TD_CREDIT_CARD_CATEGORIES = {
-    "groceries": [
-        "METRO", "FARM BOY", "SUMMERHILL MARKET", "HEALTHY PLANET", 
-        "SHOPPERS DRUG MART", "CANADIAN TIRE", "STONES DRUG STORE"
-    ],
-    "beer_liquor": [
-        "CREEMORE SPRINGS", "LCBO", "BEER STORE", "SPIRIT OF YORK",
-        "OLD FLAME BREWING", "INDIE ALEHOUSE", "PONDVIEW ESTATE",
-        "MARYNISSEN", "BEERTOWN", "SAMARA BREWING", "MUDTOWN STATION",
-        "WINIFREDS ENGLISH PUB", "BOTTEGA VOLO"
-    ],
-    "coffee": [
-        "SUBTEXT COFFEE", "BALZAC", "TIM HORTONS", "PILOT COFFEE",
-        "SAM JAMES COFFEE", "CABIN COFFEE", "AMICIS COFFEE", "CAFE AROMA",
-        "FIRST SIP MATCHA", "FLYING KITE", "FROG PONDS CAFE", "CAFE LANDWER",
-        "NEON COMMISSARY"
-    ],
-    "transportation": [
-        "PRESTO", "VIA RAIL", "BIXI", "ALAMO CANADA", "TORONTO PARKING",
-        "UBER CANADA/UBERTRIP", "UBER* TRIP", "UBER *TRIP"
-    ],
-    "subscriptions": [
-        "RENDER.COM", "GOOGLE", "APPLE.COM/BILL", "NOTION LABS",
-        "OPENAI", "Amazon Web Services", "SHOPIFY", "1PASSWORD",
-        "GODADDY", "MEDIUM CORPORATION", "ABC*5028-ANYTIME FITNESS",
-        "BALANCE PROTECTION"
-    ],
-    "eating_out": [
-        "CHICAS CHICKEN", "PITA PIT", "BANK CAFE", "NODO RESTAURANT",
-        "CHUCKS ROADHOUSE", "SUBWAY", "A&W RESTAURANT", "LYNWOOD INN",
-        "FIVE FISHERMEN", "THE FREIGHT SHED", "CENTRAL TAPS",
-        "THONSON CATERING", "BROAD NOSH BAGELS", "LEVAIN", "STACKED PANCAKE",
-        "LA DIPERIE", "BIG CHILL ICE-CREAM", "CRAIG'S COOKIES", "AMADEUS PATISSERIE",
-        "DISTILLERY RESTAURANTS", "FRIENDLY SOCIETY", "OLIVE ET GOURMANDO",
-        "GASPAR PINCETTE", "MARRY ME MOCHI", "COWS CABLE", "FULL STOP",
-        "ROD, GUN &BARBERS", "SOMA CHOCOLATE"
-    ],
-    "entertainment": [
-        "CARL LAIDLAW ORCHARDS", "HAMILTON SPORTS GROUP", "FANFARE BOOKS",
-        "CAPE BRETON HIGHLANDS", "LIBRAIRIE BERTRAND", "BLUEJAYS5050",
-        "TIM HORTONS FIELD", "TMCANADA", "MARINE HERITAGE", "BRADSHAWS"
-    ],
-    "utilities": [
-        "BELL MOBILITY", "TORONTO RSD"
-    ],
-    "goods_gifts": [
-        "PROVINCE OF CAN", "DU/ER", "ARITZIA", "ROOTS", "AMZN", "Amazon.ca",
-        "PEACE COLLECTIVE", "MEJURI", "THELATESTSCOOP", "MAJEWELRY",
-        "KINDRED FOLK", "BIZJAK FARMS", "WYCHWOOD BARNS", "ROGERS' RANCH",
-        "HOUSE OF GOOD", "NOMA GALLERY", "GREAVES JAMS", "LADY LOU",
-        "GROHMANN KNIVES", "LAURASECORD", "ARTISANS CANADA", "CANADIAN PROTEIN",
-        "SEASON'S HOME DECOR", "A NATURAL HOME", "COMMUNITY", "VISTAPRINT"
-    ],
-    "ordering_in": [
-        "UBEREATS", "UBER* EATS", "UBER CANADA/UBEREATS", "DOORDASH", "UBER CANADA/UBERCASH"
-    ],
-    "donations": [
-        "CANADAHELPS", "DAILY BREAD", "SICKKIDS", "CRC_DON", "GOFNDME",
-        "LEGION POPPY", "SAL ARMY", "WIKIMEDIA", "AHOHP VET"
-    ]
-}
-
-# Categories to exclude from spending analysis (to avoid double counting)
-# - credit_card_payment: already tracked on the credit card
-# - transfers: internal money movement, not spending
-# - income: money coming in, not spending
-# - investments: savings/investments, not spending
-# - cash_withdrawal: cash itself isn't spending, what you buy with it is
-EXCLUDED_CATEGORIES = {
-    "credit_card_payment",
-    "transfers",
-    "income",
-    "investments",
-    "cash_withdrawal"
-}
-
-# Category definitions for Amex (from classify_transactions.py)
-AMEX_CATEGORIES = {
-    "pet": [
-        "PETSMART", "PET VALU", "SNIFFANY", "ANIMAL HOSPITAL", "GLOBAL PET",
-        "ROVER.COM", "WAG!", "PETBARN", "PET SUPPLIES PLUS", "PETCO",
-        "P U P P T O W N", "PUPPTOWN", "WOOFS & WAGS", "AHOHP VET",
-        "MOLLYWAGZ", "PASADENAHUMANE", "ASKAVETONLINE"
-    ],
-    "groceries": [
-        "METRO", "WHOLEFDS", "WHOLE FOODS", "FARM BOY", "LOBLAWS", "SOBEYS",
-        "CVS/PHARMACY", "SHOPPERS DRUG MART", "REXALL", "LONGOS", "PUSATERI",
-        "MCEWAN", "SUMMERHILL MARKET", "FIESTA FARMS", "HEALTHY PLANET",
-        "VICTORIA FARMERS", "CO-OP", "HELLOFRESH", "GOODFOOD", "CHEF'S PLATE",
-        "OAKRIDGES FINEST", "NATURE'S EMPORIUM", "BULK BARN", "T&T",
-        "THE SWEET POTATO", "EREWHON", "PAVILIONS", "TRADER JOE",
-        "RALPHS", "FRESHCO", "KENNEDY'S LAKESIDE"
-    ],
-    "beer_liquor": [
-        "FLYING MONKEYS", "LCBO", "BEER STORE", "WINE RACK", "CREEMORE",
-        "MILL STREET", "STEAM WHISTLE", "BELLWOODS BREWERY", "BEERTOWN",
-        "HENDERSON BREWING", "BLOOD BROTHERS", "LEFT FIELD BREWERY",
-        "AMSTERDAM BREWERY", "GODSPEED BREWERY", "HALO BREWERY",
-        "NICKEL 9 DISTILLERY", "SPIRIT OF YORK", "DISTILLERY"
-    ],
-    "coffee": [
-        "BLUE BOTTLE COFFEE", "STARBUCKS", "TIM HORTONS", "BALZAC",
-        "CAFE AROMA", "SUBTEXT COFFEE", "GROUND CENTRAL", "CAFE LANDWER",
-        "PILOT COFFEE", "SAM JAMES", "DARK HORSE", "ROOSTER COFFEE",
-        "JIMMY'S COFFEE", "MERCHANTS OF GREEN", "NEO COFFEE",
-        "HOLLIES COFFEE", "WEEKENDERS COFFEE", "CHOPCOFFEE",
-        "PROPELLER COFFEE", "URTH CAFFE", "ROOMS COFFEE", "STREAMER COFFEE"
-    ],
-    "eating_out": [
-        "HOLE IN THE WALL", "KINTON RAMEN", "THE OXLEY", "AZUCAR",
-        "BOOZEHOUNDS", "AHBA", "GREAT WHITE", "TB REST", "SOMA CHOCOLATE",
-        "BYBLOS", "LABORA", "GUSTO", "MONTECITO", "CAFE BOULUD",
-        "CANOE", "PAI", "MOMOFUKU", "MIKU", "ARDO", "PIANO PIANO",
-        "PLANTA", "JOSO", "HARBOUR 60", "BUCA", "CACTUS CLUB",
-        "EARLS", "JOEYS", "MILESTONES", "KELSEYS", "MOXIES",
-        "PICKLE BARREL", "JACK ASTOR", "KELSEY", "LONE STAR",
-        "EAST SIDE MARIO", "BOSTON PIZZA", "SWISS CHALET",
-        "WENDYS", "MCDONALDS", "BURGER KING", "HARVEYS", "POPEYES",
-        "CHIPOTLE", "FRESHII", "PANERA", "NANDOS", "REDS MIDTOWN",
-        "CIBO", "TERRONI", "FIGO", "PIZZERIA LIBRETTO", "PIZZAIOLO",
-        "JERSEY MIKE", "SUBWAY", "TST*", "THE SMITH", "CRAIG'S COOKIES",
-        "CHICK-FIL-A", "FIVE GUYS", "SHAKE SHACK", "IN-N-OUT",
-        "SWEETGREEN", "CAVA", "HALAL GUYS", "RAMEN", "SUSHI",
-        "TACOS", "BURRITO", "POKE", "SALAD", "DELI", "BAKERY",
-        "BISTRO", "GRILL", "PUB", "TAVERN",
-        "RESTAURANT", "KITCHEN", "EATERY", "DINER", "TRATTORIA",
-        "OSTERIA", "IZAKAYA", "CANTINA", "TAQUERIA",
-        "NOOK AND CRANNY", "FIONN MACCOOL", "THE BG", "ANNETTE FOOD MARKET",
-        "CHIANG MAI", "OLIVE ET GOURMANDO", "BEER HALL", "HENRYS BURGER",
-        "SEVEN ELEVEN", "CARL'S JR", "SOCAL VIBES", "HANARE",
-        "STATE & MAIN", "RUMBLE CRUMBLE", "PLAYACABANA",
-        "BUDAPEST BAKESHOP", "CHOCOSOL", "MENCHIES", "BASKIN ROBBINS",
-        "DAIRY QUEEN", "MARBLE SLAB", "SWEET JESUS", "BANG BANG",
-        "LA CARNITA", "WILBUR MEXICANA", "GUAC MEXI", "BURRITO BOYZ",
-        "FRESHSLICE", "PIZZA NOVA", "PIZZAVILLE", "DOMINOS", "PAPA JOHNS",
-        "SHOELESS JOE", "MARRY ME MOCHI", "SOMETHING BEAUTIFUL CAK",
-        "MR. PUFFS", "TST-OLD SCHOOL", "THE HEARTH", "LEAFF WAFFLES",
-        "GORDON RAMSAY", "BUTTER BAY", "U AND I ", "LS TOMMY CAFE",
-        "CHATIME", "UDON IROHA", "ARASHIYAMA OMOKAGE", "WAFLA KYOTO",
-        "MANY ROADS PURVEYORS", "ALBION GARDEN", "SHREE MAHANT"
-    ],
-    "goods_gifts": [
-        "BEST BUY", "APPLE STORE", "AMAZON", "INDIGO", "CHAPTERS",
-        "WINNERS", "HOMESENSE", "MARSHALLS", "COSTCO", "WALMART",
-        "IKEA", "CB2", "CRATE AND BARREL", "WEST ELM", "POTTERY BARN",
-        "SEPHORA", "HUDSON BAY", "NORDSTROM", "HOLT RENFREW",
-        "UNIQLO", "ZARA", "H&M", "GAP", "BANANA REPUBLIC", "LULULEMON",
-        "NIKE", "ADIDAS", "FOOT LOCKER", "SPORT CHEK", "ROOTS",
-        "ARITZIA", "CLUB MONACO", "J CREW", "FRANK AND OAK",
-        "PUZZLENERDS", "MAISONETTE", "TOKYUPLAZA", "HOME DEPOT",
-        "DISNEY STORE", "LUSH", "KUROCHIKU", "SHIBUYA TSUTAYA", "KACTO",
-        "OLD NAVY", "VISTAPRINT", "ONEQUINCE", "QUINCE", "RUDSAK",
-        "SIMONS", "SAIL", "MEC", "RUNNING ROOM", "DECATHLON",
-        "DOLLARAMA", "CANADIAN TIRE", "RONA", "LOWES", "STAPLES",
-        "MUJI", "MINISO", "DAISO", "HALLMARK", "PAPYRUS",
-        "MICHAELS", "JOANN", "HOBBY LOBBY", "AMERICAN EAGLE", "ABERCROMBIE",
-        "URBAN OUTFITTERS", "ANTHROPOLOGIE", "FREE PEOPLE",
-        "OLDNAVY.COM", "WWW.SPORTCHEK", "SEA HOUSE", "ETSY",
-        "SHE SELLS SANCTUARY", "LA VIE EN ROSE",
-        "ARDENE", "DYNAMITE", "GARAGE", "REITMANS", "MADEWELL",
-        "WALKING ON A CLOUD", "ANTHRO CA", "URBANOUTFITTERSCA",
-        "WWW.MARKS.COM", "CARIBOU GIFTS", "NIKO AND TOKYO",
-        "MARUI STORES", "TARGET", "ITX CANADA"
-    ],
-    "transportation": [
-        "UBER", "LYFT", "PRESTO", "TTC", "GO TRANSIT", "VIA RAIL",
-        "PARKING", "ESSO", "SHELL", "PETRO", "PIONEER", "CANADIAN TIRE GAS",
-        "CURB SERVICE", "TAXI", "CAB", "SILVER DART", "IRVING", "CIRCLE K",
-        "KOPIKALYAN", "JRPLUS", "JR PLUS", "TRAIN"
-    ],
-    "travel": [
-        "HANEDA AIRPORT", "AIRPORT", "DEL MARCOS HOTEL", "HOTEL", "MOTEL",
-        "AIRBNB", "HOSTEL", "INN", "RESORT",
-        "KYOTO ENGINE", "WA FUJITATE", "YASUDASENKEIDO",
-        "DLR ", "DISNEYLAND", "DISNEY CALIFORNIA", "COOKIE DOUGH LIGHTFUL",
-        "TONGA HUT", "OUT WEST TRADING", "LITTLE LUNCH COFFEE",
-        "EXPEDIA", "S AND R MEDALLION",
-        "GO APP RIDE", "LS TRAVEL RETAIL", "PORTER AIRLINES",
-        "SUICA", "CNP POINT THE WAY", "MOBILE ICOCA", "JRC SMART EX",
-        "WDW TICKETS", "WDW CONNECTIONS", "ALIPAY", "FUELROD", "MAISONCO"
-    ],
-    "entertainment": [
-        "CINEPLEX", "SCOTIABANK THEATRE", "TIFF", "TICKETMASTER",
-        "STUBHUB", "VIVID SEATS", "SEATGEEK", "MUSEUM", "GALLERY",
-        "AQUARIUM", "ZOO", "CN TOWER", "RIPLEYS", "COSMOPOL", "SUPERFRICO",
-        "NIAGARA-ON-THE-LAKE", "NIAGARA ON THE", "WONDERLAND", "MARINELAND",
-        "ESCAPE ROOM", "AXE THROWING", "BOWLING", "GOLF",
-        "PARK MGM", "MAIKOYA", "DIAMONDDAY"
-    ],
-    "subscriptions": [
-        "NETFLIX", "SPOTIFY", "APPLE.COM", "GOOGLE", "AMAZON PRIME",
-        "DISNEY PLUS", "CRAVE", "HBO", "MEMBERSHIP FEE", "ANNUAL FEE",
-        "BELL MEDIA", "INTEREST"
-    ],
-    "donations": [
-        "HUMANE SOCIETY", "TORONTOHUMANESOCIETY", "CANADAHELPS", "DAILY BREAD",
-        "SICKKIDS", "RED CROSS", "SALVATION ARMY", "UNITED WAY", "WWF",
-        "GREENPEACE", "DOCTORS WITHOUT", "OXFAM", "GOFNDME", "GOFUNDME"
-    ],
-    "beauty_lifestyle": [
-        "PEDI N NAILS", "NAIL SALON", "NAILS", "WELL.CA", "SEPHORA", "SEHPORA",
-        "SHOP.SHOPPERSDRUGMART", "SHOPDRUGSMART", "SPA ", "SALON",
-        "HAIR", "BEAUTY", "MASSAGE", "FACIAL", "WAXING", "BROW",
-        "IHERB", "PRETTYCLEANSHOP"
-    ],
-    "home": [
-        "SHERWIN WILLIAMS", "JUST JUNK", "SINKS DIRECT", "BENJAMIN MOORE",
-        "DULUX", "HOME HARDWARE", "ACE HARDWARE", "PLUMBING", "ELECTRICAL",
-        "OBH REFILLERY", "WWW.PICTOREM", "WEDGE STUDIO"
-    ]
-}
-
-# Combine all category dictionaries into one unified CATEGORIES dict
-# Merge keywords from all sources for each category
-def _merge_categories(*category_dicts):
-    """Merge multiple category dictionaries, combining keywords for matching categories."""
-    merged = {}
-    for cat_dict in category_dicts:
-        for category, keywords in cat_dict.items():
-            if category not in merged:
-                merged[category] = []
-            # Add keywords, avoiding duplicates
-            for kw in keywords:
-                if kw not in merged[category]:
-                    merged[category].append(kw)
-    return merged
-
-# Order matters! Put ordering_in keywords before transportation to catch UberEats before Uber
-CATEGORIES = _merge_categories(TD_CREDIT_CARD_CATEGORIES, TD_CHEQUING_CATEGORIES, AMEX_CATEGORIES)
-
-# Reorder so ordering_in comes before transportation in the dict
-# (Python 3.7+ maintains dict insertion order)
-_ordered_categories = {}
-# First add ordering_in if it exists
-if "ordering_in" in CATEGORIES:
-    _ordered_categories["ordering_in"] = CATEGORIES["ordering_in"]
-# Then add all other categories
-for cat, keywords in CATEGORIES.items():
-    if cat != "ordering_in":
-        _ordered_categories[cat] = keywords
-CATEGORIES = _ordered_categories
-
-# Categories to exclude from spending analysis (to avoid double counting)
-EXCLUDED_CATEGORIES = {
-    "credit_card_payment",
-    "transfers",
-    "income",
-    "investments",
-    "cash_withdrawal"
-}
-
 def classify_with_keywords(description: str, categories: dict = None) -> str:
     """Classify a transaction based on keyword matching."""
     if categories is None:
@@ -391,15 +206,7 @@ def classify_with_keywords(description: str, categories: dict = None) -> str:
         except Exception:
             categories = CATEGORIES
     
-    description_upper = description.upper()
-    
-    for category, cat_info in categories.items():
-        keywords = cat_info.get("keywords", []) if isinstance(cat_info, dict) else cat_info
-        for keyword in keywords:
-            if keyword.upper() in description_upper:
-                return category
-    
-    return "other"
+    return get_matcher(categories).classify(description)
 
 
 def classify_transaction(description: str, categories: dict = None) -> str:
@@ -445,12 +252,7 @@ def classify_transaction(description: str, categories: dict = None) -> str:
     """Classify a transaction based on its description using keywords."""
     if categories is None:
         categories = AMEX_CATEGORIES
-    description_upper = description.upper()
-    for category, keywords in categories.items():
-        for keyword in keywords:
-            if keyword.upper() in description_upper:
-                return category
-    return "other"
+    return get_matcher(categories).classify(description)
 
 
 def load_user_accounts() -> dict:
@@ -468,6 +270,50 @@ def save_user_accounts(accounts: dict):
     accounts_file.parent.mkdir(parents=True, exist_ok=True)
     with open(accounts_file, "w") as f:
         json.dump(accounts, f, indent=2)
+    
+    db = get_session_database()
+    if db:
+        with db:
+            db.sync_accounts(accounts)
+    sync_session_database(account_sources(accounts, list(accounts.keys())))
+
+
+def session_database_path() -> str | None:
+    """Path of the session's SQLite database, or None when the Parquet backend is in use."""
+    if STORAGE_BACKEND != "sqlite":
+        return None
+    accounts_file, _, _ = get_session_paths()
+    return str(accounts_file.parent / DB_FILENAME)
+
+
+def get_session_database() -> SessionDatabase | None:
+    """Open the session's SQLite database, or None when the Parquet backend is in use."""
+    db_path = session_database_path()
+    return SessionDatabase(Path(db_path)) if db_path else None
+
+
+def sync_session_database(sources: tuple):
+    """SQLite backend: load partitions written since the last sync into the session database.
+
+    Runs after data is written and when the dashboard loads, never inside the
+    cached readers, which only query.
+    """
+    db = get_session_database()
+    if db:
+        with db:
+            db.sync_sources(sources)
+
+
+def record_perf_run(run: PerfRun):
+    """Keep a finished run for the Performance panel.
+
+    Runs are kept per kind ("dashboard", "upload") so frequent re-renders
+    don't push earlier uploads out of the latest PERF_HISTORY.
+    """
+    if "perf_runs" not in st.session_state:
+        st.session_state.perf_runs = {}
+    kind = run.name.split(":", 1)[0]
+    st.session_state.perf_runs.setdefault(kind, deque(maxlen=PERF_HISTORY)).append(run)
 
 
 def load_user_categories() -> dict:
@@ -488,286 +334,757 @@ def save_user_categories(categories: dict):
     categories_file.parent.mkdir(parents=True, exist_ok=True)
     with open(categories_file, "w") as f:
         json.dump(categories, f, indent=2)
+    # Edited definitions need a freshly compiled matcher
+    invalidate_matchers()
+    
+    db = get_session_database()
+    if db:
+        with db:
+            db.save_categories(categories)
 
 
 def get_active_categories() -> dict:
     """Get the active categories (user-customized or default)."""
     if "user_categories" not in st.session_state:
         st.session_state.user_categories = load_user_categories()
+        db = get_session_database()
+        if db:
+            with db:
+                # Compared by fingerprint: the defaults hold tuples, the database lists
+                if categories_fingerprint(db.load_categories()) != categories_fingerprint(st.session_state.user_categories):
+                    db.save_categories(st.session_state.user_categories)
     return st.session_state.user_categories
 
 
-def parse_amex_xls(uploaded_file) -> pd.DataFrame:
-    """Parse Amex XLS file and return cleaned DataFrame."""
-    # Read the XLS file
-    df = pd.read_excel(uploaded_file)
-    
-    # Find the header row (contains "Date" in first column)
-    header_row = None
-    header_values = None
-    for idx, row in df.iterrows():
-        if str(row.iloc[0]).strip() == "Date":
-            header_row = idx
-            header_values = [str(v).strip() for v in row.values]
-            break
-    
-    if header_row is None:
-        raise ValueError("Could not find header row with 'Date' column")
-    
-    # Find column indices dynamically (different Amex exports have different structures)
-    date_col = 0  # Always first
-    desc_col = header_values.index("Description") if "Description" in header_values else 2
-    
-    # Find Amount column - may be at different positions
-    amount_col = None
-    for i, h in enumerate(header_values):
-        if h == "Amount":
-            amount_col = i
-            break
-    if amount_col is None:
-        amount_col = 3  # Fallback
-    
-    # Re-read with correct header
-    uploaded_file.seek(0)
-    df = pd.read_excel(uploaded_file, skiprows=header_row + 1, header=None)
-    
-    # Extract columns dynamically
-    processed_df = pd.DataFrame({
-        "date": df.iloc[:, date_col],
-        "description": df.iloc[:, desc_col].astype(str),
-        "amount_str": df.iloc[:, amount_col].astype(str)
-    })
-    
-    # Parse dates
-    processed_df["date"] = pd.to_datetime(processed_df["date"], format="mixed", dayfirst=True, errors="coerce")
-    
-    # Parse amounts (remove $ and commas)
-    processed_df["debit"] = pd.to_numeric(
-        processed_df["amount_str"].str.replace(r'[$,]', '', regex=True),
-        errors="coerce"
-    ).abs()
-    
-    # Drop invalid rows
-    processed_df = processed_df.dropna(subset=["date", "description"])
-    processed_df = processed_df[processed_df["description"].str.len() > 0]
-    processed_df = processed_df[~processed_df["description"].str.lower().isin(["nan", "none", ""])]
-    
-    # Fill NaN amounts with 0
-    processed_df["debit"] = processed_df["debit"].fillna(0)
-    processed_df["credit"] = 0.0
-    
-    # Drop temporary column
-    processed_df = processed_df.drop(columns=["amount_str"])
-    
-    return processed_df
+def get_classification_cache() -> ClassificationCache:
+    """The session's persistent merchant -> category cache, read from disk once per session.
 
+    Callers save it once they are done (after an upload or a re-classify).
+    """
+    accounts_file, _, _ = get_session_paths()
+    path = accounts_file.parent / "classification_cache.json"
+    cache = st.session_state.get("classification_cache")
+    if cache is None or cache.path != path:
+        cache = ClassificationCache(path)
+        st.session_state.classification_cache = cache
+    return cache
 
-def parse_td_chequing_csv(uploaded_file) -> pd.DataFrame:
-    """Parse TD Chequing CSV file and return cleaned DataFrame."""
-    # TD Chequing CSVs have no header, columns are: date, description, debit, credit, balance
-    df = pd.read_csv(uploaded_file, header=None, names=["date", "description", "debit", "credit", "balance"])
-    
-    # Parse dates (format: YYYY-MM-DD)
-    df["date"] = pd.to_datetime(df["date"], format="mixed", errors="coerce")
-    
-    # Clean up description
-    df["description"] = df["description"].astype(str).str.strip()
-    
-    # Convert debit/credit to numeric
-    df["debit"] = pd.to_numeric(df["debit"], errors="coerce").fillna(0)
-    df["credit"] = pd.to_numeric(df["credit"], errors="coerce").fillna(0)
-    
-    # Drop invalid rows
-    df = df.dropna(subset=["date"])
-    df = df[df["description"].str.len() > 0]
-    df = df[~df["description"].str.lower().isin(["nan", "none", ""])]
-    
-    # Drop balance column
-    df = df.drop(columns=["balance"], errors="ignore")
-    
-    return df
 
+def classify_descriptions(descriptions: pd.Series, categories: dict = None, amounts=None, account_type: str = None) -> pd.Series:
+    """Classify a description column, only matching descriptions this session hasn't seen.
 
-def parse_td_credit_card_csvs(uploaded_files: list) -> pd.DataFrame:
-    """Parse multiple TD Credit Card CSV files, combine and deduplicate."""
-    all_dfs = []
-    
-    for uploaded_file in uploaded_files:
-        # TD Credit Card CSVs have no header, columns are: date, description, debit, credit, balance
-        # Date format is MM/DD/YYYY
-        df = pd.read_csv(uploaded_file, header=None, names=["date", "description", "debit", "credit", "balance"])
-        df["source_file"] = uploaded_file.name
-        all_dfs.append(df)
-    
-    if not all_dfs:
-        return pd.DataFrame()
+    ``amounts`` and ``account_type`` feed rules with amount or account conditions.
+    The session cache is updated but not saved (see get_classification_cache).
+    """
+    if categories is None:
+        categories = get_active_categories()
+    return classify_series(descriptions, categories, cache=get_classification_cache(), amounts=amounts, account_type=account_type)
+
+
+def category_rules_error(categories: dict) -> str | None:
+    """Why a category definition dict can't be compiled, or None if it can."""
+    try:
+        get_matcher(categories)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def _category_keyword_strings(categories: dict) -> set:
+    """Every keyword and word in a category definition dict, as written."""
+    keywords = set()
+    for cat_info in categories.values():
+        if not isinstance(cat_info, dict):
+            keywords.update(cat_info)
+            continue
+        keywords.update(cat_info.get("keywords", []))
+        for rule in cat_info.get("rules", []):
+            keywords.update(rule.get("keywords", []))
+            keywords.update(rule.get("words", []))
+    return keywords
+
+
+def category_keyword_warnings(old: dict, new: dict) -> list:
+    """Warnings for keywords added in ``new`` that won't match as written (see merchants.keyword_warning)."""
+    added = _category_keyword_strings(new) - _category_keyword_strings(old)
+    return [warning for keyword in sorted(added) if (warning := keyword_warning(keyword))]
+
+
+def save_category_snapshot(categories: dict) -> str:
+    """Remember a set of category definitions so later edits can be diffed against it.
+
+    Returns the definitions' fingerprint, which accounts record as the version
+    their stored categories were computed with.
+    """
+    fingerprint = categories_fingerprint(categories)
+    accounts_file, _, _ = get_session_paths()
+    snapshot_path = accounts_file.parent / "category_snapshots" / f"{fingerprint[:16]}.json"
+    if not snapshot_path.exists():
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(snapshot_path, "w") as f:
+            json.dump(categories, f, default=dict)
+    return fingerprint
+
+
+def load_category_snapshot(fingerprint: str) -> dict | None:
+    """Load category definitions saved by save_category_snapshot, if available."""
+    if not fingerprint:
+        return None
+    accounts_file, _, _ = get_session_paths()
+    snapshot_path = accounts_file.parent / "category_snapshots" / f"{fingerprint[:16]}.json"
+    if not snapshot_path.exists():
+        return None
+    try:
+        with open(snapshot_path, "r") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return None
+
+
+def reclassify_accounts(accounts: dict, categories: dict, progress_bar=None) -> dict:
+    """Re-classify stored transactions after a category edit.
+
+    Only rows whose result could change are re-matched (see rows_affected_by_edit),
+    and only partitions where a row actually moved are rewritten. Accounts without
+    a recorded category snapshot are fully re-classified. Returns a report with row
+    counts and the (old, new) category transitions.
+    """
+    fingerprint = save_category_snapshot(categories)
+    report = {"accounts": 0, "rows_checked": 0, "rows_total": 0, "rows_moved": 0, "transitions": Counter()}
+    
+    for idx, (account_key, config) in enumerate(list(accounts.items())):
+        if progress_bar:
+            progress_bar.progress(idx / max(len(accounts), 1), text=f"Re-classifying {config['name']}...")
+        
+        file_path = Path(config["file_path"])
+        partitions = account_partitions(file_path)
+        if not partitions:
+            continue
+        report["accounts"] += 1
+        old_categories = load_category_snapshot(config.get("categories_fingerprint"))
+        cube_path = account_cube_path(file_path)
+        cube = read_account_cube(cube_path) if cube_path.exists() else None
+        account_moved = False
+        
+        for partition in partitions:
+            df_part = read_partition(partition)
+            report["rows_total"] += len(df_part)
+            
+            if old_categories is None:
+                affected = pd.Series(True, index=df_part.index)
+            else:
+                affected = rows_affected_by_edit(df_part["description"], df_part["category"], old_categories, categories)
+            report["rows_checked"] += int(affected.sum())
+            if not affected.any():
+                continue
+            
+            old_labels = df_part.loc[affected, "category"].astype(str)
+            new_labels = classify_descriptions(
+                df_part.loc[affected, "description"], categories,
+                amounts=transaction_amounts(df_part.loc[affected]), account_type=config.get("account_type")
+            )
+            moved = old_labels != new_labels
+            if not moved.any():
+                continue
+            
+            report["rows_moved"] += int(moved.sum())
+            report["transitions"].update(zip(old_labels[moved], new_labels[moved]))
+            moved_rows = df_part.loc[moved.index[moved], ["date", "debit"]]
+            df_part["category"] = df_part["category"].astype(str)
+            df_part.loc[affected, "category"] = new_labels
+            write_partition(df_part, partition)
+            if cube is not None:
+                cube = apply_category_moves(cube, moved_rows, old_labels[moved], new_labels[moved])
+            account_moved = True
+        
+        if account_moved:
+            write_account_cube(cube if cube is not None else build_cube(read_account_data(file_path)), cube_path)
+        config["categories_fingerprint"] = fingerprint
     
-    # Combine all files
-    combined_df = pd.concat(all_dfs, ignore_index=True)
+    get_classification_cache().save()
+    save_user_accounts(accounts)
+    if report["rows_moved"]:
+        refresh_combined_data(accounts)
+    return report
+
+
+def make_account_key(account_name: str) -> str:
+    """Derive the storage key for an account name."""
+    account_key = account_name.lower().replace(" ", "_").replace("-", "_")
+    return "".join(c for c in account_key if c.isalnum() or c == "_")
+
+
+def store_account_chunks(chunks, output_path: Path, categories: dict, append: bool = False, cache: ClassificationCache = None,
+                         perf: PerfRun = None, status_text=None, account_type: str = None) -> tuple[int, pd.DataFrame, list[Path]]:
+    """Classify parsed chunks and stream them into the account storage at ``output_path``.
+
+    Each chunk is classified and written as it arrives, and the aggregate cube
+    is accumulated alongside, so only one chunk is held in memory at a time.
+    With ``append``, rows already stored are skipped and only the new ones are
+    written, as a new partition; otherwise the stored data is replaced.
+    ``account_type`` is checked by category rules scoped to account types. The
+    account's cube, dedup and search indexes are updated too. Returns the number of rows
+    stored, the cube of those rows, and the partition files written.
+    """
+    perf = perf or PerfRun("ingest")
+    dedup_path = account_dedup_path(output_path)
+    with perf.stage("load_dedup_index"):
+        if append and dedup_path.exists():
+            dedup_index = DedupIndex.load(dedup_path)
+        elif append:
+            # Accounts stored before dedup indexes existed: build it from their data once
+            dedup_index = DedupIndex(transaction_hashes(read_account_data(output_path), TRANSACTION_KEY_COLUMNS), path=dedup_path)
+        else:
+            dedup_index = DedupIndex(path=dedup_path)
+    chunk_cubes = []
+    parsed_count = 0
+    row_count = 0
+    stored_hashes = []
+    
+    with AccountDataWriter(output_path, append=append) as writer:
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            parsed_count += len(chunk)
+            with perf.stage("dedup", rows=len(chunk)):
+                hashes = transaction_hashes(chunk, TRANSACTION_KEY_COLUMNS)
+                if append:
+                    # Drop rows already stored; repeats within the new data are kept,
+                    # since the index only gains this upload's hashes after the loop
+                    is_new = ~dedup_index.contains(hashes)
+                    chunk, hashes = chunk[is_new], hashes[is_new]
+            if chunk.empty:
+                continue
+            with perf.stage("normalize_merchants", rows=len(chunk)):
+                merchants = merchant_ids(chunk["description"])
+            with perf.stage("classify", rows=len(chunk)):
+                chunk = chunk.assign(category=classify_merchants(
+                    merchants, categories, cache=cache, amounts=transaction_amounts(chunk), account_type=account_type
+                ))
+            with perf.stage("write_partitions", rows=len(chunk)):
+                writer.write(chunk)
+            stored_hashes.append(hashes)
+            with perf.stage("build_cube", rows=len(chunk)):
+                chunk_cubes.append(build_cube(chunk))
+            row_count += len(chunk)
+            if status_text:
+                status_text.text(f"Classified {row_count:,} transactions...")
+        
+        if parsed_count == 0:
+            raise ValueError("No valid transactions found in file")
+        with perf.stage("write_partitions"):
+            # Finishes the partition files and moves them into place
+            writer.close()
+    if stored_hashes:
+        dedup_index.add(np.concatenate(stored_hashes))
+    with perf.stage("build_cube"):
+        # Chunk cubes overlap in months, so they are combined once rather than per chunk
+        cube = merge_cubes(*chunk_cubes) if chunk_cubes else None
+    
+    if cache is not None:
+        cache.save()
+    if row_count == 0:
+        # Everything in the upload was already stored
+        return 0, cube, []
+    
+    cube_path = account_cube_path(output_path)
+    with perf.stage("write_cube"):
+        if append and cube_path.exists():
+            write_account_cube(merge_cubes(read_account_cube(cube_path), cube), cube_path)
+        elif append:
+            write_account_cube(build_cube(read_account_data(output_path)), cube_path)
+        else:
+            write_account_cube(cube, cube_path)
+    with perf.stage("write_dedup_index"):
+        dedup_index.save()
+    search_path = account_search_path(output_path)
+    with perf.stage("index_descriptions"):
+        # Indexed after the write from the stored distinct descriptions, so the
+        # index doesn't grow alongside the chunks being ingested
+        if append and search_path.exists():
+            search_index = SearchIndex.load(search_path)
+            search_index.add(read_partition_values(writer.partition_paths, "description"))
+        else:
+            # Full uploads, and appends to accounts stored before search indexes existed
+            search_index = SearchIndex(path=search_path)
+            search_index.add(read_partition_values(account_partitions(output_path), "description"))
+    with perf.stage("write_search_index"):
+        search_index.save()
     
-    # Parse dates (format: MM/DD/YYYY)
-    combined_df["date"] = pd.to_datetime(combined_df["date"], format="mixed", errors="coerce")
+    return row_count, cube, writer.partition_paths
+
+
+def account_config(existing: dict | None, account_name: str, account_type: str, original_filename: str,
+                   output_path: Path, fingerprint: str) -> dict:
+    """Account entry for user_accounts.json after an upload (``existing`` when appending to it)."""
+    if existing is None:
+        return {
+            "name": account_name,
+            "file_path": str(output_path),
+            "original_filename": original_filename,
+            "account_type": account_type,
+            "categories_fingerprint": fingerprint
+        }
+    config = dict(existing)
+    config["last_upload"] = original_filename
+    if config.get("categories_fingerprint") != fingerprint:
+        # Older partitions were classified with other definitions; the next
+        # re-classify has to check every row
+        config["categories_fingerprint"] = None
+    return config
+
+
+def ingest_chunks(chunks, account_name: str, account_type: str, original_filename: str, progress_bar=None, status_text=None, append: bool = False, perf: PerfRun = None) -> tuple[int, str]:
+    """Store parsed chunks as an account of this session (see store_account_chunks).
+
+    With ``append`` and an existing account, only new rows are added to it;
+    otherwise the account is created or replaced. Stage timings go to ``perf``
+    when given. Returns the number of stored (or appended) transactions and the
+    account key.
+    """
+    perf = perf or PerfRun("ingest")
+    account_key = make_account_key(account_name)
+    _, _, uploads_dir = get_session_paths()
+    output_path = account_data_path(uploads_dir, account_key)
     
-    # Clean up description
-    combined_df["description"] = combined_df["description"].astype(str).str.strip()
+    accounts = load_user_accounts()
+    existing = accounts.get(account_key)
+    append = append and existing is not None and Path(existing["file_path"]).exists()
+    if append:
+        output_path = Path(existing["file_path"])
+        combined_current = _combined_data_current(accounts)
+    
+    categories = get_active_categories()
+    row_count, cube, partition_paths = store_account_chunks(
+        chunks, output_path, categories, append=append, cache=get_classification_cache(),
+        perf=perf, status_text=status_text, account_type=account_type
+    )
+    if progress_bar:
+        progress_bar.progress(1.0, text="Done!")
+    if row_count == 0:
+        return 0, account_key
     
-    # Convert debit/credit to numeric
-    combined_df["debit"] = pd.to_numeric(combined_df["debit"], errors="coerce").fillna(0)
-    combined_df["credit"] = pd.to_numeric(combined_df["credit"], errors="coerce").fillna(0)
+    fingerprint = save_category_snapshot(categories)
+    accounts[account_key] = account_config(
+        existing if append else None, account_name, account_type, original_filename, output_path, fingerprint
+    )
+    save_user_accounts(accounts)
     
-    # Drop invalid rows
-    combined_df = combined_df.dropna(subset=["date"])
-    combined_df = combined_df[combined_df["description"].str.len() > 0]
-    combined_df = combined_df[~combined_df["description"].str.lower().isin(["nan", "none", ""])]
+    with perf.stage("write_combined"):
+        if append and combined_current:
+            sources = account_sources(accounts, list(accounts.keys()))
+            append_combined_data(combined_data_path(uploads_dir), account_key, partition_paths, cube, sources)
+        else:
+            refresh_combined_data(accounts)
     
-    # Deduplicate based on date + description + debit + credit
-    combined_df["dedup_key"] = (
-        combined_df["date"].astype(str) + "|" + 
-        combined_df["description"] + "|" + 
-        combined_df["debit"].astype(str) + "|" + 
-        combined_df["credit"].astype(str)
-    )
-    original_count = len(combined_df)
-    combined_df = combined_df.drop_duplicates(subset=["dedup_key"], keep="first")
-    dedup_count = original_count - len(combined_df)
+    return row_count, account_key
+
+
+def _progress_callback(progress_bar, label: str):
+    """Adapt a Streamlit progress bar to a ``(fraction, detail=None)`` callback (None without a bar)."""
+    if not progress_bar:
+        return None
     
-    # Drop helper columns
-    combined_df = combined_df.drop(columns=["balance", "source_file", "dedup_key"], errors="ignore")
+    def update(fraction: float, detail: str = None):
+        text = f"{label} ({fraction:.0%})" + (f" - {detail}" if detail else "")
+        progress_bar.progress(min(fraction, 1.0), text=text)
     
-    return combined_df
+    return update
 
 
-def process_uploaded_file(uploaded_file, account_name: str, account_type: str = "amex", progress_bar=None, status_text=None) -> tuple[pd.DataFrame, str]:
-    """Process uploaded file: parse, classify, and save."""
+def process_uploaded_file(uploaded_file, account_name: str, account_type: str = "amex", progress_bar=None, status_text=None, append: bool = False) -> tuple[int, str]:
+    """Process uploaded file: parse, classify, and save. Returns (transaction count, account key)."""
     
     # Update status
     if status_text:
         status_text.text("Parsing file...")
     
-    # Parse based on account type
-    if account_type == "amex":
-        df = parse_amex_xls(uploaded_file)
-    elif account_type == "td_chequing":
-        df = parse_td_chequing_csv(uploaded_file)
-    else:
-        raise ValueError(f"Unknown account type: {account_type}")
-    
-    if len(df) == 0:
-        raise ValueError("No valid transactions found in file")
-    
-    # Classify transactions with keywords
-    if status_text:
-        status_text.text(f"Found {len(df)} transactions. Classifying...")
-    
-    if progress_bar:
-        progress_bar.progress(0.5, text="Classifying transactions...")
-    
-    df["category"] = df["description"].apply(classify_with_keywords)
-    
-    if progress_bar:
-        progress_bar.progress(1.0, text="Done!")
-    
-    # Generate account key
-    account_key = account_name.lower().replace(" ", "_").replace("-", "_")
-    account_key = "".join(c for c in account_key if c.isalnum() or c == "_")
-    
-    # Save processed file to session-specific directory
-    _, _, uploads_dir = get_session_paths()
-    output_path = uploads_dir / f"{account_key}_classified.csv"
-    df.to_csv(output_path, index=False)
-    
-    # Save account config
-    accounts = load_user_accounts()
-    accounts[account_key] = {
-        "name": account_name,
-        "file_path": str(output_path),
-        "original_filename": uploaded_file.name,
-        "account_type": account_type
-    }
-    save_user_accounts(accounts)
-    
-    return df, account_key
+    perf = PerfRun(f"upload:{account_type}")
+    try:
+        # Parse based on account type; CSV exports are streamed in chunks,
+        # so their parse time is taken as each chunk is pulled
+        if account_type == "amex":
+            with perf.stage("parse_amex_xls") as timing:
+                df = parse_amex_xls(uploaded_file)
+                timing.rows += len(df)
+            chunks = [df]
+        elif account_type == "td_chequing":
+            chunks = perf.iter(
+                "parse_td_chequing_csv",
+                iter_td_csv_chunks(uploaded_file, progress=_progress_callback(progress_bar, "Processing"))
+            )
+        else:
+            raise ValueError(f"Unknown account type: {account_type}")
+        
+        return ingest_chunks(
+            chunks, account_name, account_type, uploaded_file.name, progress_bar, status_text,
+            append=append, perf=perf
+        )
+    finally:
+        record_perf_run(perf.finish())
 
 
-def process_td_credit_card_files(uploaded_files: list, account_name: str, progress_bar=None, status_text=None) -> tuple[pd.DataFrame, str]:
-    """Process multiple TD Credit Card CSV files: parse, combine, dedupe, classify, and save."""
+def process_td_credit_card_files(uploaded_files: list, account_name: str, progress_bar=None, status_text=None, append: bool = False) -> tuple[int, str]:
+    """Process multiple TD Credit Card CSV files: parse, dedupe, classify, and save in chunks."""
     
     if status_text:
         status_text.text(f"Parsing {len(uploaded_files)} files...")
     
-    # Parse and combine all files
-    df = parse_td_credit_card_csvs(uploaded_files)
-    
-    if len(df) == 0:
-        raise ValueError("No valid transactions found in files")
-    
-    # Classify transactions with keywords
-    if status_text:
-        status_text.text(f"Found {len(df)} transactions. Classifying...")
-    
-    if progress_bar:
-        progress_bar.progress(0.5, text="Classifying transactions...")
-    
-    df["category"] = df["description"].apply(classify_with_keywords)
-    
-    if progress_bar:
-        progress_bar.progress(1.0, text="Done!")
-    
-    # Generate account key
-    account_key = account_name.lower().replace(" ", "_").replace("-", "_")
-    account_key = "".join(c for c in account_key if c.isalnum() or c == "_")
-    
-    # Save processed file to session-specific directory
-    _, _, uploads_dir = get_session_paths()
-    output_path = uploads_dir / f"{account_key}_classified.csv"
-    df.to_csv(output_path, index=False)
-    
-    # Save account config
-    accounts = load_user_accounts()
-    accounts[account_key] = {
-        "name": account_name,
-        "file_path": str(output_path),
-        "original_filename": f"{len(uploaded_files)} CSV files",
-        "account_type": "td_credit_card"
-    }
-    save_user_accounts(accounts)
+    perf = PerfRun("upload:td_credit_card")
+    try:
+        chunks = perf.iter(
+            "parse_td_credit_card_csvs",
+            iter_td_credit_card_chunks(uploaded_files, progress=_progress_callback(progress_bar, "Processing"))
+        )
+        return ingest_chunks(
+            chunks, account_name, "td_credit_card", f"{len(uploaded_files)} CSV files", progress_bar, status_text,
+            append=append, perf=perf
+        )
+    finally:
+        record_perf_run(perf.finish())
+
+
+def account_sources(accounts: dict, account_keys: list) -> tuple:
+    """Describe accounts as hashable (key, file_path, name, version) tuples for cache keys.
+
+    The version changes whenever an account's data file is rewritten, so cached
+    entries for one account are invalidated without touching the others.
+    """
+    sources = []
+    for key in account_keys:
+        config = accounts.get(key)
+        if config is None:
+            continue
+        file_path = Path(config["file_path"])
+        if file_path.exists():
+            sources.append((key, str(file_path), config["name"], data_version(file_path)))
+    return tuple(sources)
+
+
+def month_key(month_order: str) -> int:
+    """Integer month key (YYYYMM) of a "YYYY-MM" month."""
+    return int(month_order.replace("-", ""))
+
+
+def month_lookup(month_keys) -> pd.DataFrame:
+    """Labels for integer month keys, one row per distinct month (indexed by key).
+
+    Columns: month_order ("2025-01", as used by the cube) and month_str ("Jan 2025").
+    """
+    keys = pd.Index(sorted(set(month_keys)), dtype="int64", name="month_key")
+    periods = pd.PeriodIndex.from_fields(year=(keys // 100).to_numpy(), month=(keys % 100).to_numpy(), freq="M")
+    return pd.DataFrame({"month_order": periods.strftime("%Y-%m"), "month_str": periods.strftime("%b %Y")}, index=keys)
+
+
+def _prepare_account_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast stored rows to the compact in-memory schema the dashboard works on.
+
+    Descriptions and categories are categorical, amounts are float32 (exact to
+    the cent below ~$83k; sums are taken in float64) and the month is a single
+    int32 YYYYMM key, labelled through month_lookup().
+    """
+    df = df.dropna(subset=["date"])
     
-    return df, account_key
+    df["month_key"] = (df["date"].dt.year * 100 + df["date"].dt.month).astype("int32")
+    df["description"] = df["description"].astype("category")
+    df["category"] = df["category"].astype("category")
+    df["debit"] = df["debit"].fillna(0).astype("float32")
+    df["credit"] = df["credit"].fillna(0).astype("float32")
+    return df
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """Bytes held by a frame, including the strings of its categories."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+# Full transaction frames are cached as shared resources: st.cache_data would
+# pickle a copy of each one per entry and unpickle it on every hit. Callers
+# must not modify them in place.
+@st.cache_resource(max_entries=16)
+def _load_account_frame(file_path: str, account_name: str, version: str,
+                        start_date: datetime.date = None, end_date: datetime.date = None) -> pd.DataFrame:
+    """Read and prepare one account's transactions (cached per data version and date range).
+
+    Only the month partitions overlapping the date range are read.
+    """
+    df = _prepare_account_frame(read_account_data(Path(file_path), start_date, end_date))
+    df["account_name"] = pd.Categorical.from_codes(np.zeros(len(df), dtype="int8"), categories=[account_name])
+    return df
+
+
+@st.cache_resource(max_entries=4)
+def _load_combined_frame(file_path: str, account_names: tuple, version: str,
+                         start_date: datetime.date = None, end_date: datetime.date = None) -> pd.DataFrame:
+    """Read the materialized combined dataset (cached per data version and date range)."""
+    df = _prepare_account_frame(read_account_data(Path(file_path), start_date, end_date))
+    df["account_name"] = df["account"].astype("category").map(dict(account_names)).astype("category")
+    return df
+
+
+@st.cache_data(max_entries=64)
+def _load_account_cube(file_path: str, version: str) -> pd.DataFrame:
+    """Read one account's aggregate cube (cached per data version), building it if missing."""
+    cube_path = account_cube_path(Path(file_path))
+    if cube_path.exists():
+        return read_account_cube(cube_path)
+    
+    # Accounts stored before cubes existed: build once and keep it
+    cube = build_cube(read_account_data(Path(file_path)))
+    write_account_cube(cube, cube_path)
+    return cube
 
 
-@st.cache_data
 def load_account_data(account_key: str) -> pd.DataFrame:
     """Load classified transaction data for an account."""
-    accounts = load_user_accounts()
-    if account_key not in accounts:
+    sources = account_sources(load_user_accounts(), [account_key])
+    if not sources:
         return pd.DataFrame()
-    
-    config = accounts[account_key]
-    file_path = Path(config["file_path"])
-    
-    if not file_path.exists():
+    _, file_path, name, version = sources[0]
+    return _load_account_frame(file_path, name, version)
+
+
+def account_memory_report(accounts: dict) -> pd.DataFrame:
+    """In-memory size of each account's full transaction frame (as cached by the dashboard)."""
+    rows = []
+    for _, file_path, name, version in account_sources(accounts, list(accounts.keys())):
+        df = _load_account_frame(file_path, name, version)
+        size = frame_memory(df)
+        rows.append({"Account": name, "Rows": len(df), "MB": round(size / 1e6, 2), "Bytes/row": round(size / max(len(df), 1))})
+    return pd.DataFrame(rows, columns=["Account", "Rows", "MB", "Bytes/row"])
+
+
+def load_account_cube(account_key: str) -> pd.DataFrame:
+    """Load an account's month x category aggregate cube."""
+    sources = account_sources(load_user_accounts(), [account_key])
+    if not sources:
         return pd.DataFrame()
+    _, file_path, _, version = sources[0]
+    return _load_account_cube(file_path, version)
+
+
+def load_sources_data(sources: tuple, start_date: datetime.date = None, end_date: datetime.date = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Transactions and cube for one or more accounts (multiple accounts get an ``account`` column).
+
+    With a date range, only the months overlapping it are loaded (edge months
+    whole); the cube always covers everything.
+    """
+    if len(sources) == 1:
+        _, file_path, name, version = sources[0]
+        df = _load_account_frame(file_path, name, version, start_date, end_date)
+        return df, _load_account_cube(file_path, version)
+    
+    # Several accounts are served from the materialized combined dataset; it is
+    # rebuilt here only if it's missing or was built from other account versions
+    data_path = combined_data_path(Path(sources[0][1]).parent)
+    if not _combined_data_matches(data_path, sources):
+        write_combined_data(sources, data_path)
+    
+    version = data_version(data_path)
+    account_names = tuple((key, name) for key, _, name, _ in sources)
+    df = _load_combined_frame(str(data_path), account_names, version, start_date, end_date)
+    return df, _load_account_cube(str(data_path), version)
+
+
+@st.cache_data(max_entries=64)
+def _load_account_date_range(file_path: str, version: str) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """First and last stored transaction date of an account (cached per data version)."""
+    return account_date_range(Path(file_path))
+
+
+def load_sources_date_range(sources: tuple) -> tuple[datetime.date, datetime.date]:
+    """Earliest and latest transaction date across accounts, without loading their data."""
+    ranges = [_load_account_date_range(file_path, version) for _, file_path, _, version in sources]
+    return min(first for first, _ in ranges).date(), max(last for _, last in ranges).date()
+
+
+def _combined_data_matches(data_path: Path, sources: tuple) -> bool:
+    """Whether the combined dataset at ``data_path`` was built from exactly these account versions."""
+    return (
+        data_path.exists()
+        and account_cube_path(data_path).exists()
+        and read_combined_manifest(data_path) == [[key, version] for key, _, _, version in sources]
+    )
+
+
+def _combined_data_current(accounts: dict) -> bool:
+    """Whether the session's combined dataset is up to date with all accounts."""
+    _, _, uploads_dir = get_session_paths()
+    sources = account_sources(accounts, list(accounts.keys()))
+    return len(sources) > 1 and _combined_data_matches(combined_data_path(uploads_dir), sources)
+
+
+def refresh_combined_data(accounts: dict):
+    """Rebuild the materialized combined dataset after accounts are added, changed or removed."""
+    if STORAGE_BACKEND == "sqlite":
+        # Combined queries run in SQL; load_sources_data rebuilds it if ever needed
+        return
+    _, _, uploads_dir = get_session_paths()
+    data_path = combined_data_path(uploads_dir)
+    sources = account_sources(accounts, list(accounts.keys()))
+    if len(sources) > 1:
+        write_combined_data(sources, data_path)
+    else:
+        remove_combined_data(data_path)
+
+
+@st.cache_resource(max_entries=8)
+def _load_range_data(sources: tuple, start_date: datetime.date, end_date: datetime.date) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Parquet backend: rows in a date range and the matching spending cube slice.
+
+    Cached by (accounts + versions, date range).
+    """
+    df, cube = load_sources_data(sources, start_date, end_date)
+    if df.empty:
+        return df, cube.iloc[0:0]
     
-    df = pd.read_csv(file_path)
-    df["date"] = pd.to_datetime(df["date"], format="mixed", dayfirst=True, errors="coerce")
-    df = df.dropna(subset=["date"])
+    # Aggregates for the date range come from the precomputed cube
+    spending_cube = slice_cube(cube, df, start_date, end_date)
+    spending_cube = spending_cube[~spending_cube["category"].isin(EXCLUDED_CATEGORIES)]
     
-    df["month"] = df["date"].dt.to_period("M")
-    df["month_str"] = df["date"].dt.strftime("%b %Y")
-    df["month_order"] = df["date"].dt.to_period("M").astype(str)
+    # Compare datetime64 values directly; the range covers all of end_date
+    df = df[(df["date"] >= pd.Timestamp(start_date)) & (df["date"] < pd.Timestamp(end_date) + pd.Timedelta(days=1))]
+    return df, spending_cube
+
+
+@st.cache_data(max_entries=32)
+def load_spending_view(sources: tuple, start_date: datetime.date, end_date: datetime.date,
+                       db_path: str = None) -> tuple[int, pd.DataFrame]:
+    """Date-filtered view of some accounts, cached by (accounts + versions, date range).
+
+    Returns the number of transactions in range and the spending cube for it:
+    debit sums and counts per month and category over spending rows (debit > 0,
+    excluded categories removed). With ``db_path`` (see session_database_path)
+    it is queried from the synced SQLite database instead.
+    """
+    if db_path:
+        with SessionDatabase(Path(db_path)) as db:
+            keys = [key for key, _, _, _ in sources]
+            return (
+                db.count_in_range(keys, start_date, end_date),
+                db.spending_cube(keys, start_date, end_date, EXCLUDED_CATEGORIES),
+            )
     
-    df["debit"] = df["debit"].fillna(0)
-    df["credit"] = df["credit"].fillna(0)
-    df["account_name"] = config["name"]
+    df, spending_cube = _load_range_data(sources, start_date, end_date)
+    return len(df), spending_cube
+
+
+@st.cache_resource(max_entries=8)
+def load_filtered_transactions(sources: tuple, start_date: datetime.date, end_date: datetime.date,
+                               categories: tuple, months: tuple, descriptions: tuple = None) -> pd.DataFrame:
+    """Spending rows for the transaction table, cached by (accounts, date range, filters).
+
+    ``months`` are integer month keys (YYYYMM, see month_key); ``descriptions``
+    (search results, see search_descriptions) limits rows to those descriptions.
+    Parquet backend only; the SQLite backend pages and sums in SQL.
+    """
+    df, _ = _load_range_data(sources, start_date, end_date)
+    # Only spending (debit > 0) and exclude non-spending categories (to avoid double counting)
+    filtered = df[
+        (df["debit"] > 0) & 
+        (~df["category"].isin(EXCLUDED_CATEGORIES))
+    ]
+    if categories:
+        filtered = filtered[filtered["category"].isin(categories)]
+    if months:
+        filtered = filtered[filtered["month_key"].isin(months)]
+    if descriptions is not None:
+        filtered = filtered[filtered["description"].isin(descriptions)]
+    return filtered
+
+
+@st.cache_data(max_entries=32)
+def _transaction_order(sources: tuple, start_date: datetime.date, end_date: datetime.date, categories: tuple,
+                       months: tuple, descriptions: tuple, sort_by: str, descending: bool) -> np.ndarray:
+    """Row positions of load_filtered_transactions() sorted on ``sort_by`` (ties newest first)."""
+    filtered = load_filtered_transactions(sources, start_date, end_date, categories, months, descriptions)
+    column = filtered[sort_by]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Sort labels alphabetically rather than in the order the categories were first seen
+        column = column.cat.set_categories(column.cat.categories.sort_values())
+    keys = pd.DataFrame({"key": column.to_numpy(), "date": filtered["date"].to_numpy()})
+    return keys.sort_values(["key", "date"], ascending=[not descending, False], kind="stable").index.to_numpy()
+
+
+@st.cache_data(max_entries=64)
+def load_transaction_page(sources: tuple, start_date: datetime.date, end_date: datetime.date, categories: tuple,
+                          months: tuple, descriptions: tuple, sort_by: str, descending: bool, page: int,
+                          db_path: str = None) -> pd.DataFrame:
+    """One page of the transaction table, sorted on a typed column (a TRANSACTION_COLUMNS key).
+
+    Only the page is returned, so formatting and display cost stays constant
+    however many transactions match. ``db_path`` is as in load_spending_view.
+    """
+    offset = page * TRANSACTION_PAGE_SIZE
+    if db_path:
+        with SessionDatabase(Path(db_path)) as db:
+            keys = [key for key, _, _, _ in sources]
+            month_orders = tuple(month_lookup(months)["month_order"]) if months else ()
+            return db.spending_transactions(
+                keys, start_date, end_date, EXCLUDED_CATEGORIES, categories, month_orders, descriptions,
+                order_by=sort_by, descending=descending, limit=TRANSACTION_PAGE_SIZE, offset=offset
+            )
     
-    return df
+    filtered = load_filtered_transactions(sources, start_date, end_date, categories, months, descriptions)
+    order = _transaction_order(sources, start_date, end_date, categories, months, descriptions, sort_by, descending)
+    return filtered.iloc[order[offset:offset + TRANSACTION_PAGE_SIZE]]
 
 
-def main():
+def spending_totals(spending_cube: pd.DataFrame, categories: tuple, months: tuple) -> tuple[int, float]:
+    """Number and sum of the spending transactions matching the table filters, from the cube."""
+    if categories:
+        spending_cube = spending_cube[spending_cube["category"].isin(categories)]
+    if months:
+        spending_cube = spending_cube[spending_cube["month_order"].isin(month_lookup(months)["month_order"])]
+    return int(spending_cube["count"].sum()), float(spending_cube["debit_sum"].sum())
+
+
+@st.cache_data(max_entries=32)
+def load_search_totals(sources: tuple, start_date: datetime.date, end_date: datetime.date,
+                       categories: tuple, months: tuple, descriptions: tuple, db_path: str = None) -> tuple[int, float]:
+    """Number and sum of the spending transactions matching a search (the cube has no description key)."""
+    if db_path:
+        with SessionDatabase(Path(db_path)) as db:
+            keys = [key for key, _, _, _ in sources]
+            month_orders = tuple(month_lookup(months)["month_order"]) if months else ()
+            return db.spending_summary(keys, start_date, end_date, EXCLUDED_CATEGORIES, categories, month_orders, descriptions)
+    
+    filtered = load_filtered_transactions(sources, start_date, end_date, categories, months, descriptions)
+    return len(filtered), float(filtered["debit"].astype("float64").sum())
+
+
+def load_search_index(file_path: str, version: str) -> SearchIndex:
+    """An account's description search index, kept loaded until its data version changes."""
+    data_path = Path(file_path)
+    return get_search_index(
+        account_search_path(data_path), version, lambda: read_partition_values(account_partitions(data_path), "description")
+    )
+
+
+def search_descriptions(sources: tuple, query: str) -> tuple:
+    """Descriptions in any of the accounts that match a search query (see SearchIndex)."""
+    matches = set()
+    for _, file_path, _, version in sources:
+        matches.update(load_search_index(file_path, version).search(query))
+    return tuple(sorted(matches))
+
+
+def migrate_legacy_accounts(accounts: dict) -> dict:
+    """One-time conversion of CSV and single-file accounts to partitioned Parquet storage."""
+    migrated = {key: migrate_account_storage(config) for key, config in accounts.items()}
+    if migrated != accounts:
+        save_user_accounts(migrated)
+    return migrated
+
+
+def render_dashboard(perf: PerfRun):
+    """Render the dashboard, timing each section as a stage of ``perf``."""
     st.title("💰 Spend Breakdown Dashboard")
+    perf.mark("first_paint")
     
     # Load existing accounts
-    accounts = load_user_accounts()
+    with perf.stage("load_accounts"):
+        accounts = migrate_legacy_accounts(load_user_accounts())
     
     # If no accounts exist, show prominent onboarding experience
     if not accounts:
@@ -843,14 +1160,14 @@ def main():
                             progress_bar = st.progress(0, text="Starting...")
                             
                             if onboard_account_type == "td_credit_card":
-                                df, account_key = process_td_credit_card_files(
+                                row_count, account_key = process_td_credit_card_files(
                                     onboard_files,
                                     onboard_account_name.strip(),
                                     progress_bar=progress_bar,
                                     status_text=status_text
                                 )
                             else:
-                                df, account_key = process_uploaded_file(
+                                row_count, account_key = process_uploaded_file(
                                     onboard_files[0],
                                     onboard_account_name.strip(),
                                     onboard_account_type,
@@ -860,8 +1177,7 @@ def main():
                             
                             progress_bar.progress(1.0, text="Complete!")
                             status_text.empty()
-                            st.success(f"✅ Added {len(df)} transactions!")
-                            st.cache_data.clear()
+                            st.success(f"✅ Added {row_count} transactions!")
                             st.rerun()
                         except Exception as e:
                             st.error(f"Error: {e}")
@@ -921,6 +1237,13 @@ def main():
                     suggested_name = uploaded_files[0].name.rsplit(".", 1)[0].replace("_", " ").replace("-", " ").title()
                 
                 account_name = st.text_input("Account Name", value=suggested_name)
+                append_to_account = False
+                if make_account_key(account_name.strip()) in accounts:
+                    append_to_account = st.checkbox(
+                        "Append to existing account",
+                        value=True,
+                        help="Add only transactions that aren't already stored. Unchecked, the account is replaced."
+                    )
                 
                 if st.button("🚀 Process & Add", type="primary", use_container_width=True):
                     if not account_name.strip():
@@ -932,25 +1255,26 @@ def main():
                             progress_bar = st.progress(0, text="Starting...")
                             
                             if account_type == "td_credit_card":
-                                df, account_key = process_td_credit_card_files(
+                                row_count, account_key = process_td_credit_card_files(
                                     uploaded_files,
                                     account_name.strip(),
                                     progress_bar=progress_bar,
-                                    status_text=status_text
+                                    status_text=status_text,
+                                    append=append_to_account
                                 )
                             else:
-                                df, account_key = process_uploaded_file(
+                                row_count, account_key = process_uploaded_file(
                                     uploaded_files[0],
                                     account_name.strip(),
                                     account_type,
                                     progress_bar=progress_bar,
-                                    status_text=status_text
+                                    status_text=status_text,
+                                    append=append_to_account
                                 )
                             
                             progress_bar.progress(1.0, text="Complete!")
                             status_text.empty()
-                            st.success(f"✅ Added {len(df)} transactions!")
-                            st.cache_data.clear()
+                            st.success(f"✅ Added {row_count} transactions!")
                             st.rerun()
                         except Exception as e:
                             st.error(f"Error: {e}")
@@ -972,31 +1296,29 @@ def main():
         )
     
     # Load data
-    if account_key == "combined_all":
-        dfs = []
-        for key in accounts.keys():
-            df = load_account_data(key)
-            if not df.empty:
-                df["account"] = key
-                dfs.append(df)
-        if dfs:
-            df = pd.concat(dfs, ignore_index=True)
-        else:
-            df = pd.DataFrame()
-    else:
-        df = load_account_data(account_key)
-    
-    if df.empty:
+    source_keys = list(accounts.keys()) if account_key == "combined_all" else [account_key]
+    sources = account_sources(accounts, source_keys)
+    if not sources:
         st.warning("No data available. Try uploading a file.")
         return
     
-    # Sidebar: Date filters and account management
-    with st.sidebar:
+    # SQLite backend: pick up data written since the last sync (e.g. by main.py);
+    # the cached readers below only query it
+    db_path = session_database_path()
+    with perf.stage("sync_database"):
+        sync_session_database(sources)
+    
+    # Only the date bounds are needed here; data is loaded for the selected range below
+    with perf.stage("date_range"):
+        min_date, max_date = load_sources_date_range(sources)
+    
+    # Sidebar: Date filters and account management. Uploads and re-classification
+    # requested here run after it, in their own stages, so this times only the widgets
+    upload_request = None
+    reclassify_request = None
+    with perf.stage("sidebar"), st.sidebar:
         st.header("📅 Dates")
         
-        min_date = df["date"].min().date()
-        max_date = df["date"].max().date()
-        
         # Default: Jan 2025 - Dec 2025
         default_start = max(datetime.date(2025, 1, 1), min_date)
         default_end = min(datetime.date(2025, 12, 31), max_date)
@@ -1016,12 +1338,12 @@ def main():
                 with col2:
                     if st.button("🗑️", key=f"del_{key}"):
                         try:
-                            Path(config["file_path"]).unlink(missing_ok=True)
+                            remove_account_data(Path(config["file_path"]))
                         except:
                             pass
                         del accounts[key]
                         save_user_accounts(accounts)
-                        st.cache_data.clear()
+                        refresh_combined_data(accounts)
                         st.rerun()
             
             st.markdown("")
@@ -1073,39 +1395,29 @@ def main():
                         suggested_name = sidebar_files[0].name.rsplit(".", 1)[0].replace("_", " ").replace("-", " ").title()
                     
                     sidebar_account_name = st.text_input("Account Name", value=suggested_name, key="sidebar_account_name")
+                    sidebar_append = False
+                    if make_account_key(sidebar_account_name.strip()) in accounts:
+                        sidebar_append = st.checkbox(
+                            "Append to existing account",
+                            value=True,
+                            key="sidebar_append",
+                            help="Add only transactions that aren't already stored. Unchecked, the account is replaced."
+                        )
                     
                     if st.button("🚀 Process & Add", type="primary", use_container_width=True, key="sidebar_process"):
                         if not sidebar_account_name.strip():
                             st.error("Please enter an account name")
                         else:
-                            try:
-                                # Create progress elements
-                                status_text = st.empty()
-                                progress_bar = st.progress(0, text="Starting...")
-                                
-                                if sidebar_account_type == "td_credit_card":
-                                    df_new, account_key = process_td_credit_card_files(
-                                        sidebar_files,
-                                        sidebar_account_name.strip(),
-                                        progress_bar=progress_bar,
-                                        status_text=status_text
-                                    )
-                                else:
-                                    df_new, account_key = process_uploaded_file(
-                                        sidebar_files[0],
-                                        sidebar_account_name.strip(),
-                                        sidebar_account_type,
-                                        progress_bar=progress_bar,
-                                        status_text=status_text
-                                    )
-                                
-                                progress_bar.progress(1.0, text="Complete!")
-                                status_text.empty()
-                                st.success(f"✅ Added {len(df_new)} transactions!")
-                                st.cache_data.clear()
-                                st.rerun()
-                            except Exception as e:
-                                st.error(f"Error: {e}")
+                            # Create progress elements; the upload is processed below the sidebar
+                            upload_request = {
+                                "account_type": sidebar_account_type,
+                                "files": sidebar_files,
+                                "name": sidebar_account_name.strip(),
+                                "append": sidebar_append,
+                                "status_text": st.empty(),
+                                "progress_bar": st.progress(0, text="Starting..."),
+                                "message": st.empty(),
+                            }
         
         st.markdown("---")
         
@@ -1121,7 +1433,7 @@ def main():
             current_categories = get_active_categories()
             
             # Convert to JSON string for editing
-            categories_json = json.dumps(current_categories, indent=2)
+            categories_json = json.dumps(current_categories, indent=2, default=dict)
             
             # Text area for editing (with fixed height)
             edited_json = st.text_area(
@@ -1140,14 +1452,18 @@ def main():
                         # Parse the edited JSON
                         new_categories = json.loads(edited_json)
                         
-                        # Validate structure (basic check)
+                        # Validate structure, then the rules by compiling them
                         if not isinstance(new_categories, dict):
                             st.error("Invalid format: must be a JSON object")
+                        elif (rule_error := category_rules_error(new_categories)):
+                            st.error(f"Invalid rule: {rule_error}")
                         else:
                             # Save to file and session state
                             save_user_categories(new_categories)
                             st.session_state.user_categories = new_categories
                             st.success("✅ Categories saved!")
+                            for warning in category_keyword_warnings(current_categories, new_categories):
+                                st.warning(warning)
                     except json.JSONDecodeError as e:
                         st.error(f"Invalid JSON: {e}")
             
@@ -1167,231 +1483,320 @@ def main():
             st.caption("Re-run keyword classification on all accounts using current category definitions")
             
             if st.button("🔄 Re-classify All", type="primary", use_container_width=True, key="reclassify_btn"):
-                try:
-                    progress_bar = st.progress(0, text="Starting re-classification...")
-                    accounts_to_process = list(accounts.items())
-                    total_accounts = len(accounts_to_process)
-                    active_cats = get_active_categories()
-                    
-                    for idx, (account_key, config) in enumerate(accounts_to_process):
-                        progress_bar.progress(
-                            (idx / total_accounts),
-                            text=f"Re-classifying {config['name']}..."
-                        )
-                        
-                        # Load the account data
-                        file_path = Path(config["file_path"])
-                        if file_path.exists():
-                            df_account = pd.read_csv(file_path, parse_dates=["date"])
-                            
-                            # Re-classify using keyword classification
-                            df_account["category"] = df_account["description"].apply(
-                                lambda x: classify_with_keywords(x, active_cats)
-                            )
-                            
-                            # Save back
-                            df_account.to_csv(file_path, index=False)
-                    
-                    progress_bar.progress(1.0, text="Complete!")
-                    st.success(f"✅ Re-classified {total_accounts} account(s)!")
-                    st.cache_data.clear()
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Error: {e}")
-    
-    # Filter by date
-    df = df[(df["date"].dt.date >= start_date) & (df["date"].dt.date <= end_date)]
+                reclassify_request = {
+                    "progress_bar": st.progress(0, text="Starting re-classification..."),
+                    "message": st.empty(),
+                }
+            
+            # Report from the last run (kept in session state across the rerun)
+            report = st.session_state.get("reclassify_report")
+            if report:
+                st.success(
+                    f"✅ Re-classified {report['accounts']} account(s): checked {report['rows_checked']:,} "
+                    f"of {report['rows_total']:,} rows, {report['rows_moved']:,} moved"
+                )
+                if report["transitions"]:
+                    moves = pd.DataFrame(
+                        [(old, new, count) for (old, new), count in report["transitions"].most_common()],
+                        columns=["From", "To", "Rows"]
+                    )
+                    st.dataframe(moves, hide_index=True, width='stretch')
+    
+    if upload_request:
+        with perf.stage("upload"):
+            progress_bar = upload_request["progress_bar"]
+            status_text = upload_request["status_text"]
+            try:
+                if upload_request["account_type"] == "td_credit_card":
+                    row_count, account_key = process_td_credit_card_files(
+                        upload_request["files"],
+                        upload_request["name"],
+                        progress_bar=progress_bar,
+                        status_text=status_text,
+                        append=upload_request["append"]
+                    )
+                else:
+                    row_count, account_key = process_uploaded_file(
+                        upload_request["files"][0],
+                        upload_request["name"],
+                        upload_request["account_type"],
+                        progress_bar=progress_bar,
+                        status_text=status_text,
+                        append=upload_request["append"]
+                    )
+                
+                progress_bar.progress(1.0, text="Complete!")
+                status_text.empty()
+                upload_request["message"].success(f"✅ Added {row_count} transactions!")
+                st.rerun()
+            except Exception as e:
+                upload_request["message"].error(f"Error: {e}")
+    
+    if reclassify_request:
+        with perf.stage("reclassify"):
+            progress_bar = reclassify_request["progress_bar"]
+            try:
+                report = reclassify_accounts(accounts, get_active_categories(), progress_bar=progress_bar)
+                progress_bar.progress(1.0, text="Complete!")
+                st.session_state.reclassify_report = report
+                st.rerun()
+            except Exception as e:
+                reclassify_request["message"].error(f"Error: {e}")
+
+    # Filter by date (cached per accounts/versions and date range)
+    with perf.stage("spending_view") as timing:
+        in_range_count, spending_cube = load_spending_view(sources, start_date, end_date, db_path)
+        timing.rows += in_range_count
     
-    if df.empty:
+    if in_range_count == 0:
         st.warning("No transactions in selected date range.")
         return
     
-    # Only spending (debit > 0) and exclude non-spending categories (to avoid double counting)
-    spending_df = df[
-        (df["debit"] > 0) & 
-        (~df["category"].isin(EXCLUDED_CATEGORIES))
-    ].copy()
-    
-    if spending_df.empty:
+    if spending_cube.empty:
         st.warning("No spending transactions found.")
         return
     
     st.markdown("---")
     
     # Summary metrics
-    total_spend = spending_df["debit"].sum()
-    num_transactions = len(spending_df)
-    avg_transaction = spending_df["debit"].mean()
-    num_months = spending_df["month"].nunique()
-    monthly_avg = total_spend / max(num_months, 1)
-    
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("Total Spending", f"${total_spend:,.2f}")
-    with col2:
-        st.metric("Monthly Avg", f"${monthly_avg:,.2f}")
-    with col3:
-        st.metric("Transactions", f"{num_transactions:,}")
-    with col4:
-        st.metric("Avg Transaction", f"${avg_transaction:.2f}")
+    with perf.stage("metrics"):
+        total_spend = spending_cube["debit_sum"].sum()
+        num_transactions = int(spending_cube["count"].sum())
+        avg_transaction = total_spend / num_transactions
+        num_months = spending_cube["month_order"].nunique()
+        monthly_avg = total_spend / max(num_months, 1)
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Total Spending", f"${total_spend:,.2f}")
+        with col2:
+            st.metric("Monthly Avg", f"${monthly_avg:,.2f}")
+        with col3:
+            st.metric("Transactions", f"{num_transactions:,}")
+        with col4:
+            st.metric("Avg Transaction", f"${avg_transaction:.2f}")
     
     st.markdown("---")
     
     # Charts
-    col_left, col_right = st.columns([2, 1])
-    
-    with col_left:
-        st.subheader("📈 Monthly Spending")
-        
-        monthly = spending_df.groupby("month_order")["debit"].sum().reset_index()
-        monthly = monthly.sort_values("month_order")
-        monthly["label"] = pd.to_datetime(monthly["month_order"]).dt.strftime("%b %Y")
-        
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=monthly["label"],
-            y=monthly["debit"],
-            mode="lines+markers",
-            line=dict(color="#00d4aa", width=3),
-            marker=dict(size=10),
-            fill="tozeroy",
-            fillcolor="rgba(0, 212, 170, 0.1)",
-            hovertemplate="<b>%{x}</b><br>$%{y:,.2f}<extra></extra>"
-        ))
-        
-        # Add average line
-        fig.add_hline(y=monthly_avg, line_dash="dash", line_color="#ff6b6b",
-                      annotation_text=f"Avg: ${monthly_avg:,.0f}")
-        
-        fig.update_layout(
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            font=dict(family="DM Sans", color="#8892b0"),
-            xaxis=dict(showgrid=False),
-            yaxis=dict(showgrid=True, gridcolor="rgba(255,255,255,0.05)", tickprefix="$"),
-            margin=dict(l=0, r=0, t=20, b=0),
-            height=350
-        )
-        st.plotly_chart(fig, width='stretch')
-    
-    with col_right:
-        st.subheader("🍩 By Category")
+    with perf.stage("charts"):
+        # Plotly is only imported once there is something to chart, which keeps
+        # it off the path to the first paint of a new server process
+        import plotly.graph_objects as go
         
-        cat_spend = spending_df.groupby("category")["debit"].sum().reset_index()
-        cat_spend = cat_spend.sort_values("debit", ascending=False)
+        col_left, col_right = st.columns([2, 1])
         
-        chart_colors = [COLORS.get(c, "#6b7280") for c in cat_spend["category"]]
-        
-        fig_donut = go.Figure(data=[go.Pie(
-            labels=cat_spend["category"].str.replace("_", " ").str.title(),
-            values=cat_spend["debit"],
-            hole=0.6,
-            marker=dict(colors=chart_colors),
-            textinfo="percent",
-            textfont=dict(color="white", size=11),
-            hovertemplate="<b>%{label}</b><br>$%{value:,.2f}<br>%{percent}<extra></extra>"
-        )])
+        with col_left:
+            st.subheader("📈 Monthly Spending")
+            
+            monthly = spending_cube.groupby("month_order")["debit_sum"].sum().rename("debit").reset_index()
+            monthly = monthly.sort_values("month_order")
+            monthly["label"] = pd.to_datetime(monthly["month_order"]).dt.strftime("%b %Y")
+            
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(
+                x=monthly["label"],
+                y=monthly["debit"],
+                mode="lines+markers",
+                line=dict(color="#00d4aa", width=3),
+                marker=dict(size=10),
+                fill="tozeroy",
+                fillcolor="rgba(0, 212, 170, 0.1)",
+                hovertemplate="<b>%{x}</b><br>$%{y:,.2f}<extra></extra>"
+            ))
+            
+            # Add average line
+            fig.add_hline(y=monthly_avg, line_dash="dash", line_color="#ff6b6b",
+                          annotation_text=f"Avg: ${monthly_avg:,.0f}")
+            
+            fig.update_layout(
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+                font=dict(family="DM Sans", color="#8892b0"),
+                xaxis=dict(showgrid=False),
+                yaxis=dict(showgrid=True, gridcolor="rgba(255,255,255,0.05)", tickprefix="$"),
+                margin=dict(l=0, r=0, t=20, b=0),
+                height=350
+            )
+            st.plotly_chart(fig, width='stretch')
         
-        fig_donut.update_layout(
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            font=dict(family="DM Sans", color="#8892b0"),
-            showlegend=True,
-            legend=dict(orientation="h", yanchor="bottom", y=-0.3, xanchor="center", x=0.5, font=dict(size=10)),
-            margin=dict(l=0, r=0, t=20, b=80),
-            height=350
-        )
-        st.plotly_chart(fig_donut, width='stretch')
+        with col_right:
+            st.subheader("🍩 By Category")
+            
+            cat_spend = spending_cube.groupby("category")["debit_sum"].sum().rename("debit").reset_index()
+            cat_spend = cat_spend.sort_values("debit", ascending=False)
+            
+            chart_colors = [COLORS.get(c, "#6b7280") for c in cat_spend["category"]]
+            
+            fig_donut = go.Figure(data=[go.Pie(
+                labels=cat_spend["category"].str.replace("_", " ").str.title(),
+                values=cat_spend["debit"],
+                hole=0.6,
+                marker=dict(colors=chart_colors),
+                textinfo="percent",
+                textfont=dict(color="white", size=11),
+                hovertemplate="<b>%{label}</b><br>$%{value:,.2f}<br>%{percent}<extra></extra>"
+            )])
+            
+            fig_donut.update_layout(
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+                font=dict(family="DM Sans", color="#8892b0"),
+                showlegend=True,
+                legend=dict(orientation="h", yanchor="bottom", y=-0.3, xanchor="center", x=0.5, font=dict(size=10)),
+                margin=dict(l=0, r=0, t=20, b=80),
+                height=350
+            )
+            st.plotly_chart(fig_donut, width='stretch')
     
     st.markdown("---")
     
     # Category trends
     st.subheader("📊 Category Trends")
     
-    categories_sorted = spending_df.groupby("category")["debit"].sum().sort_values(ascending=False).index.tolist()
-    
-    # Get all months in the date range for consistent x-axis
-    all_months = spending_df.sort_values("month_order")["month_order"].unique()
-    all_months_labels = [pd.to_datetime(m).strftime("%b") for m in all_months]
-    
-    cols_per_row = 4
-    # Show all categories (no limit)
-    for i in range(0, len(categories_sorted), cols_per_row):
-        cols = st.columns(cols_per_row)
-        for j, col in enumerate(cols):
-            if i + j < len(categories_sorted):
-                category = categories_sorted[i + j]
-                cat_data = spending_df[spending_df["category"] == category]
-                cat_monthly = cat_data.groupby("month_order")["debit"].sum()
-                
-                # Reindex to include all months with 0 for missing
-                cat_monthly = cat_monthly.reindex(all_months, fill_value=0).reset_index()
-                cat_monthly.columns = ["month_order", "debit"]
-                cat_monthly["label"] = [pd.to_datetime(m).strftime("%b") for m in cat_monthly["month_order"]]
-                
-                total = cat_data["debit"].sum()
-                cat_avg = total / num_months
-                color = COLORS.get(category, "#6b7280")
-                
-                with col:
-                    fig_cat = go.Figure()
-                    fig_cat.add_trace(go.Scatter(
-                        x=cat_monthly["label"],
-                        y=cat_monthly["debit"],
-                        mode="lines+markers",
-                        line=dict(color=color, width=2),
-                        marker=dict(size=6),
-                        fill="tozeroy",
-                        fillcolor=f"rgba({int(color[1:3], 16)}, {int(color[3:5], 16)}, {int(color[5:7], 16)}, 0.1)",
-                        hovertemplate="$%{y:,.0f}<extra></extra>"
-                    ))
-                    fig_cat.add_hline(y=cat_avg, line_dash="dot", line_color="#ff6b6b", line_width=1)
+    with perf.stage("category_trends"):
+        # One month x category pivot drives the whole grid; months missing for a
+        # category are filled with 0 so every chart shares the same x-axis
+        trend_pivot = spending_cube.pivot_table(
+            index="month_order", columns="category", values="debit_sum", aggfunc="sum", fill_value=0
+        ).sort_index()
+        category_totals = trend_pivot.sum().sort_values(ascending=False)
+        categories_sorted = category_totals.index.tolist()
+        month_labels = pd.to_datetime(trend_pivot.index).strftime("%b").tolist()
+        
+        cols_per_row = 4
+        # Show all categories (no limit)
+        for i in range(0, len(categories_sorted), cols_per_row):
+            cols = st.columns(cols_per_row)
+            for j, col in enumerate(cols):
+                if i + j < len(categories_sorted):
+                    category = categories_sorted[i + j]
+                    total = category_totals[category]
+                    cat_avg = total / num_months
+                    color = COLORS.get(category, "#6b7280")
                     
-                    fig_cat.update_layout(
-                        title=dict(
-                            text=f"{category.replace('_', ' ').title()}<br><span style='font-size:10px'>${total:,.0f} | ${cat_avg:,.0f}/mo</span>",
-                            font=dict(size=12, color=color),
-                            x=0.5
-                        ),
-                        paper_bgcolor="rgba(0,0,0,0)",
-                        plot_bgcolor="rgba(0,0,0,0)",
-                        font=dict(color="#8892b0"),
-                        xaxis=dict(showgrid=False, tickfont=dict(size=9)),
-                        yaxis=dict(showgrid=True, gridcolor="rgba(255,255,255,0.05)", tickprefix="$", tickfont=dict(size=9)),
-                        margin=dict(l=0, r=0, t=50, b=0),
-                        height=180
-                    )
-                    st.plotly_chart(fig_cat, width='stretch')
+                    with col:
+                        fig_cat = go.Figure()
+                        fig_cat.add_trace(go.Scatter(
+                            x=month_labels,
+                            y=trend_pivot[category],
+                            mode="lines+markers",
+                            line=dict(color=color, width=2),
+                            marker=dict(size=6),
+                            fill="tozeroy",
+                            fillcolor=f"rgba({int(color[1:3], 16)}, {int(color[3:5], 16)}, {int(color[5:7], 16)}, 0.1)",
+                            hovertemplate="$%{y:,.0f}<extra></extra>"
+                        ))
+                        fig_cat.add_hline(y=cat_avg, line_dash="dot", line_color="#ff6b6b", line_width=1)
+                        
+                        fig_cat.update_layout(
+                            title=dict(
+                                text=f"{category.replace('_', ' ').title()}<br><span style='font-size:10px'>${total:,.0f} | ${cat_avg:,.0f}/mo</span>",
+                                font=dict(size=12, color=color),
+                                x=0.5
+                            ),
+                            paper_bgcolor="rgba(0,0,0,0)",
+                            plot_bgcolor="rgba(0,0,0,0)",
+                            font=dict(color="#8892b0"),
+                            xaxis=dict(showgrid=False, tickfont=dict(size=9)),
+                            yaxis=dict(showgrid=True, gridcolor="rgba(255,255,255,0.05)", tickprefix="$", tickfont=dict(size=9)),
+                            margin=dict(l=0, r=0, t=50, b=0),
+                            height=180
+                        )
+                        st.plotly_chart(fig_cat, width='stretch')
     
     st.markdown("---")
     
     # Transaction table
     st.subheader("🔍 Transactions")
     
-    col_f1, col_f2 = st.columns(2)
-    with col_f1:
-        sel_cats = st.multiselect("Filter Category", sorted(spending_df["category"].unique()))
-    with col_f2:
-        months = spending_df.sort_values("month_order")["month_str"].unique().tolist()
-        sel_months = st.multiselect("Filter Month", months)
-    
-    filtered = spending_df.copy()
-    if sel_cats:
-        filtered = filtered[filtered["category"].isin(sel_cats)]
-    if sel_months:
-        filtered = filtered[filtered["month_str"].isin(sel_months)]
-    
-    display_cols = ["date", "description", "debit", "category"]
-    if account_key == "combined_all":
-        display_cols.insert(1, "account_name")
-    
-    display_df = filtered[display_cols].copy()
-    display_df["date"] = display_df["date"].dt.strftime("%Y-%m-%d")
-    display_df = display_df.sort_values("date", ascending=False)
-    display_df.columns = ["Date", "Account", "Description", "Amount", "Category"] if account_key == "combined_all" else ["Date", "Description", "Amount", "Category"]
+    with perf.stage("transactions") as timing:
+        query = st.text_input(
+            "Search Descriptions", placeholder="e.g. uber, tim hortons, amzn*",
+            help="Every word has to match: 3+ characters anywhere in the description, or the start of a word with a trailing *"
+        )
+        col_f1, col_f2 = st.columns(2)
+        with col_f1:
+            sel_cats = st.multiselect("Filter Category", sorted(spending_cube["category"].unique()))
+        with col_f2:
+            months = month_lookup(month_key(m) for m in spending_cube["month_order"].unique())
+            sel_months = st.multiselect("Filter Month", list(months.index), format_func=months["month_str"].get)
+        
+        # Count and total come from the cube; only the visible page is loaded.
+        # A search is answered from the accounts' description indexes instead of
+        # scanning rows, and its totals are summed over the matching rows.
+        descriptions = search_descriptions(sources, query) if query.strip() else None
+        if descriptions is None:
+            num_matching, total_matching = spending_totals(spending_cube, tuple(sel_cats), tuple(sel_months))
+        else:
+            num_matching, total_matching = load_search_totals(
+                sources, start_date, end_date, tuple(sel_cats), tuple(sel_months), descriptions, db_path
+            )
+        num_pages = max(1, -(-num_matching // TRANSACTION_PAGE_SIZE))
+        
+        columns = dict(TRANSACTION_COLUMNS)
+        if account_key != "combined_all":
+            del columns["account_name"]
+        
+        col_s1, col_s2, col_s3 = st.columns(3)
+        with col_s1:
+            sort_by = st.selectbox("Sort By", list(columns), format_func=columns.get)
+        with col_s2:
+            descending = st.selectbox("Order", [True, False], format_func=lambda d: "Descending" if d else "Ascending")
+        with col_s3:
+            # The label changes with the page count, which resets the page when the filters do
+            page = st.number_input(f"Page (of {num_pages})", min_value=1, max_value=num_pages, value=1, step=1)
+        
+        page_df = load_transaction_page(
+            sources, start_date, end_date, tuple(sel_cats), tuple(sel_months), descriptions, sort_by, descending, int(page) - 1,
+            db_path
+        )
+        timing.rows += len(page_df)
+        
+        display_df = page_df[list(columns)].copy()
+        display_df["date"] = display_df["date"].dt.strftime("%Y-%m-%d")
+        display_df["debit"] = display_df["debit"].astype("float64").round(2)
+        total_row = {"date": "Total", "description": f"{num_matching:,} transactions", "debit": round(total_matching, 2)}
+        display_df = pd.concat([display_df, pd.DataFrame([total_row])], ignore_index=True)
+        display_df = display_df.rename(columns=columns)
+        
+        first_row = (int(page) - 1) * TRANSACTION_PAGE_SIZE
+        shown = f"{first_row + 1:,}–{first_row + len(page_df):,} of " if num_matching > len(page_df) else ""
+        st.markdown(f"**{shown}{num_matching:,} transactions** | **Total: ${total_matching:,.2f}**")
+        st.dataframe(display_df, width='stretch', height=400, hide_index=True)
+
+
+def render_perf_panel():
+    """Optional sidebar panel with the stage timings of the latest render and recent uploads."""
+    runs = st.session_state.get("perf_runs", {})
+    recent = [runs["dashboard"][-1]] if "dashboard" in runs else []
+    recent += list(reversed(runs.get("upload", [])))
+    if not recent:
+        return
     
-    st.markdown(f"**{len(display_df)} transactions** | **Total: ${filtered['debit'].sum():,.2f}**")
-    st.dataframe(display_df, width='stretch', height=400, hide_index=True)
+    with st.sidebar.expander("⏱️ Performance"):
+        st.caption("Wall-clock time per stage; also logged as JSON lines")
+        for run in recent:
+            label = "This render" if run.name == "dashboard" else f"Upload ({run.name.split(':', 1)[1]})"
+            marks = "".join(f" · {name.replace('_', ' ')} {seconds:.2f}s" for name, seconds in run.marks.items())
+            st.markdown(f"**{label}** · {run.total_seconds:.2f}s{marks}")
+            stages = pd.DataFrame(run.as_records())
+            stages["rows_per_s"] = (stages["rows"] / stages["seconds"]).where(stages["rows"] > 0).round()
+            stages.columns = ["Stage", "Seconds", "Rows", "Calls", "Rows/s"]
+            st.dataframe(stages, hide_index=True, width='stretch')
+        
+        # Loads every account's full history, so only on request
+        if st.button("📦 Memory per account", use_container_width=True, key="perf_memory"):
+            st.dataframe(account_memory_report(load_user_accounts()), hide_index=True, width='stretch')
+
+
+def main():
+    perf = PerfRun("dashboard", started=SCRIPT_STARTED)
+    try:
+        render_dashboard(perf)
+    finally:
+        record_perf_run(perf.finish())
+    render_perf_panel()
 
 
 if __name__ == "__main__":
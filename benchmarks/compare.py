@@ -0,0 +1,54 @@
+"""Compare two benchmark result files written by benchmarks.run.
+
+    uv run python -m benchmarks.compare benchmarks/results/BASE.json benchmarks/results/NEW.json
+
+Prints the best time of each benchmark in both runs and the ratio new/base
+(below 1.0 is faster). Benchmarks present in only one file are listed too.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+
+def _load(path: Path) -> tuple[dict, dict]:
+    with open(path, "r") as f:
+        report = json.load(f)
+    results = {(r["benchmark"], r["format"], r["rows"]): r for r in report["results"]}
+    return report.get("meta", {}), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("base", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument("--threshold", type=float, default=1.10, help="flag ratios above this as regressions")
+    args = parser.parse_args()
+
+    base_meta, base = _load(args.base)
+    new_meta, new = _load(args.new)
+    print(f"base: {args.base} (commit {base_meta.get('commit')}, pandas {base_meta.get('pandas')})")
+    print(f"new:  {args.new} (commit {new_meta.get('commit')}, pandas {new_meta.get('pandas')})")
+    if base_meta.get("categories_fingerprint") != new_meta.get("categories_fingerprint"):
+        print("note: category definitions differ between the runs")
+    print()
+
+    print(f"{'benchmark':<28} {'format':<15} {'rows':>9}  {'base s':>9} {'new s':>9} {'ratio':>7}")
+    regressions = 0
+    for key in sorted(base.keys() | new.keys(), key=lambda k: (k[2], k[0], k[1])):
+        name, fmt, rows = key
+        if key not in base or key not in new:
+            which = "new only" if key not in base else "base only"
+            print(f"{name:<28} {fmt:<15} {rows:>9,}  ({which})")
+            continue
+        before, after = base[key]["min_s"], new[key]["min_s"]
+        ratio = after / before if before > 0 else float("inf")
+        flag = "  <- slower" if ratio > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{name:<28} {fmt:<15} {rows:>9,}  {before:9.3f} {after:9.3f} {ratio:7.2f}{flag}")
+
+    print(f"\n{regressions} benchmark(s) slower than {args.threshold:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
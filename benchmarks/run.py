@@ -0,0 +1,267 @@
+"""Benchmark the ingest, classification, load and dashboard paths.
+
+Generates seeded synthetic statements at each requested size, times the
+pipeline stages against them and writes the timings as JSON so runs can be
+compared (see benchmarks/compare.py). Run from the repository root:
+
+    uv run python -m benchmarks.run --sizes 1000 100000
+"""
+
+import argparse
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow
+
+from benchmarks.synthetic import StatementGenerator
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+RESULTS_DIR = Path(__file__).parent / "results"
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _timed(fn, repeat: int, setup=None) -> list[float]:
+    """Wall-clock seconds of ``repeat`` calls to ``fn`` (``setup`` runs untimed before each)."""
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+class _Upload(io.BytesIO):
+    """A generated file shaped like a Streamlit upload (in-memory bytes with a name and size)."""
+
+    def __init__(self, path: Path):
+        super().__init__(path.read_bytes())
+        self.name = path.name
+        self.size = len(self.getbuffer())
+
+
+def _rewind(*uploads):
+    """Setup step that rewinds uploads so each timed run reads them from the start."""
+    def setup():
+        for upload in uploads:
+            upload.seek(0)
+    return setup
+
+
+# Renders the dashboard once in a fresh interpreter and prints its time to first paint
+_COLD_RENDER = """
+import logging, sys, warnings
+warnings.filterwarnings("ignore")
+logging.disable(logging.WARNING)
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=600)
+at.session_state["session_id"] = sys.argv[2]
+at.run()
+print(at.session_state["perf_runs"]["dashboard"][-1].marks["first_paint"])
+"""
+
+
+def cold_first_paint(session_id: str) -> float:
+    """Seconds from script start to the dashboard title, in a new process where nothing is imported yet."""
+    result = subprocess.run(
+        [sys.executable, "-c", _COLD_RENDER, str(REPO_ROOT / "app.py"), session_id],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def dashboard_aggregations(spending_cube: pd.DataFrame):
+    """The metric and chart aggregations main() computes from the spending cube."""
+    total_spend = spending_cube["debit_sum"].sum()
+    num_transactions = int(spending_cube["count"].sum())
+    monthly = spending_cube.groupby("month_order")["debit_sum"].sum().sort_index()
+    cat_spend = spending_cube.groupby("category")["debit_sum"].sum().sort_values(ascending=False)
+    trend_pivot = spending_cube.pivot_table(
+        index="month_order", columns="category", values="debit_sum", aggfunc="sum", fill_value=0
+    ).sort_index()
+    return total_spend, num_transactions, monthly, cat_spend, trend_pivot.sum().sort_values(ascending=False)
+
+
+def run_size(app, parsers, st, generator: StatementGenerator, rows: int, formats: list, repeat: int, workdir: Path) -> list[dict]:
+    """Run every benchmark at one size; returns result records."""
+    results = []
+
+    def record(name: str, fmt: str, runs: list[float], **extra):
+        best = min(runs)
+        results.append({
+            "benchmark": name,
+            "format": fmt,
+            "rows": rows,
+            "min_s": round(best, 6),
+            "median_s": round(statistics.median(runs), 6),
+            "runs": [round(r, 6) for r in runs],
+            "rows_per_s": round(rows / best) if best > 0 else None,
+            **extra,
+        })
+        print(f"  {name:<28} {fmt:<15} {rows:>9,} rows  {best:8.3f}s")
+
+    def clear_caches():
+        # Frames are cached as resources, smaller results as data
+        st.cache_data.clear()
+        st.cache_resource.clear()
+
+    files_dir = workdir / "files" / str(rows)
+    session_id = f"bench_{rows}"
+    st.session_state.session_id = session_id
+    ingested = []
+
+    if "td_chequing" in formats:
+        upload = _Upload(generator.write_td_chequing(files_dir / "td_chequing.csv", rows))
+        record("parse", "td_chequing", _timed(lambda: parsers.parse_td_chequing_csv(upload), repeat, setup=_rewind(upload)))
+        record("ingest", "td_chequing", _timed(
+            lambda: app.process_uploaded_file(upload, "Bench Chequing", "td_chequing"), repeat, setup=_rewind(upload)
+        ))
+        ingested.append("bench_chequing")
+
+        upload.seek(0)
+        descriptions = parsers.parse_td_chequing_csv(upload)["description"]
+        categories = app.get_active_categories()
+        record("classify_with_keywords", "td_chequing",
+               _timed(lambda: [app.classify_with_keywords(d, categories) for d in descriptions], repeat))
+        record("merchant_ids", "td_chequing", _timed(lambda: app.merchant_ids(descriptions), repeat))
+        record("classify_series", "td_chequing",
+               _timed(lambda: app.classify_series(descriptions, categories), repeat))
+
+    if "td_credit_card" in formats:
+        uploads = [_Upload(p) for p in generator.write_td_credit_card(files_dir / "td_credit_card", rows)]
+        record("parse", "td_credit_card", _timed(lambda: parsers.parse_td_credit_card_csvs(uploads), repeat, setup=_rewind(*uploads)))
+        record("ingest", "td_credit_card", _timed(
+            lambda: app.process_td_credit_card_files(uploads, "Bench Credit Card"), repeat, setup=_rewind(*uploads)
+        ))
+        ingested.append("bench_credit_card")
+
+    if "amex" in formats:
+        upload = _Upload(generator.write_amex(files_dir / "amex.xlsx", rows))
+        record("parse", "amex", _timed(lambda: parsers.parse_amex_xls(upload), repeat, setup=_rewind(upload)))
+        record("ingest", "amex", _timed(
+            lambda: app.process_uploaded_file(upload, "Bench Amex", "amex"), repeat, setup=_rewind(upload)
+        ))
+        ingested.append("bench_amex")
+
+    # Read and dashboard paths run cold: caches are cleared before each call
+    accounts = app.load_user_accounts()
+    for account_key in ingested:
+        fmt = accounts[account_key]["account_type"]
+        record("load_account_data", fmt, _timed(lambda: app.load_account_data(account_key), repeat, setup=clear_caches),
+               bytes=app.frame_memory(app.load_account_data(account_key)))
+
+    if ingested:
+        sources = app.account_sources(accounts, ingested)
+        db_path = app.session_database_path()
+        min_date, max_date = app.load_sources_date_range(sources)
+        label = "combined" if len(sources) > 1 else accounts[ingested[0]]["account_type"]
+        windows = {"full_range": (min_date, max_date), "last_90_days": (max_date - datetime.timedelta(days=90), max_date)}
+        for window, (start, end) in windows.items():
+            record(f"spending_view[{window}]", label,
+                   _timed(lambda: app.load_spending_view(sources, start, end, db_path), repeat, setup=clear_caches))
+            record(f"transactions[{window}]", label,
+                   _timed(lambda: app.load_filtered_transactions(sources, start, end, (), ()), repeat, setup=clear_caches))
+            record(f"table_page[{window}]", label, _timed(
+                lambda: app.load_transaction_page(sources, start, end, (), (), None, "debit", True, 0, db_path), repeat, setup=clear_caches
+            ))
+        _, spending_cube = app.load_spending_view(sources, min_date, max_date, db_path)
+        record("dashboard_aggregations", label, _timed(lambda: dashboard_aggregations(spending_cube), repeat))
+        # Indexes stay loaded between searches, as they do between reruns
+        app.search_descriptions(sources, "uber")
+        record("search_descriptions", label, _timed(lambda: app.search_descriptions(sources, "tim hortons"), repeat))
+
+        def render():
+            from streamlit.testing.v1 import AppTest
+            at = AppTest.from_file(str(REPO_ROOT / "app.py"), default_timeout=600)
+            at.session_state["session_id"] = session_id
+            at.run()
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+        record("render_dashboard", label, _timed(render, repeat, setup=clear_caches))
+        record("first_paint[cold]", label, [cold_first_paint(session_id) for _ in range(repeat)])
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="rows per generated statement")
+    parser.add_argument("--formats", nargs="+", default=["td_chequing", "td_credit_card", "amex"],
+                        choices=["td_chequing", "td_credit_card", "amex"])
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark (the minimum is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None, help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--workdir", type=Path, default=None, help="where to generate files and sessions (default: a temp dir)")
+    args = parser.parse_args()
+
+    # Streamlit functions run without a server here; silence its bare-mode warnings
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.WARNING)
+
+    workdir = (args.workdir or Path(tempfile.mkdtemp(prefix="spend-bench-"))).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    output = (args.output or RESULTS_DIR / f"{datetime.datetime.now():%Y%m%d-%H%M%S}.json").resolve()
+
+    # Sessions are created relative to the working directory (data/sessions/...),
+    # so the app modules are imported from the repository after moving there
+    os.chdir(workdir)
+    sys.path.insert(0, str(REPO_ROOT))
+    import streamlit as st
+    import app
+    import parsers
+    from classifier import categories_fingerprint
+
+    generator = StatementGenerator(app.CATEGORIES, seed=args.seed)
+    print(f"Benchmarking in {workdir}")
+    results = []
+    for rows in args.sizes:
+        print(f"\n{rows:,} rows")
+        results.extend(run_size(app, parsers, st, generator, rows, args.formats, args.repeat, workdir))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "categories_fingerprint": categories_fingerprint(app.CATEGORIES),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "pyarrow": pyarrow.__version__,
+        },
+        "results": results,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Seeded synthetic statement generator for benchmarks.
+
+Produces TD Chequing CSVs, monthly TD Credit Card CSVs and Amex workbooks in
+the same layouts as the real exports. Descriptions are built from the category
+keywords (plus store numbers, locations and some merchants no keyword matches),
+so classification does realistic work. The same seed always yields the same
+files.
+"""
+
+import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Share of transactions whose merchant matches no category keyword
+UNMATCHED_SHARE = 0.15
+UNMATCHED_MERCHANTS = [
+    "SQ *CORNER SHOP", "POS PURCHASE", "MISC MERCHANT", "PAYPAL *SELLER",
+    "LOCAL MARKET", "INTERAC PURCHASE", "WEB ORDER", "KIOSK",
+]
+SUFFIXES = ["", " #{n}", " TORONTO ON", " #{n} VANCOUVER BC", " ONLINE", " {n}"]
+
+# Share of each credit card statement repeated at the start of the next one
+CREDIT_CARD_OVERLAP = 0.02
+
+
+class StatementGenerator:
+    """Deterministic generator of synthetic transactions and export files."""
+
+    def __init__(self, categories: dict, seed: int = 0, start: datetime.date = datetime.date(2021, 1, 1), days: int = 5 * 365):
+        self.seed = seed
+        self.start = pd.Timestamp(start)
+        self.days = days
+        self.keywords = sorted({
+            kw
+            for cat_info in categories.values()
+            for kw in (cat_info.get("keywords", []) if isinstance(cat_info, dict) else cat_info)
+            if kw.strip()
+        })
+
+    def _rng(self, stream: str) -> np.random.Generator:
+        # Independent, reproducible stream per file kind
+        return np.random.default_rng([self.seed, sum(map(ord, stream))])
+
+    def transactions(self, n: int, stream: str = "transactions") -> pd.DataFrame:
+        """``n`` transactions sorted by date: date, description, debit, credit, balance."""
+        rng = self._rng(stream)
+        dates = self.start + pd.to_timedelta(np.sort(rng.integers(0, self.days, n)), unit="D")
+
+        merchants = np.where(
+            rng.random(n) < UNMATCHED_SHARE,
+            rng.choice(UNMATCHED_MERCHANTS, n),
+            rng.choice(self.keywords, n),
+        )
+        suffixes = rng.choice(SUFFIXES, n)
+        numbers = rng.integers(1, 9999, n).astype(str)
+        descriptions = [
+            merchant + suffix.replace("{n}", number)
+            for merchant, suffix, number in zip(merchants, suffixes, numbers)
+        ]
+
+        # Mostly purchases (skewed towards small amounts), some refunds/payments
+        amounts = np.round(rng.lognormal(mean=3.5, sigma=1.0, size=n), 2)
+        is_credit = rng.random(n) < 0.08
+        debit = np.where(is_credit, np.nan, amounts)
+        credit = np.where(is_credit, amounts, np.nan)
+        balance = np.round(5_000 + np.cumsum(np.nan_to_num(credit) - np.nan_to_num(debit)), 2)
+
+        return pd.DataFrame({
+            "date": dates,
+            "description": descriptions,
+            "debit": debit,
+            "credit": credit,
+            "balance": balance,
+        })
+
+    def write_td_chequing(self, path: Path, n: int) -> Path:
+        """TD Chequing export: headerless CSV with YYYY-MM-DD dates."""
+        df = self.transactions(n, "td_chequing")
+        df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(path, header=False, index=False)
+        return path
+
+    def write_td_credit_card(self, directory: Path, n: int) -> list[Path]:
+        """TD Credit Card exports: one headerless CSV per month with MM/DD/YYYY dates.
+
+        The start of each statement repeats a few rows of the previous one, as
+        overlapping downloads do, so deduplication has work to do.
+        """
+        df = self.transactions(n, "td_credit_card")
+        months = df["date"].dt.to_period("M")
+        df["date"] = df["date"].dt.strftime("%m/%d/%Y")
+        directory.mkdir(parents=True, exist_ok=True)
+
+        paths = []
+        previous = None
+        for month, statement in df.groupby(months, sort=True):
+            if previous is not None:
+                overlap = previous.tail(int(len(previous) * CREDIT_CARD_OVERLAP))
+                statement = pd.concat([overlap, statement])
+            path = directory / f"td_credit_card_{month.strftime('%Y_%m')}.csv"
+            statement.to_csv(path, header=False, index=False)
+            paths.append(path)
+            previous = statement
+        return paths
+
+    def write_amex(self, path: Path, n: int) -> Path:
+        """Amex export: a few summary rows, then a "Date" header and the transactions."""
+        df = self.transactions(n, "amex")
+        dates = df["date"].dt.strftime("%d %b. %Y")
+        amounts = df["debit"].fillna(-df["credit"]).map("${:,.2f}".format)
+        rows = pd.DataFrame({
+            0: dates,
+            1: dates,
+            2: df["description"],
+            3: "J SMITH",
+            4: amounts,
+        })
+        preamble = pd.DataFrame([
+            ["Transaction Details", None, None, None, None],
+            ["Amex Cobalt Card", None, None, None, None],
+            [None, None, None, None, None],
+            ["Date", "Date Processed", "Description", "Cardmember", "Amount"],
+        ])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pd.concat([preamble, rows], ignore_index=True).to_excel(path, header=False, index=False)
+        return path
@@ -1,12 +1,60 @@
-import pandas as pd
-from pathlib import Path
-import re
+"""Built-in category definitions shared by the dashboard and the CLI.
 
-# Define paths
-PROCESSED_DATA_DIR = Path("data/processed")
+Streamlit re-executes app.py on every interaction, but an imported module runs
+once per process, so the merged CATEGORIES is built here a single time.
+"""
 
-# Category definitions for credit card (case-insensitive matching)
-CREDIT_CARD_CATEGORIES = {
+from types import MappingProxyType
+
+
+# Category definitions for TD Chequing accounts
+TD_CHEQUING_CATEGORIES = {
+    "mortgage": [
+        "FN               MTG"
+    ],
+    "housing": [
+        "TSCC 1725", "ENERCARE HOME", "ENBRIDGE GAS", "TORONTO HYDRO",
+        "TOR-UTILITIES", "TOR UTILITY", "TORONTO UTILITY"
+    ],
+    "insurance": [
+        "BMO INSURANCE", "WAWANESA INS", "TRUPANION"
+    ],
+    "telecom": [
+        "TELUS COMM", "BELL"
+    ],
+    "credit_card_payment": [
+        "TD VISA PREAUTH", "AMEX BILL PYMT"
+    ],
+    "transfers": [
+        "TFR-TO", "TFR-FR"
+    ],
+    "loans": [
+        "SPL             LOAN", "SCOTIA PLAN", "BANK OF NOVA SC LOAN"
+    ],
+    "investments": [
+        "WS INVESTMENTS"
+    ],
+    "bank_fees": [
+        "MONTHLY ACCOUNT FEE", "WITHDRAWAL FEES", "OVERDRAFT INTEREST",
+        "PODP FEE", "SEND E-TFR FEE", "FX ATM W/D FEE"
+    ],
+    "e_transfers": [
+        "SEND E-TFR"
+    ],
+    "cash_withdrawal": [
+        "ATM W/D", "CASH WITHDRA", "FX ATM W/D"
+    ],
+    "income": [
+        "RIPPLING CANADA", "PEOPLE CENTER", "CANADA LIFE      INS",
+        "MOBILE DEPOSIT", "E-TRANSFER"
+    ],
+    "eating_out": [
+        "DARK HORSE"
+    ]
+}
+
+# Category definitions for TD Credit Card
+TD_CREDIT_CARD_CATEGORIES = {
     "groceries": [
         "METRO", "FARM BOY", "SUMMERHILL MARKET", "HEALTHY PLANET", 
         "SHOPPERS DRUG MART", "CANADIAN TIRE", "STONES DRUG STORE"
@@ -68,7 +116,21 @@ CREDIT_CARD_CATEGORIES = {
     ]
 }
 
-# Category definitions for Amex credit card
+# Categories to exclude from spending analysis (to avoid double counting)
+# - credit_card_payment: already tracked on the credit card
+# - transfers: internal money movement, not spending
+# - income: money coming in, not spending
+# - investments: savings/investments, not spending
+# - cash_withdrawal: cash itself isn't spending, what you buy with it is
+EXCLUDED_CATEGORIES = {
+    "credit_card_payment",
+    "transfers",
+    "income",
+    "investments",
+    "cash_withdrawal"
+}
+
+# Category definitions for Amex
 AMEX_CATEGORIES = {
     "pet": [
         "PETSMART", "PET VALU", "SNIFFANY", "ANIMAL HOSPITAL", "GLOBAL PET",
@@ -149,7 +211,7 @@ AMEX_CATEGORIES = {
         "MUJI", "MINISO", "DAISO", "HALLMARK", "PAPYRUS",
         "MICHAELS", "JOANN", "HOBBY LOBBY", "AMERICAN EAGLE", "ABERCROMBIE",
         "URBAN OUTFITTERS", "ANTHROPOLOGIE", "FREE PEOPLE",
-        "OLDNAVY.COM", "WWW.SPORTCHEK", "SEA HOUSE", "ETSY", 
+        "OLDNAVY.COM", "WWW.SPORTCHEK", "SEA HOUSE", "ETSY",
         "SHE SELLS SANCTUARY", "LA VIE EN ROSE",
         "ARDENE", "DYNAMITE", "GARAGE", "REITMANS", "MADEWELL",
         "WALKING ON A CLOUD", "ANTHRO CA", "URBANOUTFITTERSCA",
@@ -165,16 +227,13 @@ AMEX_CATEGORIES = {
     "travel": [
         "HANEDA AIRPORT", "AIRPORT", "DEL MARCOS HOTEL", "HOTEL", "MOTEL",
         "AIRBNB", "HOSTEL", "INN", "RESORT",
-        # Japan shops
         "KYOTO ENGINE", "WA FUJITATE", "YASUDASENKEIDO",
-        # Disneyland & US travel
         "DLR ", "DISNEYLAND", "DISNEY CALIFORNIA", "COOKIE DOUGH LIGHTFUL",
         "TONGA HUT", "OUT WEST TRADING", "LITTLE LUNCH COFFEE",
         "EXPEDIA", "S AND R MEDALLION",
         "GO APP RIDE", "LS TRAVEL RETAIL", "PORTER AIRLINES",
         "SUICA", "CNP POINT THE WAY", "MOBILE ICOCA", "JRC SMART EX",
-        "WDW TICKETS", "WDW CONNECTIONS", "ALIPAY", "FUELROD",
-        "MAISONCO"
+        "WDW TICKETS", "WDW CONNECTIONS", "ALIPAY", "FUELROD", "MAISONCO"
     ],
     "entertainment": [
         "CINEPLEX", "SCOTIABANK THEATRE", "TIFF", "TICKETMASTER",
@@ -207,118 +266,37 @@ AMEX_CATEGORIES = {
     ]
 }
 
-# Category definitions for chequing accounts
-CHEQUING_CATEGORIES = {
-    "mortgage": [
-        "FN               MTG"
-    ],
-    "housing": [
-        "TSCC 1725", "ENERCARE HOME", "ENBRIDGE GAS", "TORONTO HYDRO",
-        "TOR-UTILITIES", "TOR UTILITY", "TORONTO UTILITY"
-    ],
-    "insurance": [
-        "BMO INSURANCE", "WAWANESA INS", "TRUPANION"
-    ],
-    "telecom": [
-        "TELUS COMM", "BELL"
-    ],
-    "credit_card_payment": [
-        "TD VISA PREAUTH", "AMEX BILL PYMT"
-    ],
-    "transfers": [
-        "TFR-TO", "TFR-FR"
-    ],
-    "loans": [
-        "SPL             LOAN", "SCOTIA PLAN", "BANK OF NOVA SC LOAN"
-    ],
-    "investments": [
-        "WS INVESTMENTS"
-    ],
-    "bank_fees": [
-        "MONTHLY ACCOUNT FEE", "WITHDRAWAL FEES", "OVERDRAFT INTEREST",
-        "PODP FEE", "SEND E-TFR FEE", "FX ATM W/D FEE"
-    ],
-    "e_transfers": [
-        "SEND E-TFR"
-    ],
-    "cash_withdrawal": [
-        "ATM W/D", "CASH WITHDRA"
-    ],
-    "income": [
-        "RIPPLING CANADA", "PEOPLE CENTER", "CANADA LIFE      INS",
-        "MOBILE DEPOSIT", "E-TRANSFER"
-    ],
-    "eating_out": [
-        "DARK HORSE"
-    ]
-}
-
+def _merge_categories(*category_dicts) -> dict:
+    """Merge multiple category dictionaries, combining keywords for matching categories.
 
-def classify_transaction(description: str, categories: dict) -> str:
-    """Classify a transaction based on its description."""
-    description_upper = description.upper()
-    
-    # Check each category's keywords
-    for category, keywords in categories.items():
-        for keyword in keywords:
-            if keyword.upper() in description_upper:
-                return category
-    
-    return "other"
+    Keywords keep their first-seen order; a per-category set makes the
+    duplicate check constant-time.
+    """
+    merged = {}
+    seen = {}
+    for cat_dict in category_dicts:
+        for category, keywords in cat_dict.items():
+            category_keywords = merged.setdefault(category, [])
+            category_seen = seen.setdefault(category, set())
+            for kw in keywords:
+                if kw not in category_seen:
+                    category_seen.add(kw)
+                    category_keywords.append(kw)
+    return merged
 
 
-def process_account(account_name: str, categories: dict):
-    """Process and classify transactions for an account."""
-    input_file = PROCESSED_DATA_DIR / f"{account_name}_combined.csv"
-    output_file = PROCESSED_DATA_DIR / f"{account_name}_classified.csv"
-    
-    print(f"\n[{account_name}]")
-    print(f"  Reading from: {input_file}")
-    
-    df = pd.read_csv(input_file)
-    print(f"  Loaded {len(df)} transactions")
-    
-    # Classify each transaction
-    df["category"] = df["description"].apply(lambda x: classify_transaction(x, categories))
-    
-    # Print category breakdown
-    print("  Category breakdown:")
-    category_counts = df["category"].value_counts()
-    for category, count in category_counts.items():
-        print(f"    {category}: {count}")
-    
-    # Save classified transactions
-    df.to_csv(output_file, index=False)
-    print(f"  Saved to: {output_file}")
-    
-    # Show "other" transactions for review
-    other_transactions = df[df["category"] == "other"]["description"].unique()
-    if len(other_transactions) > 0:
-        print(f"  Transactions classified as 'other' ({len(other_transactions)} unique):")
-        for desc in other_transactions[:10]:
-            print(f"    - {desc}")
-        if len(other_transactions) > 10:
-            print(f"    ... and {len(other_transactions) - 10} more")
+def _freeze(categories: dict) -> MappingProxyType:
+    """Read-only view of category definitions, with keyword tuples."""
+    return MappingProxyType({category: tuple(keywords) for category, keywords in categories.items()})
 
 
-def main():
-    print("=" * 60)
-    print("Classifying transactions...")
-    print("=" * 60)
-    
-    # Process credit cards
-    process_account("td_visa_credit_card", CREDIT_CARD_CATEGORIES)
-    process_account("brydon_amex", AMEX_CATEGORIES)
-    process_account("kennedy_amex", AMEX_CATEGORIES)
-    
-    # Process chequing accounts
-    process_account("brydon_chequings", CHEQUING_CATEGORIES)
-    process_account("joint_chequings", CHEQUING_CATEGORIES)
-    
-    print("\n" + "=" * 60)
-    print("Done!")
-    print("=" * 60)
+# Combine all category dictionaries into one unified CATEGORIES dict
+_merged = _merge_categories(TD_CREDIT_CARD_CATEGORIES, TD_CHEQUING_CATEGORIES, AMEX_CATEGORIES)
 
+# Order matters! Put ordering_in keywords before transportation to catch UberEats before Uber
+_ordered = {"ordering_in": _merged["ordering_in"]} if "ordering_in" in _merged else {}
+_ordered.update((cat, keywords) for cat, keywords in _merged.items() if cat != "ordering_in")
 
-if __name__ == "__main__":
-    main()
+# The default definitions are shared by every session, so they are frozen;
+# a session's edits are saved as a separate (plain dict) copy
+CATEGORIES = _freeze(_ordered)
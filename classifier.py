@@ -0,0 +1,499 @@
+"""Compiled rule matching for transaction classification.
+
+A category is a list of keywords, or an object with ``keywords``, a
+``priority`` for them and a list of ``rules``. A rule is an object with any of:
+
+- ``keywords``: substrings of the merchant ID (see merchants.py)
+- ``words``: whole words of the merchant ID
+- ``pattern``: a regular expression searched in the merchant ID (case-insensitive;
+  ``^`` and ``$`` anchor to the ID's ends; groups must be non-capturing)
+- ``min_amount`` / ``max_amount``: inclusive bounds on the transaction amount
+  (debit minus credit, so purchases are positive)
+- ``account_types``: account types the rule applies to (e.g. ["td_chequing"])
+- ``priority``: higher priorities win (default 0); ties go to the category listed first
+
+The text conditions of a rule are alternatives; a rule without any matches
+every merchant, which is useful together with amount or account conditions.
+"""
+
+import hashlib
+import json
+import re
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from merchants import MERCHANT_RULES_FINGERPRINT, merchant_id, merchant_ids, merchant_keyword
+
+RULE_FIELDS = {"keywords", "words", "pattern", "min_amount", "max_amount", "account_types", "priority"}
+
+
+def _category_keywords(cat_info) -> list:
+    """Return the keyword list for a category entry (plain list or {"keywords": [...]})."""
+    return cat_info.get("keywords", []) if isinstance(cat_info, dict) else cat_info
+
+
+def categories_fingerprint(categories: dict) -> str:
+    """Stable hash of a category definition dict (order-sensitive, since order decides ties)."""
+    payload = json.dumps(categories, ensure_ascii=False, default=dict)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def transaction_amounts(df: pd.DataFrame) -> np.ndarray:
+    """Amounts that rule bounds compare against: debit minus credit (purchases positive)."""
+    return (df["debit"].fillna(0).astype("float64") - df["credit"].fillna(0).astype("float64")).to_numpy()
+
+
+@dataclass(frozen=True)
+class CategoryRule:
+    """One rule of a category: text conditions on the merchant ID plus optional transaction conditions."""
+
+    category: int
+    priority: int = 0
+    keywords: tuple = ()
+    patterns: tuple = ()
+    min_amount: float = None
+    max_amount: float = None
+    account_types: frozenset = None
+
+    @property
+    def conditional(self) -> bool:
+        """Whether the rule depends on more than the merchant (amount or account type)."""
+        return self.min_amount is not None or self.max_amount is not None or self.account_types is not None
+
+    def text_pattern(self) -> str:
+        """All text conditions as one regex over the merchant ID."""
+        return "|".join(f"(?:{part})" for part in [_keyword_pattern(kw) for kw in self.keywords] + list(self.patterns))
+
+    def applies(self, amounts: np.ndarray, account_type: str):
+        """Whether the transaction conditions hold: a bool, or a bool per amount."""
+        if self.account_types is not None and account_type not in self.account_types:
+            return False
+        if self.min_amount is None and self.max_amount is None:
+            return True
+        if amounts is None:
+            return False
+        amounts = np.asarray(amounts, dtype="float64")
+        ok = np.ones(len(amounts), dtype=bool)
+        if self.min_amount is not None:
+            ok &= amounts >= self.min_amount
+        if self.max_amount is not None:
+            ok &= amounts <= self.max_amount
+        return ok
+
+
+def _keyword_pattern(keyword: str) -> str:
+    """A keyword as a regex; one ending in a space ("SPA ") also matches at the end of the ID."""
+    if keyword.endswith(" "):
+        return re.escape(keyword[:-1]) + "(?: |$)"
+    return re.escape(keyword)
+
+
+def _word_pattern(word: str) -> str:
+    """A whole-word regex. Lookarounds rather than \\b, so words ending in punctuation ("SQ*") work too."""
+    return rf"(?<!\w){re.escape(merchant_keyword(word).strip())}(?!\w)"
+
+
+def _string_list(category: str, field: str, value) -> list:
+    if not isinstance(value, (list, tuple)) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"{category}: {field} must be a list of strings")
+    return list(value)
+
+
+def _number(category: str, field: str, value):
+    if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+        raise ValueError(f"{category}: {field} must be a number")
+    return value
+
+
+def _parse_rule(category: str, cat_idx: int, spec) -> CategoryRule:
+    if not isinstance(spec, dict) or spec.keys() - RULE_FIELDS:
+        raise ValueError(f"{category}: a rule is an object with keys {', '.join(sorted(RULE_FIELDS))}")
+    keywords = [merchant_keyword(kw) for kw in _string_list(category, "keywords", spec.get("keywords", []))]
+    patterns = [_word_pattern(word) for word in _string_list(category, "words", spec.get("words", []))]
+    if "pattern" in spec:
+        pattern = spec["pattern"]
+        try:
+            # On its own (for error positions in the user's pattern), then the way the combined matcher embeds it
+            groups = re.compile(pattern, re.IGNORECASE).groups
+            re.compile(f"(?:{pattern})", re.IGNORECASE)
+        except (re.error, TypeError) as e:
+            raise ValueError(f"{category}: invalid pattern {pattern!r} ({e})") from None
+        if groups:
+            # Group numbers and names would clash once patterns share one regex
+            raise ValueError(f"{category}: pattern {pattern!r} has capturing groups or backreferences; use (?:...) instead")
+        patterns.append(pattern)
+    priority = _number(category, "priority", spec.get("priority", 0))
+    if not isinstance(priority, int):
+        raise ValueError(f"{category}: priority must be an integer")
+    account_types = spec.get("account_types")
+    return CategoryRule(
+        category=cat_idx,
+        priority=priority,
+        # No text condition: the empty keyword, which every merchant contains
+        keywords=tuple(keywords) if keywords or patterns else ("",),
+        patterns=tuple(patterns),
+        min_amount=_number(category, "min_amount", spec.get("min_amount")),
+        max_amount=_number(category, "max_amount", spec.get("max_amount")),
+        account_types=frozenset(_string_list(category, "account_types", account_types)) if account_types is not None else None,
+    )
+
+
+def parse_rules(categories: dict) -> list[CategoryRule]:
+    """Every rule of a category set in category order; raises ValueError on a malformed one."""
+    rules = []
+    for cat_idx, (category, cat_info) in enumerate(categories.items()):
+        if isinstance(cat_info, dict):
+            if cat_info.keys() - {"keywords", "priority", "rules"}:
+                raise ValueError(f"{category}: a category object has keys keywords, priority, rules")
+            specs = [{"keywords": cat_info["keywords"], "priority": cat_info.get("priority", 0)}] if cat_info.get("keywords") else []
+            rules_list = cat_info.get("rules", [])
+            if not isinstance(rules_list, (list, tuple)):
+                raise ValueError(f"{category}: rules must be a list")
+            specs += list(rules_list)
+        else:
+            specs = [{"keywords": _string_list(category, "keywords", cat_info)}] if cat_info else []
+        rules.extend(_parse_rule(category, cat_idx, spec) for spec in specs)
+    return rules
+
+
+def _compile_rules(pattern: str) -> re.Pattern:
+    """Compile a combined rule regex, reporting failures as ValueError like malformed rules."""
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"invalid rules ({e})") from None
+
+
+class CategoryMatcher:
+    """All rules of a category set compiled into one matcher.
+
+    Rules are ranked by (priority, category order) and the best-ranked rule that
+    matches wins. Plain keywords go into an Aho-Corasick automaton and patterns
+    into one regex whose alternatives are tried in rank order, so each merchant
+    ID is walked once however many rules there are. Rules with amount or
+    account conditions are matched on text alike (one more combined regex
+    reports all of them at once); their conditions are then checked per
+    transaction with array operations.
+    """
+
+    def __init__(self, categories: dict, default: str = "other"):
+        self.category_names = list(categories.keys())
+        self.default = default
+        self.fingerprint = categories_fingerprint(categories)
+        rules = parse_rules(categories)
+
+        # Rank 0 is the best; the extra last rank is "no match"
+        keys = sorted({(-rule.priority, rule.category) for rule in rules})
+        rank_of = {key: rank for rank, key in enumerate(keys)}
+        self.no_match = len(keys)
+        self.rank_labels = np.array([self.category_names[cat] for _, cat in keys] + [default], dtype=object)
+        self._rank_category = [cat for _, cat in keys] + [len(self.category_names)]
+
+        # Trie: per-state transitions, failure links, and the best rank of any
+        # keyword ending at (or via failure links, below) the state.
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [self.no_match]
+        pattern_rules = []
+        self.conditional_rules: list[tuple[int, CategoryRule]] = []
+
+        for rule in rules:
+            rank = rank_of[(-rule.priority, rule.category)]
+            if rule.conditional:
+                self.conditional_rules.append((rank, rule))
+                continue
+            if rule.patterns:
+                pattern_rules.append((rank, rule.text_pattern()))
+                continue
+            for keyword in rule.keywords:
+                state = 0
+                for ch in keyword:
+                    nxt = self._goto[state].get(ch)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto[state][ch] = nxt
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._out.append(self.no_match)
+                    state = nxt
+                if rank < self._out[state]:
+                    self._out[state] = rank
+
+        # Breadth-first failure links; fold each state's output with its fallback's
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                self._out[nxt] = min(self._out[nxt], self._out[self._fail[nxt]])
+                queue.append(nxt)
+
+        # Pattern rules as one alternation anchored at the start, each alternative a
+        # lookahead over the whole ID: the first that succeeds is the best-ranked match
+        pattern_rules.sort(key=lambda item: item[0])
+        self._pattern_ranks = {f"r{i}": rank for i, (rank, _) in enumerate(pattern_rules)}
+        self._patterns = _compile_rules(
+            "^(?:" + "|".join(f"(?=.*?(?:{text}))(?P<r{i}>)" for i, (_, text) in enumerate(pattern_rules)) + ")"
+        ) if pattern_rules else None
+
+        # Conditional rules as optional lookaheads, so one match records every rule whose text matches
+        self._conditions = _compile_rules(
+            "^" + "".join(f"(?:(?=.*?(?:{rule.text_pattern()}))(?P<c{j}>))?" for j, (_, rule) in enumerate(self.conditional_rules))
+        ) if self.conditional_rules else None
+
+    def match_rank(self, merchant: str) -> int:
+        """Rank of the best rule without amount or account conditions matching a merchant ID (no_match if none)."""
+        goto, fail, out = self._goto, self._fail, self._out
+        best = out[0]  # an empty keyword matches every description
+        state = 0
+        # The trailing space lets keywords that end in one ("SPA ") match the last word
+        for ch in merchant + " ":
+            if best == 0:
+                break
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state] < best:
+                best = out[state]
+        if self._patterns is not None and best > 0:
+            match = self._patterns.match(merchant)
+            if match:
+                best = min(best, self._pattern_ranks[match.lastgroup])
+        return best
+
+    def match_index(self, merchant: str) -> int:
+        """Return the index of the winning category for a merchant ID, or len(category_names) if none match.
+
+        Rules with amount or account conditions are not considered.
+        """
+        return self._rank_category[self.match_rank(merchant)]
+
+    def condition_hits(self, merchants) -> np.ndarray:
+        """Boolean matrix of which conditional rules' text each merchant ID matches (merchants x rules)."""
+        hits = np.zeros((len(merchants), len(self.conditional_rules)), dtype=bool)
+        if self._conditions is not None:
+            groups = [f"c{j}" for j in range(len(self.conditional_rules))]
+            for i, merchant in enumerate(merchants):
+                match = self._conditions.match(merchant)
+                hits[i] = [match.group(group) is not None for group in groups]
+        return hits
+
+    def classify(self, description: str, amount: float = None, account_type: str = None) -> str:
+        """Classify a single description (rules with amount or account conditions need those values)."""
+        merchant = merchant_id(description)
+        rank = self.match_rank(merchant)
+        if self.conditional_rules:
+            amounts = None if amount is None else np.array([amount], dtype="float64")
+            for (rule_rank, rule), hit in zip(self.conditional_rules, self.condition_hits([merchant])[0]):
+                if hit and rule_rank < rank and np.all(rule.applies(amounts, account_type)):
+                    rank = rule_rank
+        return self.rank_labels[rank]
+
+
+# Matchers are reused across calls (and Streamlit reruns): looked up by object
+# identity first, then by content fingerprint, so a dict that is rebuilt with the
+# same definitions never triggers a recompile.
+_MATCHERS_BY_ID: dict[int, tuple[dict, CategoryMatcher]] = {}
+_MATCHERS_BY_FINGERPRINT: dict[str, CategoryMatcher] = {}
+_MAX_CACHED_MATCHERS = 8
+
+
+def get_matcher(categories: dict) -> CategoryMatcher:
+    """Return the compiled matcher for a category set, building it only when the definitions change."""
+    entry = _MATCHERS_BY_ID.get(id(categories))
+    if entry is not None and entry[0] is categories:
+        return entry[1]
+
+    fingerprint = categories_fingerprint(categories)
+    matcher = _MATCHERS_BY_FINGERPRINT.get(fingerprint)
+    if matcher is None:
+        matcher = CategoryMatcher(categories)
+        if len(_MATCHERS_BY_FINGERPRINT) >= _MAX_CACHED_MATCHERS:
+            _MATCHERS_BY_FINGERPRINT.pop(next(iter(_MATCHERS_BY_FINGERPRINT)))
+        _MATCHERS_BY_FINGERPRINT[fingerprint] = matcher
+
+    if len(_MATCHERS_BY_ID) >= _MAX_CACHED_MATCHERS:
+        _MATCHERS_BY_ID.pop(next(iter(_MATCHERS_BY_ID)))
+    # Keep a reference to the dict so its id can't be recycled while cached
+    _MATCHERS_BY_ID[id(categories)] = (categories, matcher)
+    return matcher
+
+
+def invalidate_matchers():
+    """Drop identity-keyed matchers (call after category definitions are edited)."""
+    _MATCHERS_BY_ID.clear()
+
+
+def diff_categories(old: dict, new: dict) -> tuple[set, set, bool]:
+    """Compare two category definition dicts.
+
+    Returns ``(changed_keywords, edited_categories, reordered)``: upper-cased keywords
+    added to or removed from any category, categories whose keyword set changed
+    (including added/removed categories), and whether the relative order of the
+    categories present in both changed. A changed priority or rule list counts
+    as a reorder, since either can move rows of any category.
+    """
+    def keyword_sets(categories):
+        return {
+            category: {kw.upper() for kw in _category_keywords(cat_info)}
+            for category, cat_info in categories.items()
+        }
+
+    def rule_specs(categories):
+        return {
+            category: json.dumps([cat_info.get("priority", 0), cat_info.get("rules", [])], sort_keys=True)
+            for category, cat_info in categories.items()
+            if isinstance(cat_info, dict) and (cat_info.get("priority") or cat_info.get("rules"))
+        }
+
+    old_sets, new_sets = keyword_sets(old), keyword_sets(new)
+    changed_keywords = set()
+    edited_categories = set()
+    for category in old_sets.keys() | new_sets.keys():
+        before = old_sets.get(category, set())
+        after = new_sets.get(category, set())
+        if before != after or (category in old_sets) != (category in new_sets):
+            changed_keywords |= before ^ after
+            edited_categories.add(category)
+
+    shared_old = [c for c in old_sets if c in new_sets]
+    shared_new = [c for c in new_sets if c in old_sets]
+    return changed_keywords, edited_categories, shared_old != shared_new or rule_specs(old) != rule_specs(new)
+
+
+def rows_affected_by_edit(descriptions: pd.Series, labels: pd.Series, old: dict, new: dict) -> pd.Series:
+    """Boolean mask of rows whose classification could differ between ``old`` and ``new``.
+
+    A row can only move if it contains an added/removed keyword or is currently
+    tagged with an edited category; everything else keeps the same set of
+    matching keywords and therefore the same first match. Reordering categories
+    or editing rules and priorities can change any row, so it marks everything.
+    """
+    changed_keywords, edited_categories, reordered = diff_categories(old, new)
+    if reordered:
+        return pd.Series(True, index=descriptions.index)
+
+    mask = labels.astype(str).isin(edited_categories)
+    if changed_keywords:
+        matcher = CategoryMatcher({"changed": sorted(changed_keywords)})
+        merchants = merchant_ids(descriptions)
+        hits = np.fromiter(
+            (matcher.match_index(m) == 0 for m in merchants.cat.categories), dtype=bool, count=len(merchants.cat.categories)
+        )
+        mask |= np.append(hits, False)[merchants.cat.codes.to_numpy()]
+    return mask
+
+
+class ClassificationCache:
+    """Persistent, LRU-bounded memo of merchant ID -> category.
+
+    Entries are keyed by the category definitions' and merchant rules'
+    fingerprints plus the merchant ID, so edited categories or rules never
+    serve stale results; entries for old definitions simply age out.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 50_000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._dirty = False
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = OrderedDict(json.load(f))
+            except (json.JSONDecodeError, ValueError, TypeError):
+                self._entries = OrderedDict()
+
+    @staticmethod
+    def _key(fingerprint: str, merchant: str) -> str:
+        return f"{fingerprint[:16]}{MERCHANT_RULES_FINGERPRINT[:8]}|{merchant}"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, fingerprint: str, merchant: str):
+        """Return the cached category, or None; a hit marks the entry most recently used."""
+        key = self._key(fingerprint, merchant)
+        category = self._entries.get(key)
+        if category is not None:
+            self._entries.move_to_end(key)
+        return category
+
+    def put(self, fingerprint: str, merchant: str, category: str):
+        """Store a result, evicting the least recently used entries past max_entries."""
+        key = self._key(fingerprint, merchant)
+        self._entries[key] = category
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    def save(self):
+        """Write the cache to disk (oldest entries first) if it changed."""
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(list(self._entries.items()), f)
+        self._dirty = False
+
+
+def classify_merchants(merchants: pd.Series, categories: dict, cache: ClassificationCache = None,
+                       amounts: np.ndarray = None, account_type: str = None) -> pd.Series:
+    """Classify a categorical Series of merchant IDs (see merchants.merchant_ids).
+
+    Only the distinct merchants go through the matcher. With a ``cache``,
+    previously seen merchants skip matching entirely. ``amounts`` (see
+    transaction_amounts) and ``account_type`` are checked by rules with amount
+    or account conditions; without them those rules don't match.
+    """
+    matcher = get_matcher(categories)
+    uniques = merchants.cat.categories
+    codes = merchants.cat.codes.to_numpy()
+
+    if matcher.conditional_rules:
+        # A merchant's category can depend on the transaction, so the cache
+        # doesn't apply: match text per merchant, then resolve conditions per row.
+        # Trailing no-match slots double as the values for missing merchants (code -1).
+        unique_ranks = np.fromiter((matcher.match_rank(m) for m in uniques), dtype=np.intp, count=len(uniques))
+        ranks = np.append(unique_ranks, matcher.no_match)[codes]
+        hits = np.vstack([matcher.condition_hits(uniques), np.zeros((1, len(matcher.conditional_rules)), dtype=bool)])
+        for j, (rank, rule) in enumerate(matcher.conditional_rules):
+            applies = hits[codes, j] & rule.applies(amounts, account_type) & (rank < ranks)
+            ranks = np.where(applies, rank, ranks)
+        return pd.Series(matcher.rank_labels[ranks], index=merchants.index, name="category")
+
+    if cache is None:
+        unique_ranks = np.fromiter((matcher.match_rank(m) for m in uniques), dtype=np.intp, count=len(uniques))
+        unique_labels = matcher.rank_labels[unique_ranks]
+    else:
+        unique_labels = np.empty(len(uniques), dtype=object)
+        for i, merchant in enumerate(uniques):
+            category = cache.get(matcher.fingerprint, merchant)
+            if category is None:
+                category = matcher.rank_labels[matcher.match_rank(merchant)]
+                cache.put(matcher.fingerprint, merchant, category)
+            unique_labels[i] = category
+
+    # Trailing default slot doubles as the label for missing values (code -1)
+    unique_labels = np.append(unique_labels, matcher.default)
+    return pd.Series(unique_labels[codes], index=merchants.index, name="category")
+
+
+def classify_series(descriptions: pd.Series, categories: dict, cache: ClassificationCache = None,
+                    amounts: np.ndarray = None, account_type: str = None) -> pd.Series:
+    """Classify a Series of descriptions, matching each distinct merchant only once.
+
+    Descriptions repeat heavily across statements and differ mostly in store
+    numbers and spacing, so they are reduced to merchant IDs first and only
+    those go through the matcher. ``amounts`` and ``account_type`` are as in
+    classify_merchants.
+    """
+    return classify_merchants(merchant_ids(descriptions), categories, cache=cache, amounts=amounts, account_type=account_type)
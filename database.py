@@ -0,0 +1,269 @@
+"""Optional SQLite backend for dashboard queries.
+
+Each session can keep an embedded database next to its Parquet partitions,
+holding accounts, category definitions and transactions. Dashboard aggregates
+and the transaction table are then computed by SQL over indexed rows instead
+of loading an account's history into pandas. The Parquet store stays the
+source of truth: the database is synced from it partition by partition, so an
+append or re-classify only reloads the partitions it touched.
+"""
+
+import datetime
+import json
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+from storage import account_partitions, data_version, read_partition
+
+DB_FILENAME = "transactions.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    account_type TEXT,
+    file_path TEXT
+);
+CREATE TABLE IF NOT EXISTS partitions (
+    path TEXT PRIMARY KEY,
+    account TEXT NOT NULL,
+    version TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    account TEXT NOT NULL,
+    partition TEXT NOT NULL,
+    date TEXT NOT NULL,
+    month TEXT NOT NULL,
+    description TEXT,
+    debit REAL NOT NULL DEFAULT 0,
+    credit REAL NOT NULL DEFAULT 0,
+    category TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_account_date ON transactions (account, date);
+CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions (category);
+CREATE INDEX IF NOT EXISTS idx_transactions_partition ON transactions (partition);
+CREATE TABLE IF NOT EXISTS categories (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    definition TEXT NOT NULL
+);
+"""
+
+# Dates are stored as ISO text, which sorts and compares chronologically
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Columns the transaction table can be sorted on (result column -> SQL expression)
+SORT_COLUMNS = {
+    "date": "t.date",
+    "debit": "t.debit",
+    "description": "t.description",
+    "category": "t.category",
+    "account_name": "a.name",
+}
+
+
+def _placeholders(values) -> str:
+    return ", ".join("?" for _ in values)
+
+
+def _date_bounds(start_date: datetime.date, end_date: datetime.date) -> tuple[str, str]:
+    """Half-open [start, day after end) bounds as stored date strings."""
+    return (
+        pd.Timestamp(start_date).strftime(DATE_FORMAT),
+        (pd.Timestamp(end_date) + pd.Timedelta(days=1)).strftime(DATE_FORMAT),
+    )
+
+
+class SessionDatabase:
+    """SQLite database for one session, usable as a context manager."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def sync_accounts(self, accounts: dict):
+        """Mirror the account configs, dropping the rows of accounts that no longer exist."""
+        with self._conn:
+            removed = [
+                key for (key,) in self._conn.execute("SELECT key FROM accounts")
+                if key not in accounts
+            ]
+            for key in removed:
+                self._conn.execute("DELETE FROM transactions WHERE account = ?", (key,))
+                self._conn.execute("DELETE FROM partitions WHERE account = ?", (key,))
+                self._conn.execute("DELETE FROM accounts WHERE key = ?", (key,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO accounts (key, name, account_type, file_path) VALUES (?, ?, ?, ?)",
+                [
+                    (key, config["name"], config.get("account_type"), config["file_path"])
+                    for key, config in accounts.items()
+                ],
+            )
+
+    def save_categories(self, categories: dict):
+        """Replace the stored category definitions (order is kept in ``position``)."""
+        with self._conn:
+            self._conn.execute("DELETE FROM categories")
+            self._conn.executemany(
+                "INSERT INTO categories (name, position, definition) VALUES (?, ?, ?)",
+                [
+                    (name, position, json.dumps(definition, ensure_ascii=False))
+                    for position, (name, definition) in enumerate(categories.items())
+                ],
+            )
+
+    def load_categories(self) -> dict:
+        """Category definitions saved by save_categories ({} if none)."""
+        rows = self._conn.execute("SELECT name, definition FROM categories ORDER BY position")
+        return {name: json.loads(definition) for name, definition in rows}
+
+    def sync_sources(self, sources: tuple) -> int:
+        """Bring the given accounts' rows up to date with their Parquet partitions.
+
+        ``sources`` are (key, file_path, name, version) tuples. Only partitions
+        that are new, rewritten or removed since the last sync are touched.
+        Returns the number of rows loaded.
+        """
+        loaded = 0
+        with self._conn:
+            for key, file_path, name, _ in sources:
+                self._conn.execute(
+                    "INSERT INTO accounts (key, name, file_path) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET name = excluded.name, file_path = excluded.file_path",
+                    (key, name, file_path),
+                )
+                current = {str(p): data_version(p) for p in account_partitions(Path(file_path))}
+                stored = dict(self._conn.execute("SELECT path, version FROM partitions WHERE account = ?", (key,)))
+
+                for path, version in stored.items():
+                    if current.get(path) != version:
+                        self._conn.execute("DELETE FROM transactions WHERE partition = ?", (path,))
+                        self._conn.execute("DELETE FROM partitions WHERE path = ?", (path,))
+                for path, version in current.items():
+                    if stored.get(path) != version:
+                        loaded += self._insert_partition(key, path)
+                        self._conn.execute(
+                            "INSERT INTO partitions (path, account, version) VALUES (?, ?, ?)", (path, key, version)
+                        )
+        return loaded
+
+    def _insert_partition(self, account_key: str, path: str) -> int:
+        df = read_partition(Path(path), columns=["date", "description", "debit", "credit", "category"])
+        df = df.dropna(subset=["date"])
+        rows = zip(
+            df["date"].dt.strftime(DATE_FORMAT),
+            df["date"].dt.strftime("%Y-%m"),
+            df["description"].astype(str),
+            df["debit"].fillna(0).astype(float),
+            df["credit"].fillna(0).astype(float),
+            df["category"].astype(str),
+        )
+        self._conn.executemany(
+            "INSERT INTO transactions (account, partition, date, month, description, debit, credit, category) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((account_key, path, *row) for row in rows),
+        )
+        return len(df)
+
+    def _range_filter(self, account_keys: list, start_date: datetime.date, end_date: datetime.date) -> tuple[str, list]:
+        start, end = _date_bounds(start_date, end_date)
+        return (
+            f"t.account IN ({_placeholders(account_keys)}) AND t.date >= ? AND t.date < ?",
+            [*account_keys, start, end],
+        )
+
+    def count_in_range(self, account_keys: list, start_date: datetime.date, end_date: datetime.date) -> int:
+        """Number of transactions of the accounts within the date range."""
+        where, params = self._range_filter(account_keys, start_date, end_date)
+        return self._conn.execute(f"SELECT COUNT(*) FROM transactions t WHERE {where}", params).fetchone()[0]
+
+    def spending_cube(self, account_keys: list, start_date: datetime.date, end_date: datetime.date,
+                      excluded_categories: set) -> pd.DataFrame:
+        """Month x category debit sums and counts over spending rows in the date range.
+
+        Same shape as aggregates.build_cube; several accounts add an ``account`` key.
+        """
+        where, params = self._range_filter(account_keys, start_date, end_date)
+        excluded = sorted(excluded_categories)
+        # Several accounts keep the account as a key, like the combined cube
+        group = "t.account, " if len(account_keys) > 1 else ""
+        query = (
+            f"SELECT {'t.account AS account, ' if group else ''}t.month AS month_order, t.category AS category, "
+            "SUM(t.debit) AS debit_sum, COUNT(*) AS count "
+            f"FROM transactions t WHERE {where} AND t.debit > 0 "
+            f"AND t.category NOT IN ({_placeholders(excluded)}) "
+            f"GROUP BY {group}t.month, t.category ORDER BY {group}t.month, t.category"
+        )
+        cube = pd.read_sql_query(query, self._conn, params=[*params, *excluded])
+        cube["count"] = cube["count"].astype("int64")
+        return cube
+
+    def _spending_filter(self, account_keys: list, start_date: datetime.date, end_date: datetime.date,
+                         excluded_categories: set, categories: tuple, months: tuple, descriptions: tuple) -> tuple[str, list]:
+        """WHERE clause and parameters selecting the transaction table's spending rows."""
+        where, params = self._range_filter(account_keys, start_date, end_date)
+        excluded = sorted(excluded_categories)
+        where += f" AND t.debit > 0 AND t.category NOT IN ({_placeholders(excluded)})"
+        params += excluded
+        if categories:
+            where += f" AND t.category IN ({_placeholders(categories)})"
+            params += list(categories)
+        if months:
+            where += f" AND t.month IN ({_placeholders(months)})"
+            params += list(months)
+        if descriptions is not None:
+            # One JSON parameter, so any number of search matches fits in the query
+            where += " AND t.description IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(descriptions)))
+        return where, params
+
+    def spending_transactions(self, account_keys: list, start_date: datetime.date, end_date: datetime.date,
+                              excluded_categories: set, categories: tuple = (), months: tuple = (),
+                              descriptions: tuple = None, order_by: str = "date", descending: bool = True,
+                              limit: int = None, offset: int = 0) -> pd.DataFrame:
+        """Spending rows in the date range, optionally limited to some categories, months (YYYY-MM)
+        and descriptions.
+
+        Rows are sorted on ``order_by`` (a SORT_COLUMNS key; ties newest first)
+        and, with ``limit``, only one page of them is read.
+        """
+        where, params = self._spending_filter(
+            account_keys, start_date, end_date, excluded_categories, categories, months, descriptions
+        )
+        query = (
+            "SELECT t.date AS date, t.account AS account, a.name AS account_name, t.description AS description, "
+            "t.debit AS debit, t.credit AS credit, t.category AS category, t.month AS month_order "
+            "FROM transactions t JOIN accounts a ON a.key = t.account "
+            f"WHERE {where} ORDER BY {SORT_COLUMNS[order_by]} {'DESC' if descending else 'ASC'}, t.date DESC, t.rowid"
+        )
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        df = pd.read_sql_query(query, self._conn, params=params)
+        df["date"] = pd.to_datetime(df["date"], format=DATE_FORMAT)
+        return df
+
+    def spending_summary(self, account_keys: list, start_date: datetime.date, end_date: datetime.date,
+                         excluded_categories: set, categories: tuple = (), months: tuple = (),
+                         descriptions: tuple = None) -> tuple[int, float]:
+        """Number and debit sum of the rows spending_transactions() would return."""
+        where, params = self._spending_filter(
+            account_keys, start_date, end_date, excluded_categories, categories, months, descriptions
+        )
+        count, total = self._conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(t.debit), 0) FROM transactions t WHERE {where}", params
+        ).fetchone()
+        return count, total
@@ -0,0 +1,90 @@
+"""Hash-based transaction deduplication.
+
+Transactions are identified by a 64-bit hash of their normalized key columns
+instead of a concatenated "date|description|amount" string, and accounts keep
+a persistent index of the hashes they already store so overlapping uploads
+can be filtered in time proportional to the new rows.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Columns that identify a transaction in classified account data
+TRANSACTION_KEY_COLUMNS = ["date", "description", "debit", "credit"]
+
+
+def _normalize_key_column(values: pd.Series) -> pd.Series:
+    """Canonical form of a key column: dates as int64, numbers as float64, anything else as str."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype("datetime64[ns]").astype("int64")
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        return values.astype("float64")
+    return values.astype(str)
+
+
+def transaction_hashes(df: pd.DataFrame, columns: list = TRANSACTION_KEY_COLUMNS) -> np.ndarray:
+    """Hash each row's key columns into a uint64 (vectorized, no per-row strings)."""
+    if df.empty:
+        return np.empty(0, dtype=np.uint64)
+    key = pd.DataFrame({i: _normalize_key_column(df[col]) for i, col in enumerate(columns)})
+    return pd.util.hash_pandas_object(key, index=False).to_numpy(dtype=np.uint64)
+
+
+def duplicated_hashes(hashes: np.ndarray) -> np.ndarray:
+    """Boolean mask marking repeats of an earlier hash in the same array (keep="first")."""
+    return pd.Series(hashes).duplicated().to_numpy()
+
+
+class DedupIndex:
+    """Sorted set of transaction hashes, optionally persisted as a .npy file."""
+
+    def __init__(self, hashes: np.ndarray = None, path: Path = None):
+        self.path = Path(path) if path is not None else None
+        self._hashes = np.unique(hashes).astype(np.uint64) if hashes is not None else np.empty(0, dtype=np.uint64)
+
+    @classmethod
+    def load(cls, path: Path) -> "DedupIndex":
+        """Load an index saved at ``path`` (empty if it doesn't exist yet)."""
+        path = Path(path)
+        hashes = np.load(path) if path.exists() else None
+        return cls(hashes, path=path)
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Boolean mask of which ``hashes`` are already in the index."""
+        if len(self._hashes) == 0 or len(hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        pos = np.searchsorted(self._hashes, hashes)
+        pos[pos == len(self._hashes)] = 0
+        return self._hashes[pos] == hashes
+
+    def add(self, hashes: np.ndarray):
+        """Add hashes to the index.
+
+        Only the new hashes are sorted; they are merged into the sorted index at
+        their insertion points instead of re-sorting everything.
+        """
+        new = np.unique(np.asarray(hashes, dtype=np.uint64))
+        new = new[~self.contains(new)]
+        if len(new):
+            self._hashes = np.insert(self._hashes, np.searchsorted(self._hashes, new), new)
+
+    def filter_new(self, hashes: np.ndarray) -> np.ndarray:
+        """Mask of rows to keep: not in the index and not repeated earlier in ``hashes``.
+
+        The kept hashes are added to the index.
+        """
+        keep = ~self.contains(hashes) & ~duplicated_hashes(hashes)
+        self.add(hashes[keep])
+        return keep
+
+    def save(self, path: Path = None):
+        """Write the index to ``path`` (or the path it was loaded from)."""
+        path = Path(path) if path is not None else self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.save(f, self._hashes)
@@ -6,39 +6,26 @@ This prevents double-counting since Brydon is a supplementary cardholder on Kenn
 import pandas as pd
 from pathlib import Path
 
+from dedup import DedupIndex, transaction_hashes
+from parsers import read_amex_sheet
+
 # File paths
 KENNEDY_XLS = Path("data/raw/amex_credit_card/Kennedy Amex - 2025.xls")
 BRYDON_XLS = Path("data/raw/amex_credit_card/Brydon Amex - 2025.xls")
 OUTPUT_XLS = Path("data/raw/amex_credit_card/Kennedy Amex - 2025.xls")  # Overwrite original
 
 
-def get_header_info(file_path: Path) -> tuple[int, list]:
-    """Get header row index and column names from Amex XLS."""
-    df = pd.read_excel(file_path, header=None)
-    
-    for idx, row in df.iterrows():
-        if str(row.iloc[0]).strip() == "Date":
-            header_values = [str(v).strip() for v in row.values]
-            return idx, header_values
-    
-    raise ValueError(f"Could not find header row in {file_path}")
-
-
-def parse_transactions(file_path: Path, header_row: int, header_values: list) -> pd.DataFrame:
-    """Parse transactions from Amex XLS."""
+def parse_transactions(sheet: pd.DataFrame, header_row: int, header_values: list) -> pd.DataFrame:
+    """Parse transactions from an Amex sheet read by read_amex_sheet."""
     # Find column indices
     desc_col = header_values.index("Description") if "Description" in header_values else 2
     amount_col = header_values.index("Amount") if "Amount" in header_values else 3
     
-    # Read transactions (skip to after header)
-    df = pd.read_excel(file_path, skiprows=header_row + 1, header=None)
+    # Transactions are the rows below the header
+    df = sheet.iloc[header_row + 1:].copy()
     
-    # Create dedup key from date, description, amount
-    df["_key"] = (
-        df.iloc[:, 0].astype(str) + "|" + 
-        df.iloc[:, desc_col].astype(str) + "|" + 
-        df.iloc[:, amount_col].astype(str)
-    )
+    # Hash dedup key from date, description, amount
+    df["_key"] = transaction_hashes(df, [df.columns[0], df.columns[desc_col], df.columns[amount_col]])
     
     return df
 
@@ -50,20 +37,20 @@ def main():
     
     # Get header info from both files
     print(f"\nReading Kennedy Amex: {KENNEDY_XLS}")
-    kennedy_header_row, kennedy_header_values = get_header_info(KENNEDY_XLS)
-    kennedy_txns = parse_transactions(KENNEDY_XLS, kennedy_header_row, kennedy_header_values)
+    kennedy_header_row, kennedy_header_values, kennedy_sheet = read_amex_sheet(KENNEDY_XLS)
+    kennedy_txns = parse_transactions(kennedy_sheet, kennedy_header_row, kennedy_header_values)
     print(f"  Found {len(kennedy_txns)} transactions")
     
     print(f"\nReading Brydon Amex: {BRYDON_XLS}")
-    brydon_header_row, brydon_header_values = get_header_info(BRYDON_XLS)
-    brydon_txns = parse_transactions(BRYDON_XLS, brydon_header_row, brydon_header_values)
+    brydon_header_row, brydon_header_values, brydon_sheet = read_amex_sheet(BRYDON_XLS)
+    brydon_txns = parse_transactions(brydon_sheet, brydon_header_row, brydon_header_values)
     print(f"  Found {len(brydon_txns)} transactions")
     
     # Find Brydon's transaction keys
-    brydon_keys = set(brydon_txns["_key"])
+    brydon_keys = DedupIndex(brydon_txns["_key"].to_numpy())
     
     # Mark duplicates in Kennedy
-    kennedy_txns["_is_duplicate"] = kennedy_txns["_key"].isin(brydon_keys)
+    kennedy_txns["_is_duplicate"] = brydon_keys.contains(kennedy_txns["_key"].to_numpy())
     
     duplicates = kennedy_txns[kennedy_txns["_is_duplicate"]]
     print(f"\nFound {len(duplicates)} duplicate transactions to remove")
@@ -90,15 +77,13 @@ def main():
     print(f"Removed: {len(kennedy_txns) - len(kennedy_filtered)} transactions")
     
     # Now rebuild the full XLS with header rows + filtered transactions
-    full_df = pd.read_excel(KENNEDY_XLS, header=None)
-    
     # Get header section (everything up to and including header row)
-    header_section = full_df.iloc[:kennedy_header_row + 2]  # +2 because: rows 0 to header_row, plus the header row itself
+    header_section = kennedy_sheet.iloc[:kennedy_header_row + 1]
     
     # Combine header section with filtered transactions
     result_df = pd.concat([header_section, kennedy_filtered], ignore_index=True)
     
-    print(f"\nOriginal file: {len(full_df)} total rows")
+    print(f"\nOriginal file: {len(kennedy_sheet)} total rows")
     print(f"New file: {len(result_df)} total rows")
     
     # Save back to XLS
@@ -1,5 +1,165 @@
+"""Headless pipeline: load a directory of bank statements into a dashboard session.
+
+    uv run python main.py STATEMENTS_DIR --session household
+
+Every subdirectory of STATEMENTS_DIR holds the exports of one account and is
+named after it (``td_visa/`` becomes "Td Visa"); a statement file directly in
+STATEMENTS_DIR is an account of its own. The account type is detected from the
+files (see parsers.detect_account_type) unless given with ``--type``.
+
+Accounts are parsed, classified and written in parallel worker processes with
+the dashboard's own parsers and classifier, into the same session storage the
+dashboard reads. Open the printed ``http://localhost:8501/?session=<id>&token=<token>``
+link to view them; the token is issued once per session and kept in its directory.
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+from pathlib import Path
+
+from parsers import detect_account_type, iter_statement_chunks
+from perf import PerfRun
+
+STATEMENT_SUFFIXES = {".csv", ".xls", ".xlsx"}
+
+
+def _import_app():
+    """Import the dashboard module without Streamlit's bare-mode warnings."""
+    # Only Streamlit's own warnings about running outside `streamlit run`; anything else still shows
+    warnings.filterwarnings("ignore", module=r"streamlit(\.|$)")
+    warnings.filterwarnings("ignore", message=r".*(ScriptRunContext|bare mode)")
+    from streamlit import config as streamlit_config, logger as streamlit_logger
+    # Quiet only Streamlit's loggers; the app's own keeps its level (SPEND_BREAKDOWN_LOG_LEVEL).
+    # Parsing the config first, since that resets Streamlit's level.
+    streamlit_config.get_config_options()
+    streamlit_logger.set_log_level("error")
+    import app
+    return app
+
+
+def find_accounts(statements_dir: Path) -> dict[str, list[Path]]:
+    """Map account names to their statement files (sorted, so statements are read oldest first by name)."""
+    accounts = {}
+    for entry in sorted(statements_dir.iterdir()):
+        if entry.name.startswith("."):
+            continue
+        if entry.is_dir():
+            files = sorted(p for p in entry.iterdir() if p.suffix.lower() in STATEMENT_SUFFIXES)
+            name = entry.name
+        elif entry.suffix.lower() in STATEMENT_SUFFIXES:
+            files = [entry]
+            name = entry.stem
+        else:
+            continue
+        if files:
+            # Same naming the upload form suggests from a file name
+            accounts[name.replace("_", " ").replace("-", " ").title()] = files
+    return accounts
+
+
+def store_account(account_type: str, files: list[Path], output_path: Path, categories: dict, append: bool) -> tuple:
+    """Worker: parse, classify and write one account. Returns the rows stored and the stage timings."""
+    app = _import_app()
+    perf = PerfRun(f"cli:{account_type}")
+    with ExitStack() as stack:
+        statements = [stack.enter_context(open(path, "rb")) for path in files]
+        chunks = perf.iter(f"parse:{account_type}", iter_statement_chunks(account_type, statements))
+        row_count, _, _ = app.store_account_chunks(
+            chunks, output_path, categories, append=append, perf=perf, account_type=account_type
+        )
+    perf.finish()
+    return row_count, perf
+
+
 def main():
-    print("Hello from spend-breakdown!")
+    parser = argparse.ArgumentParser(description="Load a directory of bank statements into a dashboard session.")
+    parser.add_argument("statements_dir", type=Path, help="one subdirectory (or file) per account")
+    parser.add_argument("--session", default=None, help="session id to write to (default: a new one)")
+    parser.add_argument("--type", action="append", default=[], metavar="ACCOUNT=TYPE",
+                        help="account type for an account, overriding detection (td_chequing, td_credit_card, amex)")
+    parser.add_argument("--append", action="store_true", help="add only new transactions to existing accounts")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="accounts processed in parallel")
+    args = parser.parse_args()
+
+    app = _import_app()
+    session_id = args.session or str(uuid.uuid4())[:8]
+    if not app.SESSION_ID_PATTERN.fullmatch(session_id):
+        parser.error("--session may only contain letters, digits, '_' and '-'")
+    app.st.session_state.session_id = session_id
+    _, _, uploads_dir = app.get_session_paths()
+
+    found = find_accounts(args.statements_dir)
+    if not found:
+        parser.error(f"no statement files found in {args.statements_dir}")
+    type_overrides = {}
+    for override in args.type:
+        name, _, account_type = override.partition("=")
+        if account_type not in app.ACCOUNT_TYPES:
+            parser.error(f"unknown account type in --type {override}")
+        type_overrides[app.make_account_key(name)] = account_type
+
+    # A plain copy: the built-in defaults are a read-only mapping, which can't be sent to workers
+    categories = dict(app.get_active_categories())
+    accounts = app.load_user_accounts()
+    jobs = {}
+    for name, files in found.items():
+        account_key = app.make_account_key(name)
+        existing = accounts.get(account_key)
+        append = args.append and existing is not None and Path(existing["file_path"]).exists()
+        output_path = Path(existing["file_path"]) if append else app.account_data_path(uploads_dir, account_key)
+        try:
+            account_type = type_overrides.get(account_key) or detect_account_type(files)
+        except (OSError, ValueError) as e:
+            print(f"{name}: skipped ({e})")
+            continue
+        jobs[account_key] = (name, account_type, files, output_path, append)
+
+    print(f"Session {session_id}: processing {len(jobs)} account(s) with {min(args.workers, len(jobs))} worker(s)")
+    started = time.perf_counter()
+    results, failures = {}, 0
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(jobs)))) as pool:
+        futures = {
+            pool.submit(store_account, account_type, files, output_path, categories, append): account_key
+            for account_key, (_, account_type, files, output_path, append) in jobs.items()
+        }
+        for future in as_completed(futures):
+            account_key = futures[future]
+            name, account_type, files = jobs[account_key][:3]
+            try:
+                row_count, perf = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"  {name}: failed ({e})")
+                continue
+            results[account_key] = row_count
+            slowest = max(perf.stages.values(), key=lambda t: t.seconds)
+            print(f"  {name} ({app.ACCOUNT_TYPES[account_type]}, {len(files)} file(s)): {row_count:,} transactions "
+                  f"in {perf.total_seconds:.2f}s (slowest stage: {slowest.name} {slowest.seconds:.2f}s)")
+
+    # Accounts are registered in one pass so parallel workers never race on
+    # user_accounts.json, and the combined dataset is rebuilt only once
+    fingerprint = app.save_category_snapshot(categories)
+    for account_key, row_count in results.items():
+        name, account_type, files, output_path, append = jobs[account_key]
+        if row_count == 0:
+            continue
+        original_filename = files[0].name if len(files) == 1 else f"{len(files)} {files[0].suffix.lstrip('.').upper()} files"
+        accounts[account_key] = app.account_config(
+            accounts.get(account_key) if append else None, name, account_type, original_filename, output_path, fingerprint
+        )
+    app.save_user_accounts(accounts)
+    app.refresh_combined_data(accounts)
+
+    print(f"Stored {sum(results.values()):,} transactions in {time.perf_counter() - started:.2f}s")
+    print(f"View them at http://localhost:8501/?session={session_id}&token={app.issue_session_token(session_id)}")
+    if failures:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
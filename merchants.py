@@ -0,0 +1,99 @@
+"""Merchant normalization: raw transaction descriptions to canonical merchant IDs.
+
+Exports spell one merchant many ways: store numbers ("TIM HORTONS #1234"),
+payment-processor prefixes with varying spacing ("SQ *CAFE", "SQ*CAFE"),
+fixed-width padding, and a few merchants with several names altogether.
+merchant_id() reduces a description to one canonical ID with compiled regex
+rules and a dictionary of known aliases, so classification and its cache work
+once per merchant instead of once per spelling.
+
+Category keywords go through the same rules (merchant_keyword), so a keyword
+keeps matching what it matched in the raw descriptions: "TST*" still catches
+every Toast restaurant, "FN               MTG" its padded export.
+"""
+
+import hashlib
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+# Applied in order to the upper-cased description (and to category keywords)
+MERCHANT_RULES = [
+    # Store and location numbers: "TIM HORTONS #1234", "SHOPPERS # 12"
+    (re.compile(r"\s*#\s*\d+"), " "),
+    # Processor and marketplace separators: "SQ *CAFE", "TST*CAFE", "UBER *TRIP" -> "SQ* CAFE"
+    (re.compile(r"\s*\*\s*"), "* "),
+    # Fixed-width padding and other runs of whitespace
+    (re.compile(r"\s+"), " "),
+]
+
+# Merchants whose spellings differ by more than the rules normalize, keyed by
+# the normalized spelling. Canonical names are spellings the built-in
+# keywords already match, so aliasing never changes a category.
+MERCHANT_ALIASES = {
+    "UBER CANADA/UBERTRIP": "UBER* TRIP",
+    "UBER CANADA/UBEREATS": "UBER* EATS",
+    "UBEREATS": "UBER* EATS",
+}
+
+# Changes whenever the rules or aliases do, so results memoized per merchant ID expire with them
+MERCHANT_RULES_FINGERPRINT = hashlib.sha1(
+    json.dumps([[pattern.pattern, replacement] for pattern, replacement in MERCHANT_RULES] + [MERCHANT_ALIASES]).encode("utf-8")
+).hexdigest()
+
+
+def _apply_rules(text: str) -> str:
+    text = text.upper()
+    for pattern, replacement in MERCHANT_RULES:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def merchant_id(description: str) -> str:
+    """Canonical merchant ID of a description ("Tim Hortons  #1234" -> "TIM HORTONS")."""
+    merchant = _apply_rules(description).strip()
+    return MERCHANT_ALIASES.get(merchant, merchant)
+
+
+def merchant_keyword(keyword: str) -> str:
+    """A category keyword in the form it is matched against merchant IDs.
+
+    Only the rules apply (aliases name whole merchants, a keyword can be part
+    of one), and edge spaces are kept: "SPA " is meant to match a word end.
+    """
+    return _apply_rules(keyword)
+
+
+def _alphanumeric(text: str) -> str:
+    return re.sub(r"[^0-9A-Z]", "", text.upper())
+
+
+def keyword_warning(keyword: str) -> str | None:
+    """Why a category keyword may not match what it says, or None.
+
+    Matching is against merchant IDs, so a keyword whose letters or digits the
+    rules drop ("STORE #12" is matched as "STORE", every store), or that only
+    appears in a spelling an alias replaces ("UBER CANADA" in
+    "UBER CANADA/UBEREATS", read as "UBER* EATS"), doesn't match as written.
+    """
+    normalized = merchant_keyword(keyword).strip()
+    if _alphanumeric(normalized) != _alphanumeric(keyword):
+        return f'"{keyword}" is matched as "{normalized}" (store numbers are dropped from merchant IDs)'
+    for spelling, canonical in MERCHANT_ALIASES.items():
+        if normalized and normalized in spelling and normalized not in canonical:
+            return f'"{keyword}" doesn\'t match "{spelling}", which is read as merchant "{canonical}"'
+    return None
+
+
+def merchant_ids(descriptions: pd.Series) -> pd.Series:
+    """Categorical merchant ID for each description, normalizing each distinct description once.
+
+    Missing descriptions stay missing.
+    """
+    codes, uniques = pd.factorize(descriptions, sort=False)
+    merchant_codes, merchants = pd.factorize(np.array([merchant_id(str(d)) for d in uniques], dtype=object), sort=False)
+    # Trailing -1 keeps missing descriptions (code -1) missing
+    codes = np.append(merchant_codes, -1)[codes]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=merchants), index=descriptions.index, name="merchant")
@@ -0,0 +1,271 @@
+"""Bank export readers shared by the dashboard and the scripts."""
+
+import importlib.util
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dedup import TRANSACTION_KEY_COLUMNS, DedupIndex, transaction_hashes
+
+# Amex exports put a few summary rows above the transaction header; it is
+# looked for only in the first column of this many rows
+AMEX_HEADER_SCAN_ROWS = 50
+
+
+def excel_engine(filename: str) -> str | None:
+    """Excel engine for a workbook: python-calamine for .xlsx when installed, else pandas' default."""
+    if str(filename).lower().endswith(".xlsx") and importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return None
+
+
+def find_header_row(first_column: pd.Series, label: str = "Date") -> int | None:
+    """Position of the first cell equal to ``label`` (ignoring surrounding whitespace), or None."""
+    matches = np.flatnonzero(first_column.astype(str).str.strip().to_numpy() == label)
+    return int(matches[0]) if len(matches) else None
+
+
+def read_amex_sheet(source, filename: str = None, scan_rows: int = AMEX_HEADER_SCAN_ROWS) -> tuple[int, list, pd.DataFrame]:
+    """Read an Amex workbook once and split it at the "Date" header row.
+
+    ``source`` is a path or file-like object; ``filename`` (defaulting to its
+    name) picks the Excel engine. Returns the header row's position in the
+    sheet, the stripped header values, and the whole sheet (header=None) so
+    callers can slice the rows above or below the header without re-reading.
+    """
+    filename = filename or getattr(source, "name", str(source))
+    sheet = pd.read_excel(source, header=None, engine=excel_engine(filename))
+    header_row = find_header_row(sheet.iloc[:scan_rows, 0])
+    if header_row is None:
+        raise ValueError(f"Could not find header row with 'Date' column in {filename}")
+    header_values = [str(v).strip() for v in sheet.iloc[header_row].values]
+    return header_row, header_values, sheet
+
+
+def parse_amex_xls(uploaded_file) -> pd.DataFrame:
+    """Parse Amex XLS file and return cleaned DataFrame."""
+    # Read the workbook once and locate the header row (contains "Date" in first column)
+    header_row, header_values, sheet = read_amex_sheet(uploaded_file)
+
+    # Find column indices dynamically (different Amex exports have different structures)
+    date_col = 0  # Always first
+    desc_col = header_values.index("Description") if "Description" in header_values else 2
+
+    # Find Amount column - may be at different positions
+    amount_col = None
+    for i, h in enumerate(header_values):
+        if h == "Amount":
+            amount_col = i
+            break
+    if amount_col is None:
+        amount_col = 3  # Fallback
+
+    # Transactions are the rows below the header
+    df = sheet.iloc[header_row + 1:]
+
+    # Extract columns dynamically
+    processed_df = pd.DataFrame({
+        "date": df.iloc[:, date_col],
+        "description": df.iloc[:, desc_col].astype(str),
+        "amount_str": df.iloc[:, amount_col].astype(str)
+    })
+
+    # Parse dates
+    processed_df["date"] = pd.to_datetime(processed_df["date"], format="mixed", dayfirst=True, errors="coerce")
+
+    # Parse amounts (remove $ and commas)
+    processed_df["debit"] = pd.to_numeric(
+        processed_df["amount_str"].str.replace(r'[$,]', '', regex=True),
+        errors="coerce"
+    ).abs()
+
+    # Drop invalid rows
+    processed_df = processed_df.dropna(subset=["date", "description"])
+    processed_df = processed_df[processed_df["description"].str.len() > 0]
+    processed_df = processed_df[~processed_df["description"].str.lower().isin(["nan", "none", ""])]
+
+    # Fill NaN amounts with 0
+    processed_df["debit"] = processed_df["debit"].fillna(0)
+    processed_df["credit"] = 0.0
+
+    # Drop temporary column
+    processed_df = processed_df.drop(columns=["amount_str"])
+
+    return processed_df
+
+
+# TD CSV exports (chequing and credit card) have no header row
+TD_CSV_COLUMNS = ["date", "description", "debit", "credit", "balance"]
+
+# Rows per chunk when streaming CSV exports into account storage
+INGEST_CHUNK_ROWS = 50_000
+
+# Threads used to parse multi-file statement uploads
+PARSE_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def _clean_td_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize raw TD CSV rows: parse dates and amounts, drop invalid rows and the balance column."""
+    # Parse dates (chequing: YYYY-MM-DD, credit card: MM/DD/YYYY)
+    df["date"] = pd.to_datetime(df["date"], format="mixed", errors="coerce")
+
+    # Clean up description
+    df["description"] = df["description"].astype(str).str.strip()
+
+    # Convert debit/credit to numeric
+    df["debit"] = pd.to_numeric(df["debit"], errors="coerce").fillna(0)
+    df["credit"] = pd.to_numeric(df["credit"], errors="coerce").fillna(0)
+
+    # Drop invalid rows
+    df = df.dropna(subset=["date"])
+    df = df[df["description"].str.len() > 0]
+    df = df[~df["description"].str.lower().isin(["nan", "none", ""])]
+
+    # Drop balance column
+    return df.drop(columns=["balance"], errors="ignore")
+
+
+def _file_size(uploaded_file) -> int:
+    """Size in bytes of an uploaded (file-like) object."""
+    size = getattr(uploaded_file, "size", None)
+    if size is None:
+        position = uploaded_file.tell()
+        size = uploaded_file.seek(0, 2)
+        uploaded_file.seek(position)
+    return max(size, 1)
+
+
+def iter_td_csv_chunks(uploaded_file, chunksize: int = INGEST_CHUNK_ROWS, progress=None):
+    """Yield cleaned chunks of a TD CSV export without loading the whole file.
+
+    ``progress`` is called with the fraction of the file consumed after each chunk.
+    """
+    size = _file_size(uploaded_file)
+    for chunk in pd.read_csv(uploaded_file, header=None, names=TD_CSV_COLUMNS, chunksize=chunksize):
+        yield _clean_td_frame(chunk)
+        if progress:
+            progress(min(uploaded_file.tell() / size, 1.0))
+
+
+def coalesce_chunks(chunks, chunksize: int = INGEST_CHUNK_ROWS):
+    """Combine consecutive small chunks into frames of up to ``chunksize`` rows.
+
+    Every chunk costs a pass through dedup, classification, partition writes
+    and cube building downstream, so a stack of monthly statements is handled
+    as a few large chunks rather than one small one per file. Chunks already
+    at least ``chunksize`` rows pass through as they are.
+    """
+    pending = []
+    rows = 0
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if pending and rows + len(chunk) > chunksize:
+            yield pd.concat(pending, ignore_index=True) if len(pending) > 1 else pending[0]
+            pending, rows = [], 0
+        pending.append(chunk)
+        rows += len(chunk)
+    if pending:
+        yield pd.concat(pending, ignore_index=True) if len(pending) > 1 else pending[0]
+
+
+def _iter_parsed_files(uploaded_files: list, progress=None):
+    """Parse whole TD CSV files on a thread pool, yielding them in upload order.
+
+    Only a bounded window of files is in flight, so memory doesn't grow with
+    the number of statements. Results are consumed in upload order, which keeps
+    downstream deduplication deterministic.
+    """
+    total = len(uploaded_files)
+    files = iter(uploaded_files)
+    with ThreadPoolExecutor(max_workers=PARSE_WORKERS) as pool:
+        pending = deque(
+            (f, pool.submit(parse_td_chequing_csv, f)) for f in islice(files, PARSE_WORKERS * 2)
+        )
+        done = 0
+        while pending:
+            uploaded_file, future = pending.popleft()
+            df = future.result()
+            next_file = next(files, None)
+            if next_file is not None:
+                pending.append((next_file, pool.submit(parse_td_chequing_csv, next_file)))
+            done += 1
+            if progress:
+                progress(done / total, f"parsed {done}/{total} files: {uploaded_file.name}")
+            yield df
+
+
+def iter_td_credit_card_chunks(uploaded_files: list, chunksize: int = INGEST_CHUNK_ROWS, progress=None):
+    """Yield cleaned, deduplicated chunks across several TD Credit Card CSVs.
+
+    Overlapping monthly statements repeat transactions; a row is dropped if the
+    same date + description + debit + credit was already seen in an earlier file
+    or chunk (equivalent to keep="first" over the concatenated files).
+    Several files are parsed in parallel and combined into chunks of up to
+    ``chunksize`` rows; a single large export is streamed in ``chunksize`` rows.
+    """
+    if len(uploaded_files) > 1:
+        chunks = _iter_parsed_files(uploaded_files, progress=progress)
+    elif uploaded_files:
+        chunks = iter_td_csv_chunks(uploaded_files[0], chunksize, progress=progress)
+    else:
+        chunks = iter(())
+
+    seen = DedupIndex()
+    for chunk in coalesce_chunks(chunks, chunksize):
+        # Deduplicate based on date + description + debit + credit
+        keep = seen.filter_new(transaction_hashes(chunk, TRANSACTION_KEY_COLUMNS))
+        yield chunk[keep]
+
+
+def parse_td_chequing_csv(uploaded_file) -> pd.DataFrame:
+    """Parse TD Chequing CSV file and return cleaned DataFrame."""
+    return _clean_td_frame(pd.read_csv(uploaded_file, header=None, names=TD_CSV_COLUMNS))
+
+
+def parse_td_credit_card_csvs(uploaded_files: list) -> pd.DataFrame:
+    """Parse multiple TD Credit Card CSV files, combine and deduplicate."""
+    chunks = list(iter_td_credit_card_chunks(uploaded_files))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+
+# First field of a TD CSV row: YYYY-MM-DD for chequing, MM/DD/YYYY for credit card
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}$")
+
+
+def detect_account_type(paths: list) -> str:
+    """Guess the account type of one account's statement files from their format."""
+    suffixes = {Path(p).suffix.lower() for p in paths}
+    if suffixes and suffixes <= {".xls", ".xlsx"}:
+        return "amex"
+    if suffixes != {".csv"}:
+        raise ValueError(f"Unrecognized statement files: {', '.join(sorted(suffixes)) or 'none'}")
+    with open(paths[0], "r") as f:
+        first_field = f.readline().split(",", 1)[0].strip().strip('"')
+    return "td_chequing" if _ISO_DATE.match(first_field) else "td_credit_card"
+
+
+def iter_statement_chunks(account_type: str, files: list, chunksize: int = INGEST_CHUNK_ROWS, progress=None):
+    """Yield cleaned chunks of one account's statement files (file-like objects).
+
+    Amex workbooks are parsed whole, TD Chequing exports are streamed one after
+    another, and TD Credit Card statements are deduplicated across files (see
+    iter_td_credit_card_chunks). Small files are combined into chunks of up to
+    ``chunksize`` rows.
+    """
+    if account_type == "amex":
+        yield from coalesce_chunks((parse_amex_xls(statement) for statement in files), chunksize)
+    elif account_type == "td_chequing":
+        yield from coalesce_chunks((chunk for statement in files for chunk in iter_td_csv_chunks(statement, chunksize)), chunksize)
+    elif account_type == "td_credit_card":
+        yield from iter_td_credit_card_chunks(files, chunksize, progress=progress)
+    else:
+        raise ValueError(f"Unknown account type: {account_type}")
@@ -0,0 +1,91 @@
+"""Lightweight per-stage timing for uploads and dashboard renders.
+
+A PerfRun collects wall-clock time, row counts and call counts per named stage
+(``with run.stage("classify") as s: ... s.rows += n``). Repeated entries into
+the same stage accumulate, so timing a per-chunk step costs one record, not
+one per chunk. Milestones such as time to first paint are recorded with
+``run.mark(name)``. Finished runs are emitted as one JSON log line per stage
+and mark.
+"""
+
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+logger = logging.getLogger("spend_breakdown.perf")
+
+
+@dataclass
+class StageTiming:
+    """Accumulated timing of one stage within a run."""
+
+    name: str
+    seconds: float = 0.0
+    rows: int = 0
+    calls: int = 0
+
+
+class PerfRun:
+    """Stage timings for one operation (an upload, a dashboard render)."""
+
+    def __init__(self, name: str, started: float = None):
+        self.name = name
+        self.run_id = uuid.uuid4().hex[:8]
+        self.stages: dict[str, StageTiming] = {}
+        self.marks: dict[str, float] = {}
+        self.total_seconds = None
+        # ``started`` (a time.perf_counter() value) backdates runs that began before the PerfRun existed
+        self._started = time.perf_counter() if started is None else started
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        """Time a block as part of stage ``name``; the yielded StageTiming's ``rows`` can be incremented."""
+        timing = self.stages.get(name)
+        if timing is None:
+            timing = self.stages[name] = StageTiming(name)
+        timing.rows += rows
+        start = time.perf_counter()
+        try:
+            yield timing
+        finally:
+            timing.seconds += time.perf_counter() - start
+            timing.calls += 1
+
+    def iter(self, name: str, iterable):
+        """Yield from ``iterable``, timing each step (and counting rows of sized items) as stage ``name``.
+
+        Lazily parsed chunks are produced inside the consumer's loop, so this
+        is how their parse time is separated from what is done with them.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as timing:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                timing.rows += len(item) if hasattr(item, "__len__") else 0
+            yield item
+
+    def mark(self, name: str):
+        """Record the seconds elapsed since the run started as milestone ``name`` (e.g. "first_paint")."""
+        self.marks.setdefault(name, time.perf_counter() - self._started)
+
+    def finish(self) -> "PerfRun":
+        """Stop the run clock and log each stage as a structured record."""
+        self.total_seconds = time.perf_counter() - self._started
+        for timing in self.stages.values():
+            logger.info(json.dumps({"event": "perf_stage", "run": self.name, "run_id": self.run_id, **asdict(timing)}))
+        for name, seconds in self.marks.items():
+            logger.info(json.dumps({"event": "perf_mark", "run": self.name, "run_id": self.run_id, "name": name, "seconds": seconds}))
+        logger.info(json.dumps({
+            "event": "perf_run", "run": self.name, "run_id": self.run_id, "seconds": self.total_seconds,
+        }))
+        return self
+
+    def as_records(self) -> list[dict]:
+        """Stages as dicts (name, seconds, rows, calls), in the order they first ran."""
+        return [asdict(timing) for timing in self.stages.values()]
@@ -0,0 +1,311 @@
+"""Description search index for the transaction explorer.
+
+Each account keeps an inverted index over its distinct descriptions, saved
+next to its data and extended as uploads add new descriptions. Trigram
+postings answer substring queries and a sorted token list answers prefix
+queries, so a search touches only the descriptions that can match instead of
+scanning every transaction. Results are descriptions; the transaction table
+then filters rows to them.
+
+Postings are kept as flat numpy arrays (sorted keys, offsets and description
+ids) and built from Arrow string buffers in batches, so indexing stays
+vectorized and its memory is bounded by the batch size plus the index itself.
+Trigrams are taken over the UTF-8 bytes of the normalized text, which finds the
+same substrings as character trigrams.
+"""
+
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+GRAM = 3
+# Tokens are runs of these characters; everything else separates them
+TOKEN_SEPARATOR = r"[^0-9a-z]+"
+
+# Descriptions indexed per batch, postings copied per step when merging, and
+# the number of length groups descriptions are deduplicated in
+_BATCH_DESCRIPTIONS = 20_000
+_MERGE_BLOCK = 1 << 18
+_DISTINCT_GROUPS = 8
+
+
+def _normalize_array(values: pa.Array) -> pa.Array:
+    """Lower-cased text with runs of whitespace collapsed (the form that is indexed and searched)."""
+    lowered = pc.utf8_lower(values)
+    # Most descriptions are already single-spaced; only rewrite the ones that aren't
+    irregular = pc.match_substring_regex(lowered, r"\s\s|^\s|\s$|[^\S ]")
+    if not pc.any(irregular).as_py():
+        return lowered
+    collapsed = pc.replace_substring_regex(lowered.filter(irregular), r"\s+", " ")
+    return pc.replace_with_mask(lowered, irregular, pc.utf8_trim(collapsed, " "))
+
+
+def _normalize(text: str) -> str:
+    return _normalize_array(pa.array([text], type=pa.large_string()))[0].as_py()
+
+
+def _string_buffers(values: pa.Array) -> tuple[np.ndarray, np.ndarray]:
+    """UTF-8 bytes and int64 offsets of a large_string array without nulls (offsets start at 0)."""
+    if not len(values):
+        return np.zeros(0, dtype=np.uint8), np.zeros(1, dtype=np.int64)
+    offsets = np.frombuffer(values.buffers()[1], dtype=np.int64)[values.offset:values.offset + len(values) + 1]
+    data = values.buffers()[2]
+    data = np.frombuffer(data, dtype=np.uint8) if data is not None else np.zeros(0, dtype=np.uint8)
+    return data[offsets[0]:offsets[-1]], offsets - offsets[0]
+
+
+def _gram_codes(data: np.ndarray) -> np.ndarray:
+    """Each byte trigram of ``data`` as one integer."""
+    data = data.astype(np.uint32)
+    return (data[:-2] << 16) | (data[1:-1] << 8) | data[2:]
+
+
+def _postings(keys: np.ndarray, ids: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(key, id) pairs (keys as integers < 2**32) as sorted keys, offsets and one flat id array."""
+    pairs = (keys.astype(np.uint64) << np.uint64(32)) | ids.astype(np.uint64)
+    # Sorting and dropping repeats directly is much faster than np.unique's hashing here
+    pairs.sort()
+    pairs = pairs[np.append(True, pairs[1:] != pairs[:-1])] if len(pairs) else pairs
+    keys = (pairs >> np.uint64(32)).astype(np.uint32)
+    starts = np.flatnonzero(np.append(True, keys[1:] != keys[:-1])) if len(keys) else np.zeros(0, dtype=np.int64)
+    offsets = np.append(starts, len(pairs)).astype(np.int64)
+    return keys[starts], offsets, (pairs & np.uint64(0xFFFFFFFF)).astype(np.int32)
+
+
+def _merge_postings(segments: list) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Merge posting segments whose ids increase from one segment to the next.
+
+    Segments are (keys, offsets, ids) tuples, or callables returning one. A
+    callable is called twice, once to lay out the merged lists and once to fill
+    them, so large segments need not all be held at once. Each key's merged
+    list is its lists from every segment, in segment order, so it stays sorted.
+    """
+    def materialize(segment):
+        return segment() if callable(segment) else segment
+
+    if len(segments) == 1:
+        return materialize(segments[0])
+    layouts = []
+    for segment in segments:
+        segment_keys, segment_offsets, _ = materialize(segment)
+        layouts.append((segment_keys, np.diff(segment_offsets)))
+    keys = np.unique(np.concatenate([segment_keys for segment_keys, _ in layouts]))
+    positions = [np.searchsorted(keys, segment_keys) for segment_keys, _ in layouts]
+    counts = np.zeros(len(keys), dtype=np.int64)
+    for (_, lengths), position in zip(layouts, positions):
+        counts[position] += lengths
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    ids = np.empty(offsets[-1], dtype=np.int32)
+    cursor = offsets[:-1].copy()
+    for segment, (_, lengths), position in zip(segments, layouts, positions):
+        _, segment_offsets, segment_ids = materialize(segment)
+        shift = cursor[position] - segment_offsets[:-1]
+        # Copied a range of keys at a time, so the scatter indexes stay small however large the segment
+        block_starts = np.searchsorted(segment_offsets, np.arange(0, len(segment_ids), _MERGE_BLOCK), side="right") - 1
+        bounds = np.append(np.unique(block_starts), len(lengths))
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            lo, hi = segment_offsets[first], segment_offsets[last]
+            ids[np.repeat(shift[first:last], lengths[first:last]) + np.arange(lo, hi)] = segment_ids[lo:hi]
+        cursor[position] += lengths
+    return keys, offsets, ids
+
+
+def _gram_postings(descriptions: pa.Array, first_id: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Trigram postings of descriptions whose ids start at ``first_id``."""
+    data, offsets = _string_buffers(_normalize_array(descriptions))
+    owners = np.repeat(np.arange(first_id, first_id + len(descriptions), dtype=np.int32), np.diff(offsets))
+    # A trigram only counts if all three bytes belong to the same description
+    within = owners[:-2] == owners[2:]
+    return _postings(_gram_codes(data)[within], owners[:-2][within])
+
+
+def _token_postings(descriptions: pa.Array, first_id: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Token postings of descriptions whose ids start at ``first_id``."""
+    parts = pc.split_pattern_regex(_normalize_array(descriptions), TOKEN_SEPARATOR)
+    words = pc.list_flatten(parts)
+    nonempty = pc.greater(pc.binary_length(words), 0)
+    words = words.filter(nonempty).dictionary_encode()
+    owners = np.asarray(pc.list_parent_indices(parts).filter(nonempty)) + first_id
+    # Tokens are ASCII, so bytes keys take a quarter of the space of str ones
+    vocabulary = np.asarray(words.dictionary.cast(pa.large_binary()).to_numpy(zero_copy_only=False), dtype=bytes)
+    order = np.argsort(vocabulary)
+    rank = np.empty(len(order), dtype=np.uint32)
+    rank[order] = np.arange(len(order), dtype=np.uint32)
+    codes, offsets, ids = _postings(rank[np.asarray(words.indices)], owners)
+    return vocabulary[order][codes], offsets, ids
+
+
+def _distinct(values: pa.Array | pa.ChunkedArray) -> pa.Array:
+    """Distinct values, found separately per group of byte lengths so each hash table stays small."""
+    groups = pc.bit_wise_and(pc.binary_length(values), _DISTINCT_GROUPS - 1)
+    return pa.concat_arrays([pc.unique(values.filter(pc.equal(groups, group))) for group in range(_DISTINCT_GROUPS)])
+
+
+def _as_string_array(descriptions) -> pa.Array | pa.ChunkedArray:
+    if not isinstance(descriptions, (pa.Array, pa.ChunkedArray)):
+        descriptions = pa.array(np.asarray(descriptions, dtype=object), from_pandas=True)
+    return descriptions.cast(pa.large_string())
+
+
+def _decode_strings(data: np.ndarray) -> list[str]:
+    """NUL-separated strings, as indexes saved before offsets were stored hold them."""
+    return data.tobytes().decode().split("\0") if len(data) else []
+
+
+class SearchIndex:
+    """Trigram and token postings over distinct descriptions, optionally persisted as a .npz file.
+
+    Query terms are matched case-insensitively and all must match:
+
+    - ``tim`` (3+ characters): substring anywhere in the description
+    - ``amzn*`` or a term shorter than 3 characters: prefix of a word
+    """
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path) if path is not None else None
+        self._descriptions = pa.array([], type=pa.large_string())
+        self._grams = (np.zeros(0, dtype=np.uint32), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32))
+        self._tokens = (np.zeros(0, dtype=bytes),) + self._grams[1:]
+
+    @classmethod
+    def load(cls, path: Path) -> "SearchIndex":
+        """Load an index saved at ``path`` (empty if it doesn't exist yet)."""
+        index = cls(path=path)
+        if not index.path.exists():
+            return index
+        with np.load(index.path) as data:
+            if "description_offsets" not in data:
+                # Saved in the earlier format (character trigrams): rebuild it once
+                legacy = _decode_strings(data["descriptions"])
+            else:
+                legacy = None
+                offsets = data["description_offsets"]
+                index._descriptions = pa.LargeStringArray.from_buffers(
+                    len(offsets) - 1, pa.py_buffer(offsets), pa.py_buffer(data["descriptions"])
+                )
+                index._grams = (data["grams"], data["gram_offsets"], data["gram_ids"])
+                index._tokens = (data["tokens"], data["token_offsets"], data["token_ids"])
+        if legacy is not None:
+            index.add(legacy)
+            index.save()
+        return index
+
+    def __len__(self) -> int:
+        return len(self._descriptions)
+
+    def add(self, descriptions) -> int:
+        """Index descriptions not seen before; returns how many were added."""
+        values = _distinct(_as_string_array(descriptions).drop_null())
+        existing = len(self._descriptions) > 0
+        if existing:
+            # Hash tables are built over the new values (usually few), not the whole index
+            known = self._descriptions.filter(pc.is_in(self._descriptions, value_set=values))
+            values = values.filter(pc.invert(pc.is_in(values, value_set=known)))
+        if not len(values):
+            return 0
+        # Batches are normalized again whenever their postings are needed rather than kept
+        batches = [
+            (values.slice(start, _BATCH_DESCRIPTIONS), len(self._descriptions) + start)
+            for start in range(0, len(values), _BATCH_DESCRIPTIONS)
+        ]
+        # New ids come after the existing ones, so merging keeps every posting list sorted
+        self._grams = _merge_postings(
+            ([self._grams] if existing else []) + [partial(_gram_postings, *batch) for batch in batches]
+        )
+        # Token postings are small enough to compute once
+        self._tokens = _merge_postings(
+            ([self._tokens] if existing else []) + [_token_postings(*batch) for batch in batches]
+        )
+        self._descriptions = pa.concat_arrays([self._descriptions, values]) if existing else values
+        return len(values)
+
+    def _posting(self, postings: tuple, key) -> np.ndarray | None:
+        keys, offsets, ids = postings
+        pos = np.searchsorted(keys, key)
+        if pos == len(keys) or keys[pos] != key:
+            return None
+        return ids[offsets[pos]:offsets[pos + 1]]
+
+    def _substring_ids(self, term: str) -> np.ndarray:
+        data = np.frombuffer(term.encode(), dtype=np.uint8)
+        postings = [self._posting(self._grams, code) for code in np.unique(_gram_codes(data))]
+        if any(posting is None for posting in postings):
+            return np.zeros(0, dtype=np.int32)
+        # Intersect from the rarest gram; the candidates then only need verifying
+        postings.sort(key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+            if not len(candidates):
+                return candidates
+        texts = _normalize_array(self._descriptions.take(pa.array(candidates)))
+        return candidates[pc.match_substring(texts, term).to_numpy(zero_copy_only=False)]
+
+    def _prefix_ids(self, prefix: str) -> np.ndarray:
+        keys, offsets, ids = self._tokens
+        if not prefix or not len(keys):
+            return np.zeros(0, dtype=np.int32)
+        # Tokens only hold [0-9a-z], so every token starting with the prefix sorts before prefix + "{"
+        lo, hi = np.searchsorted(keys, [prefix.encode(), prefix.encode() + b"{"])
+        return np.unique(ids[offsets[lo]:offsets[hi]])
+
+    def search(self, query: str) -> list[str]:
+        """Descriptions matching every term of ``query``, in no particular order."""
+        matches = None
+        for term in _normalize(query).split():
+            if term.endswith("*") or len(term) < GRAM:
+                ids = self._prefix_ids(term.rstrip("*"))
+            else:
+                ids = self._substring_ids(term)
+            matches = ids if matches is None else np.intersect1d(matches, ids, assume_unique=True)
+            if not len(matches):
+                return []
+        if matches is None:
+            return []
+        return self._descriptions.take(pa.array(np.sort(matches))).to_pylist()
+
+    def save(self, path: Path = None):
+        """Write the index to ``path`` (or the path it was loaded from)."""
+        path = Path(path) if path is not None else self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data, offsets = _string_buffers(self._descriptions)
+        with open(path, "wb") as f:
+            np.savez(
+                f, descriptions=data, description_offsets=offsets,
+                grams=self._grams[0], gram_offsets=self._grams[1], gram_ids=self._grams[2],
+                tokens=self._tokens[0], token_offsets=self._tokens[1], token_ids=self._tokens[2],
+            )
+
+
+# Loaded indexes are reused across Streamlit reruns until their account's data
+# version changes
+_INDEXES: dict[str, tuple[str, SearchIndex]] = {}
+_MAX_CACHED_INDEXES = 64
+
+
+def get_search_index(path: Path, version: str, descriptions=None) -> SearchIndex:
+    """Return the index saved at ``path``, reloading it only when ``version`` changes.
+
+    An index that doesn't exist yet is built from ``descriptions`` (a callable
+    returning them, called only then) and saved.
+    """
+    key = str(path)
+    entry = _INDEXES.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    index = SearchIndex.load(path)
+    if not Path(path).exists() and descriptions is not None:
+        # Accounts stored before search indexes existed: build it once and keep it
+        index.add(descriptions())
+        index.save()
+
+    if key not in _INDEXES and len(_INDEXES) >= _MAX_CACHED_INDEXES:
+        _INDEXES.pop(next(iter(_INDEXES)))
+    _INDEXES[key] = (version, index)
+    return index
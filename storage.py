@@ -0,0 +1,451 @@
+"""On-disk storage for classified account transactions.
+
+Accounts are stored as Parquet with native column types (datetime dates, float
+amounts, categorical categories), so loading never re-parses text. Each account
+is a directory partitioned by transaction month
+(``year=YYYY/month=MM/part-NNNNN.parquet``): a full upload rewrites every
+partition, appending a new statement adds partitions holding only the new rows,
+and reads for a date range open only the months that overlap it.
+"""
+
+import datetime
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from aggregates import build_cube, merge_cubes
+
+PARQUET_COMPRESSION = "zstd"
+
+PARTITION_GLOB = "part-*.parquet"
+# Earlier append parts of a month are merged into one file while they total less than this
+COMPACT_MAX_BYTES = 4 << 20
+MONTH_PARTITION_GLOB = f"year=*/month=*/{PARTITION_GLOB}"
+
+
+def account_data_path(uploads_dir: Path, account_key: str) -> Path:
+    """Path of the classified data directory for an account."""
+    return uploads_dir / f"{account_key}_classified"
+
+
+def _month_dir(path: Path, year: int, month: int) -> Path:
+    return path / f"year={year:04d}" / f"month={month:02d}"
+
+
+def partition_month(partition_path: Path) -> tuple[int, int] | None:
+    """(year, month) a partition file holds, or None for unpartitioned files."""
+    month_dir = partition_path.parent
+    if month_dir.name.startswith("month=") and month_dir.parent.name.startswith("year="):
+        return int(month_dir.parent.name[len("year="):]), int(month_dir.name[len("month="):])
+    return None
+
+
+def account_partitions(path: Path, start_date: datetime.date = None, end_date: datetime.date = None) -> list[Path]:
+    """Partition files of a stored account, in month order.
+
+    With ``start_date``/``end_date``, months entirely outside the range are
+    pruned. Files without a month (single-file accounts, or partitions written
+    before month partitioning) are always included.
+    """
+    path = Path(path)
+    if path.is_file():
+        return [path]
+    if not path.is_dir():
+        return []
+    partitions = sorted(path.glob(PARTITION_GLOB)) + sorted(path.glob(MONTH_PARTITION_GLOB))
+    if start_date is None and end_date is None:
+        return partitions
+
+    first = (start_date.year, start_date.month) if start_date is not None else (0, 0)
+    last = (end_date.year, end_date.month) if end_date is not None else (9999, 12)
+    return [
+        p for p in partitions
+        if (month := partition_month(p)) is None or first <= month <= last
+    ]
+
+
+def data_version(path: Path) -> str:
+    """Cheap content version of stored data (changes whenever a partition is added or rewritten)."""
+    stats = [p.stat() for p in account_partitions(path)]
+    if not stats:
+        raise FileNotFoundError(path)
+    latest = max(s.st_mtime_ns for s in stats)
+    return f"{latest}-{sum(s.st_size for s in stats)}-{len(stats)}"
+
+
+def to_storage_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast a classified frame to the storage schema."""
+    out = df.copy()
+    out["date"] = pd.to_datetime(out["date"], errors="coerce")
+    out["description"] = out["description"].astype(str)
+    for col in ("debit", "credit"):
+        if col in out.columns:
+            out[col] = pd.to_numeric(out[col], errors="coerce").fillna(0).astype("float64")
+    if "category" in out.columns:
+        out["category"] = out["category"].astype("category")
+    return out.reset_index(drop=True)
+
+
+def _next_partition_path(month_dir: Path) -> Path:
+    """Path for a new partition file in a directory, numbered after the existing ones."""
+    existing = [int(p.stem.split("-")[1]) for p in month_dir.glob(PARTITION_GLOB)]
+    return month_dir / f"part-{max(existing, default=-1) + 1:05d}.parquet"
+
+
+def _remove_empty_month_dirs(path: Path):
+    for year_dir in path.glob("year=*"):
+        for month_dir in year_dir.glob("month=*"):
+            if not any(month_dir.iterdir()):
+                month_dir.rmdir()
+        if not any(year_dir.iterdir()):
+            year_dir.rmdir()
+
+
+def _read_partitions(partitions: list) -> pa.Table:
+    """Read several partition files in one call, with their category dictionaries unified."""
+    # partitioning=None: the year=/month= directories must not become columns
+    return pq.read_table([str(p) for p in partitions], partitioning=None).unify_dictionaries()
+
+
+def _compact_month(month_dir: Path, keep: Path):
+    """Merge a month's small partitions, other than ``keep``, into its first one."""
+    parts = [p for p in sorted(month_dir.glob(PARTITION_GLOB)) if p != keep]
+    if len(parts) < 2 or sum(p.stat().st_size for p in parts) > COMPACT_MAX_BYTES:
+        return
+    table = _read_partitions(parts).combine_chunks()
+    tmp_path = parts[0].with_name(parts[0].name + ".tmp")
+    pq.write_table(table, tmp_path, compression=PARQUET_COMPRESSION)
+    os.replace(tmp_path, parts[0])
+    for part in parts[1:]:
+        part.unlink()
+
+
+class AccountDataWriter:
+    """Incrementally write classified chunks to new month partitions of an account.
+
+    Each chunk is split by transaction month and each piece becomes a row group
+    of that month's new partition, so ingest memory stays bounded by the chunk
+    size. Data goes to temporary files that become partitions only on a clean
+    close; a failed ingest never leaves a partial account behind. Without
+    ``append`` the new partitions replace all existing ones; with it, a month's
+    earlier small partitions are compacted into one file.
+    """
+
+    def __init__(self, path: Path, append: bool = False):
+        self.path = Path(path)
+        self.append = append
+        self.partition_paths = []
+        self._writers = {}
+        self._schema = None
+
+    def _month_writer(self, year: int, month: int) -> pq.ParquetWriter:
+        writer = self._writers.get((year, month))
+        if writer is None:
+            month_dir = _month_dir(self.path, year, month)
+            month_dir.mkdir(parents=True, exist_ok=True)
+            partition_path = _next_partition_path(month_dir)
+            tmp_path = partition_path.with_name(partition_path.name + ".tmp")
+            writer = pq.ParquetWriter(tmp_path, self._schema, compression=PARQUET_COMPRESSION)
+            self._writers[(year, month)] = writer
+            self.partition_paths.append(partition_path)
+        return writer
+
+    def write(self, df: pd.DataFrame):
+        frame = to_storage_frame(df)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if self._schema is None:
+            # Chunks may have few or many distinct categories; fix one index width
+            self._schema = pa.schema(
+                [
+                    pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type))
+                    if pa.types.is_dictionary(f.type) else f
+                    for f in table.schema
+                ],
+                metadata=table.schema.metadata,
+            )
+        table = table.cast(self._schema)
+        # Rows without a parseable date have no month and are dropped here
+        months = frame.groupby([frame["date"].dt.year, frame["date"].dt.month]).indices
+        for (year, month), positions in months.items():
+            self._month_writer(int(year), int(month)).write_table(table.take(positions))
+
+    def _close_writers(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+    def close(self):
+        if not self._writers:
+            return
+        self._close_writers()
+        for partition_path in self.partition_paths:
+            os.replace(partition_path.with_name(partition_path.name + ".tmp"), partition_path)
+        if self.append:
+            # The new partitions stay separate: callers read them back as "rows just appended"
+            for partition_path in self.partition_paths:
+                _compact_month(partition_path.parent, keep=partition_path)
+        else:
+            new_partitions = set(self.partition_paths)
+            for old in account_partitions(self.path):
+                if old not in new_partitions:
+                    old.unlink()
+            _remove_empty_month_dirs(self.path)
+
+    def abort(self):
+        self._close_writers()
+        for partition_path in self.partition_paths:
+            partition_path.with_name(partition_path.name + ".tmp").unlink(missing_ok=True)
+        self.partition_paths = []
+        _remove_empty_month_dirs(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_account_data(df: pd.DataFrame, path: Path):
+    """Replace an account's data with a single partition holding ``df``."""
+    with AccountDataWriter(path) as writer:
+        writer.write(df)
+
+
+def write_partition(df: pd.DataFrame, partition_path: Path):
+    """Rewrite one existing partition in place (atomically)."""
+    tmp_path = partition_path.with_name(partition_path.name + ".tmp")
+    to_storage_frame(df).to_parquet(tmp_path, index=False, compression=PARQUET_COMPRESSION)
+    os.replace(tmp_path, partition_path)
+
+
+def read_partition(partition_path: Path, columns: list = None) -> pd.DataFrame:
+    """Read a single partition file."""
+    return pd.read_parquet(partition_path, columns=columns)
+
+
+def read_account_data(path: Path, start_date: datetime.date = None, end_date: datetime.date = None) -> pd.DataFrame:
+    """Read an account's partitions into one frame.
+
+    With a date range only the overlapping months are read; rows are not
+    filtered further, so edge months come back whole.
+    """
+    partitions = account_partitions(path, start_date, end_date)
+    if not partitions and account_partitions(path):
+        # Nothing stored in range: an empty frame with the stored schema
+        return pq.read_schema(account_partitions(path)[0]).empty_table().to_pandas()
+    if len(partitions) == 1:
+        return read_partition(partitions[0])
+    if not partitions:
+        raise FileNotFoundError(path)
+    # One read for all months rather than a pandas frame per file
+    return _read_partitions(partitions).to_pandas()
+
+
+def read_partition_values(partition_paths: list, column: str) -> pa.ChunkedArray:
+    """The distinct values of one column in each partition file, as Arrow rather than a pandas frame.
+
+    Values stored in several partitions appear once per partition.
+    """
+    values = [pc.unique(pq.read_table(p, columns=[column]).column(column)) for p in partition_paths]
+    if not values:
+        return pa.chunked_array([], type=pa.null())
+    # Partitions written by different pandas versions may use string or large_string
+    return pa.chunked_array([v.cast(values[0].type) for v in values])
+
+
+def account_date_range(path: Path) -> tuple[pd.Timestamp, pd.Timestamp]:
+    """Earliest and latest transaction date stored for an account.
+
+    Only the date column of the first and last month partitions is read.
+    """
+    partitions = account_partitions(path)
+    if not partitions:
+        raise FileNotFoundError(path)
+    months = sorted({m for p in partitions if (m := partition_month(p)) is not None})
+    edge_months = {months[0], months[-1]} if months else set()
+    dates = pd.concat(
+        [read_partition(p, columns=["date"])["date"] for p in partitions if partition_month(p) in edge_months | {None}],
+        ignore_index=True,
+    ).dropna()
+    return dates.min(), dates.max()
+
+
+def remove_account_data(path: Path):
+    """Delete an account's data along with its cube, dedup and search indexes."""
+    path = Path(path)
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink(missing_ok=True)
+    account_cube_path(path).unlink(missing_ok=True)
+    account_dedup_path(path).unlink(missing_ok=True)
+    account_search_path(path).unlink(missing_ok=True)
+
+
+def _parse_legacy_dates(values: pd.Series) -> pd.Series:
+    """Parse dates from a legacy CSV.
+
+    to_csv wrote ISO dates, which day-first parsing would swap for days <= 12,
+    so ISO is tried first and only the leftovers fall back to mixed parsing.
+    """
+    dates = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    leftover = dates.isna() & values.notna()
+    if leftover.any():
+        dates[leftover] = pd.to_datetime(values[leftover], format="mixed", dayfirst=True, errors="coerce")
+    return dates
+
+
+def migrate_account_storage(config: dict) -> dict:
+    """Convert a legacy account to month-partitioned storage.
+
+    Handles ``*_classified.csv`` files, single-file ``*_classified.parquet``
+    accounts and directories of unpartitioned ``part-*.parquet`` files. Returns
+    the updated account config (unchanged if there was nothing to migrate); old
+    files are removed once the new partitions are in place.
+    """
+    old_path = Path(config["file_path"])
+    if old_path.is_dir():
+        if any(old_path.glob(PARTITION_GLOB)):
+            # Non-append writes replace every existing partition
+            write_account_data(read_account_data(old_path), old_path)
+        return config
+    if old_path.suffix not in (".csv", ".parquet") or not old_path.is_file():
+        return config
+
+    if old_path.suffix == ".csv":
+        df = pd.read_csv(old_path, dtype={"description": str})
+        df["date"] = _parse_legacy_dates(df["date"].astype(str))
+        df = df.dropna(subset=["date"])
+    else:
+        df = read_account_data(old_path)
+    data_dir = old_path.with_suffix("")
+    write_account_data(df, data_dir)
+    old_path.unlink()
+    return {**config, "file_path": str(data_dir)}
+
+
+def _dataset_stem(data_path: Path) -> str:
+    """Account key (or combined name) a data path belongs to."""
+    return data_path.name.removesuffix(".parquet").removesuffix("_classified")
+
+
+def account_cube_path(data_path: Path) -> Path:
+    """Path of the aggregate cube stored alongside an account's data."""
+    return data_path.with_name(f"{_dataset_stem(data_path)}_cube.parquet")
+
+
+def account_dedup_path(data_path: Path) -> Path:
+    """Path of the persistent transaction-hash index stored alongside an account's data."""
+    return data_path.with_name(f"{_dataset_stem(data_path)}_dedup.npy")
+
+
+def account_search_path(data_path: Path) -> Path:
+    """Path of the description search index stored alongside an account's data."""
+    return data_path.with_name(f"{_dataset_stem(data_path)}_search.npz")
+
+
+def write_account_cube(cube: pd.DataFrame, path: Path):
+    """Write an account's month x category aggregate cube."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cube.to_parquet(path, index=False, compression=PARQUET_COMPRESSION)
+
+
+def read_account_cube(path: Path) -> pd.DataFrame:
+    """Read a cube written by write_account_cube."""
+    return pd.read_parquet(path)
+
+
+# Materialized "All Accounts Combined" dataset. The name contains "-", which
+# account keys never do, so it can't collide with a real account's files.
+COMBINED_NAME = "all-accounts"
+
+
+def combined_data_path(uploads_dir: Path) -> Path:
+    """Path of the materialized combined-accounts data directory."""
+    return uploads_dir / f"{COMBINED_NAME}_classified"
+
+
+def _combined_manifest_path(data_path: Path) -> Path:
+    return data_path.with_name(f"{COMBINED_NAME}_manifest.json")
+
+
+def read_combined_manifest(data_path: Path) -> list:
+    """[key, version] pairs the combined dataset was built from ([] if unknown)."""
+    manifest_path = _combined_manifest_path(data_path)
+    if not manifest_path.exists():
+        return []
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f).get("sources", [])
+    except json.JSONDecodeError:
+        return []
+
+
+def _write_combined_manifest(sources: tuple, data_path: Path):
+    with open(_combined_manifest_path(data_path), "w") as f:
+        json.dump({"sources": [[key, version] for key, _, _, version in sources]}, f)
+
+
+def write_combined_data(sources: tuple, data_path: Path) -> None:
+    """Materialize several accounts into one dataset and one cube.
+
+    ``sources`` are (key, file_path, name, version) tuples; rows get a categorical
+    ``account`` column holding the key.
+    """
+    keys = [key for key, _, _, _ in sources]
+    frames = []
+    cubes = []
+    for key, file_path, _, _ in sources:
+        file_path = Path(file_path)
+        frames.append(read_account_data(file_path).assign(account=key))
+        cube_path = account_cube_path(file_path)
+        cube = read_account_cube(cube_path) if cube_path.exists() else build_cube(read_account_data(file_path))
+        cubes.append(cube.assign(account=key))
+
+    combined = pd.concat(frames, ignore_index=True)
+    combined["account"] = pd.Categorical(combined["account"], categories=keys)
+    write_account_data(combined, data_path)
+
+    combined_cube = pd.concat(cubes, ignore_index=True)
+    combined_cube["account"] = pd.Categorical(combined_cube["account"], categories=keys)
+    write_account_cube(combined_cube, account_cube_path(data_path))
+    _write_combined_manifest(sources, data_path)
+    # Single-file layout used before partitioning
+    data_path.with_suffix(".parquet").unlink(missing_ok=True)
+
+
+def append_combined_data(data_path: Path, account_key: str, partition_paths: list, delta_cube: pd.DataFrame, sources: tuple) -> None:
+    """Add account partitions that were just appended to the combined dataset.
+
+    The partitions are copied in as new combined partitions and their cube merged
+    in, so the combined view stays current without re-reading every account.
+    ``sources`` are the accounts' versions after the append.
+    """
+    with AccountDataWriter(data_path, append=True) as writer:
+        for partition_path in partition_paths:
+            writer.write(read_partition(partition_path).assign(account=account_key))
+
+    cube_path = account_cube_path(data_path)
+    cube = merge_cubes(read_account_cube(cube_path), delta_cube.assign(account=account_key))
+    cube["account"] = cube["account"].astype("category")
+    write_account_cube(cube, cube_path)
+    _write_combined_manifest(sources, data_path)
+
+
+def remove_combined_data(data_path: Path) -> None:
+    """Delete the combined dataset, its cube and manifest."""
+    if data_path.is_dir():
+        shutil.rmtree(data_path)
+    # Single-file layout used before partitioning
+    data_path.with_suffix(".parquet").unlink(missing_ok=True)
+    for path in (account_cube_path(data_path), _combined_manifest_path(data_path)):
+        path.unlink(missing_ok=True)
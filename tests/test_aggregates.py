@@ -0,0 +1,94 @@
+"""Tests for the month x category spending cube (aggregates.py)."""
+
+import datetime
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from aggregates import apply_category_moves, build_cube, merge_cubes, slice_cube
+
+
+def _transactions(n: int = 400, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 180, n), unit="D"),
+        "debit": np.where(rng.random(n) < 0.8, rng.integers(1, 50_000, n) / 100, 0.0),
+        "category": rng.choice(["coffee", "groceries", "rent"], n),
+    })
+
+
+def _sorted(cube: pd.DataFrame) -> pd.DataFrame:
+    keys = [c for c in ["account", "month_order", "category"] if c in cube.columns]
+    return cube.sort_values(keys).reset_index(drop=True)
+
+
+class BuildCubeTest(unittest.TestCase):
+    def test_sums_and_counts_spending_rows_per_month_and_category(self):
+        df = pd.DataFrame({
+            "date": pd.to_datetime(["2024-01-05", "2024-01-20", "2024-01-31", "2024-02-01"]),
+            "debit": [4.5, 5.5, 0.0, 100.0],
+            "category": ["coffee", "coffee", "coffee", "rent"],
+        })
+        cube = _sorted(build_cube(df))
+        self.assertEqual(cube["month_order"].tolist(), ["2024-01", "2024-02"])
+        self.assertEqual(cube["category"].tolist(), ["coffee", "rent"])
+        self.assertEqual(cube["debit_sum"].tolist(), [10.0, 100.0])
+        self.assertEqual(cube["count"].tolist(), [2, 1])
+
+    def test_account_column_becomes_a_key(self):
+        df = _transactions().assign(account=lambda d: np.where(d.index % 2, "visa", "amex"))
+        cube = build_cube(df)
+        self.assertIn("account", cube.columns)
+        self.assertEqual(cube["count"].sum(), (df["debit"] > 0).sum())
+
+    def test_float32_amounts_are_summed_in_float64(self):
+        df = _transactions()
+        compact = df.assign(debit=df["debit"].astype("float32"))
+        self.assertEqual(build_cube(compact)["debit_sum"].dtype, np.float64)
+
+
+class MergeCubesTest(unittest.TestCase):
+    def test_merged_chunks_equal_the_whole(self):
+        df = _transactions()
+        chunks = [build_cube(df.iloc[i:i + 100]) for i in range(0, len(df), 100)]
+        merged = _sorted(merge_cubes(*chunks))
+        whole = _sorted(build_cube(df))
+        pd.testing.assert_frame_equal(merged[["month_order", "category", "count"]], whole[["month_order", "category", "count"]])
+        np.testing.assert_allclose(merged["debit_sum"], whole["debit_sum"])
+
+    def test_cells_that_cancel_out_are_dropped(self):
+        cube = build_cube(_transactions())
+        negated = cube.assign(debit_sum=-cube["debit_sum"], count=-cube["count"])
+        self.assertTrue(merge_cubes(cube, negated).empty)
+
+
+class CategoryMovesTest(unittest.TestCase):
+    def test_moves_match_a_rebuild(self):
+        df = _transactions()
+        moved_rows = df.index[df["category"] == "coffee"][::2]
+        relabelled = df.copy()
+        relabelled.loc[moved_rows, "category"] = "groceries"
+
+        cube = apply_category_moves(
+            build_cube(df), df.loc[moved_rows], df.loc[moved_rows, "category"], relabelled.loc[moved_rows, "category"]
+        )
+        expected = _sorted(build_cube(relabelled))
+        cube = _sorted(cube)
+        pd.testing.assert_frame_equal(cube[["month_order", "category", "count"]], expected[["month_order", "category", "count"]])
+        np.testing.assert_allclose(cube["debit_sum"], expected["debit_sum"])
+
+
+class SliceCubeTest(unittest.TestCase):
+    def test_partial_months_are_re_aggregated_from_rows(self):
+        df = _transactions()
+        start, end = datetime.date(2024, 1, 15), datetime.date(2024, 3, 10)
+        in_range = df[(df["date"] >= pd.Timestamp(start)) & (df["date"] <= pd.Timestamp(end))]
+        sliced = _sorted(merge_cubes(slice_cube(build_cube(df), df, start, end)))
+        expected = _sorted(build_cube(in_range))
+        pd.testing.assert_frame_equal(sliced[["month_order", "category", "count"]], expected[["month_order", "category", "count"]])
+        np.testing.assert_allclose(sliced["debit_sum"], expected["debit_sum"])
+
+
+if __name__ == "__main__":
+    unittest.main()
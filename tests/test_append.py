@@ -0,0 +1,86 @@
+"""Tests for appending statements to a stored account (app.store_account_chunks)."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from aggregates import build_cube
+from dedup import DedupIndex
+from main import _import_app
+from search import SearchIndex
+from storage import account_cube_path, account_dedup_path, account_search_path, read_account_cube, read_account_data
+
+app = _import_app()
+
+CATEGORIES = {"coffee": ["TIM HORTONS"], "groceries": ["LOBLAWS"]}
+
+
+def _statement(first: int, last: int) -> pd.DataFrame:
+    """Parsed rows numbered first..last-1; equal numbers are the same transaction."""
+    n = np.arange(first, last)
+    return pd.DataFrame({
+        "date": pd.Timestamp("2024-01-01") + pd.to_timedelta(n // 4, unit="D"),
+        "description": np.where(n % 2, "TIM HORTONS #" + (n % 9).astype(str), "LOBLAWS " + n.astype(str)),
+        "debit": (n % 50 + 1).astype("float64"),
+        "credit": 0.0,
+    })
+
+
+def _rows(df: pd.DataFrame) -> list:
+    return sorted(map(tuple, df[["date", "description", "debit"]].astype(str).values))
+
+
+class AppendTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = Path(self._tmp.name) / "visa_classified"
+        app.store_account_chunks([_statement(0, 300)], self.path, CATEGORIES)
+
+    def append(self, *chunks):
+        return app.store_account_chunks(list(chunks), self.path, CATEGORIES, append=True)
+
+    def test_only_rows_not_already_stored_are_appended(self):
+        row_count, cube, partition_paths = self.append(_statement(200, 400), _statement(400, 500))
+        self.assertEqual(row_count, 200)
+        appended = pd.concat([read_account_data(p) for p in partition_paths])
+        self.assertEqual(_rows(appended), _rows(_statement(300, 500)))
+        self.assertEqual(_rows(read_account_data(self.path)), _rows(_statement(0, 500)))
+        self.assertEqual(cube["count"].sum(), 200)
+
+    def test_indexes_and_cube_cover_the_appended_rows(self):
+        self.append(_statement(200, 500))
+        stored = read_account_data(self.path)
+        self.assertEqual(len(DedupIndex.load(account_dedup_path(self.path))), 500)
+
+        cube = read_account_cube(account_cube_path(self.path))
+        expected = build_cube(stored)
+        keys = ["month_order", "category"]
+        pd.testing.assert_frame_equal(
+            cube.sort_values(keys).reset_index(drop=True), expected.sort_values(keys).reset_index(drop=True)
+        )
+        self.assertIn("LOBLAWS 498", SearchIndex.load(account_search_path(self.path)).search("loblaws 498"))
+
+    def test_appending_stored_rows_again_changes_nothing(self):
+        before = read_account_data(self.path)
+        self.assertEqual(self.append(_statement(0, 300)), (0, None, []))
+        self.assertEqual(_rows(read_account_data(self.path)), _rows(before))
+
+    def test_repeats_within_an_upload_are_kept(self):
+        repeated = _statement(300, 301)
+        row_count, _, _ = self.append(pd.concat([repeated, repeated]))
+        self.assertEqual(row_count, 2)
+        self.assertEqual(len(read_account_data(self.path)), 302)
+
+    def test_accounts_stored_before_dedup_indexes(self):
+        account_dedup_path(self.path).unlink()
+        row_count, _, _ = self.append(_statement(250, 350))
+        self.assertEqual(row_count, 50)
+        self.assertEqual(_rows(read_account_data(self.path)), _rows(_statement(0, 350)))
+
+
+if __name__ == "__main__":
+    unittest.main()
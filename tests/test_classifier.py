@@ -0,0 +1,157 @@
+"""Tests for the category rule engine (classifier.py).
+
+Run from the repository root:
+
+    python -m unittest discover tests
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from categories import CATEGORIES
+from classifier import CategoryMatcher, classify_series, diff_categories, get_matcher
+
+RULES = {
+    "coffee": ["TIM HORTONS", "STARBUCKS"],
+    "transportation": {"keywords": ["UBER* TRIP", "PRESTO"], "rules": [{"pattern": r"^PARKING\b"}]},
+    "ordering_in": {"keywords": ["UBER* EATS"], "priority": 5},
+    "bars": {"rules": [{"words": ["PUB", "BAR"]}]},
+    "rent": {"rules": [{"keywords": ["E-TRANSFER"], "min_amount": 1500, "account_types": ["td_chequing"], "priority": 10}]},
+    "big_ticket": {"rules": [{"min_amount": 1000, "max_amount": 5000, "priority": -1}]},
+}
+
+
+class PriorityTest(unittest.TestCase):
+    def test_higher_priority_wins_over_category_order(self):
+        matcher = CategoryMatcher(RULES)
+        self.assertEqual(matcher.classify("STARBUCKS UBER *EATS"), "ordering_in")
+
+    def test_equal_priorities_fall_back_to_category_order(self):
+        matcher = CategoryMatcher({"a": ["CAFE"], "b": ["CAFE"]})
+        self.assertEqual(matcher.classify("CAFE"), "a")
+        matcher = CategoryMatcher({"a": ["CAFE"], "b": {"keywords": ["CAFE"], "priority": 1}})
+        self.assertEqual(matcher.classify("CAFE"), "b")
+
+    def test_negative_priority_loses_to_keywords(self):
+        matcher = CategoryMatcher(RULES)
+        self.assertEqual(matcher.classify("TIM HORTONS", amount=2000), "coffee")
+        self.assertEqual(matcher.classify("FURNITURE STORE", amount=2000), "big_ticket")
+
+    def test_plain_keyword_lists_classify_as_before(self):
+        matcher = get_matcher(CATEGORIES)
+        self.assertEqual(matcher.classify("UBER CANADA/UBEREATS"), "ordering_in")
+        self.assertEqual(matcher.classify("UBER CANADA/UBERTRIP"), "transportation")
+        self.assertEqual(matcher.classify("ZZZ UNKNOWN"), "other")
+
+
+class PatternTest(unittest.TestCase):
+    def test_anchors_match_the_ends_of_the_merchant_id(self):
+        matcher = CategoryMatcher({"rideshare": {"rules": [{"pattern": "^UBER$"}, {"pattern": "TRIP$"}]}})
+        self.assertEqual(matcher.classify("UBER"), "rideshare")
+        self.assertEqual(matcher.classify("Uber   Trip"), "rideshare")
+        self.assertEqual(matcher.classify("UBER EATS"), "other")
+        self.assertEqual(matcher.classify("TRIPADVISOR"), "other")
+
+    def test_start_anchor(self):
+        matcher = CategoryMatcher(RULES)
+        self.assertEqual(matcher.classify("PARKING LOT 5"), "transportation")
+        self.assertEqual(matcher.classify("CITY PARKING"), "other")
+
+    def test_anchors_in_conditional_rules(self):
+        matcher = CategoryMatcher({"refunds": {"rules": [{"pattern": "REFUND$", "max_amount": 0}]}})
+        self.assertEqual(matcher.classify("AMAZON REFUND", amount=-20), "refunds")
+        self.assertEqual(matcher.classify("AMAZON REFUND", amount=20), "other")
+
+    def test_capturing_groups_and_backreferences_are_rejected(self):
+        for pattern in [r"(Z)\1", "(?P<x>A)", "(?P<x>A)(?P=x)"]:
+            with self.assertRaises(ValueError):
+                CategoryMatcher({"a": {"rules": [{"pattern": pattern}]}})
+
+    def test_same_group_name_in_two_rules_is_a_value_error(self):
+        categories = {"a": {"rules": [{"pattern": "(?P<x>A)"}]}, "b": {"rules": [{"pattern": "(?P<x>B)"}]}}
+        with self.assertRaises(ValueError):
+            CategoryMatcher(categories)
+
+    def test_non_capturing_groups_are_allowed(self):
+        matcher = CategoryMatcher({"a": {"rules": [{"pattern": "^(?:SQ|TST)\\*"}]}})
+        self.assertEqual(matcher.classify("SQ *CAFE"), "a")
+        self.assertEqual(matcher.classify("TST* DINER"), "a")
+
+    def test_malformed_rules_are_value_errors(self):
+        for rule in [{"pattern": "["}, {"pattern": "(?i)a"}, {"unknown": 1}, {"min_amount": "10"}, {"priority": 1.5}]:
+            with self.assertRaises(ValueError):
+                CategoryMatcher({"a": {"rules": [rule]}})
+
+
+class WordTest(unittest.TestCase):
+    def test_whole_words_only(self):
+        matcher = CategoryMatcher(RULES)
+        self.assertEqual(matcher.classify("THE PUB"), "bars")
+        self.assertEqual(matcher.classify("BAR ITALIA"), "bars")
+        self.assertEqual(matcher.classify("PUBLIX"), "other")
+        self.assertEqual(matcher.classify("BARBER"), "other")
+
+    def test_words_ending_in_punctuation(self):
+        matcher = CategoryMatcher({"square": {"rules": [{"words": ["SQ*"]}]}})
+        self.assertEqual(matcher.classify("SQ *CAFE"), "square")
+        self.assertEqual(matcher.classify("SQ*"), "square")
+        self.assertEqual(matcher.classify("XSQ* CAFE"), "other")
+
+    def test_trailing_space_keywords_match_the_last_word(self):
+        plain = CategoryMatcher({"beauty": ["SPA "]})
+        conditional = CategoryMatcher({"beauty": {"rules": [{"keywords": ["SPA "], "max_amount": 500}]}})
+        for matcher in (plain, conditional):
+            self.assertEqual(matcher.classify("DAY SPA", amount=50), "beauty")
+            self.assertEqual(matcher.classify("SPA CAFE", amount=50), "beauty")
+            self.assertEqual(matcher.classify("SPAR", amount=50), "other")
+
+
+class AmountAndAccountTest(unittest.TestCase):
+    def test_amount_bounds_are_inclusive(self):
+        matcher = CategoryMatcher(RULES)
+        self.assertEqual(matcher.classify("SOFA", amount=1000), "big_ticket")
+        self.assertEqual(matcher.classify("SOFA", amount=5000), "big_ticket")
+        self.assertEqual(matcher.classify("SOFA", amount=999.99), "other")
+        self.assertEqual(matcher.classify("SOFA", amount=5000.01), "other")
+
+    def test_amount_rules_need_amounts(self):
+        matcher = CategoryMatcher(RULES)
+        self.assertEqual(matcher.classify("SOFA"), "other")
+
+    def test_account_scoping(self):
+        matcher = CategoryMatcher(RULES)
+        self.assertEqual(matcher.classify("SEND E-TRANSFER", 2000, "td_chequing"), "rent")
+        self.assertEqual(matcher.classify("SEND E-TRANSFER", 2000, "amex"), "big_ticket")
+        self.assertEqual(matcher.classify("SEND E-TRANSFER", 2000), "big_ticket")
+        self.assertEqual(matcher.classify("SEND E-TRANSFER", 100, "td_chequing"), "other")
+
+    def test_series_matches_single_classification(self):
+        rows = [("STARBUCKS", 5.0), ("SEND E-TRANSFER", 2000.0), ("SEND E-TRANSFER", 100.0), ("SOFA", 1200.0), ("SOFA", np.nan), (None, 10.0)]
+        descriptions = pd.Series([d for d, _ in rows])
+        amounts = np.array([a for _, a in rows])
+        for account_type in ("td_chequing", "amex"):
+            labels = classify_series(descriptions, RULES, amounts=amounts, account_type=account_type)
+            matcher = get_matcher(RULES)
+            expected = [
+                matcher.classify(d, None if np.isnan(a) else a, account_type) if d is not None else "other"
+                for d, a in rows
+            ]
+            self.assertEqual(labels.tolist(), expected)
+
+
+class DiffTest(unittest.TestCase):
+    def test_rule_and_priority_edits_recheck_everything(self):
+        edited = dict(RULES, ordering_in={"keywords": ["UBER* EATS"], "priority": 6})
+        self.assertTrue(diff_categories(RULES, edited)[2])
+        edited = dict(RULES, bars={"rules": [{"words": ["PUB"]}]})
+        self.assertTrue(diff_categories(RULES, edited)[2])
+
+    def test_keyword_edits_stay_incremental(self):
+        edited = dict(RULES, coffee=["TIM HORTONS"])
+        self.assertEqual(diff_categories(RULES, edited), ({"STARBUCKS"}, {"coffee"}, False))
+
+
+if __name__ == "__main__":
+    unittest.main()
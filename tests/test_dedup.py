@@ -0,0 +1,74 @@
+"""Tests for hash-based transaction deduplication (dedup.py)."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dedup import DedupIndex, duplicated_hashes, transaction_hashes
+
+
+def _transactions() -> pd.DataFrame:
+    return pd.DataFrame({
+        "date": pd.to_datetime(["2024-01-01", "2024-01-01", "2024-01-02", "2024-01-01"]),
+        "description": ["TIM HORTONS", "STARBUCKS", "TIM HORTONS", "TIM HORTONS"],
+        "debit": [2.5, 5.0, 2.5, 2.5],
+        "credit": [0.0, 0.0, 0.0, 0.0],
+    })
+
+
+class TransactionHashesTest(unittest.TestCase):
+    def test_equal_rows_hash_equal(self):
+        hashes = transaction_hashes(_transactions())
+        self.assertEqual(hashes.dtype, np.uint64)
+        self.assertEqual(hashes[0], hashes[3])
+        self.assertEqual(len(set(hashes[:3].tolist())), 3)
+
+    def test_hashes_ignore_dtypes_and_index(self):
+        df = _transactions()
+        compact = df.assign(
+            date=df["date"].astype("datetime64[us]"),
+            description=df["description"].astype("category"),
+            debit=df["debit"].astype("float32"),
+        ).set_axis([10, 11, 12, 13])
+        np.testing.assert_array_equal(transaction_hashes(compact), transaction_hashes(df))
+
+    def test_empty_frame(self):
+        self.assertEqual(len(transaction_hashes(_transactions().iloc[0:0])), 0)
+
+    def test_duplicated_hashes_keeps_the_first(self):
+        self.assertEqual(duplicated_hashes(transaction_hashes(_transactions())).tolist(), [False, False, False, True])
+
+
+class DedupIndexTest(unittest.TestCase):
+    def test_contains_and_add(self):
+        index = DedupIndex(np.array([5, 1, 9], dtype=np.uint64))
+        self.assertEqual(index.contains(np.array([1, 2, 9, 10], dtype=np.uint64)).tolist(), [True, False, True, False])
+        index.add(np.array([2, 2, 10, 1], dtype=np.uint64))
+        self.assertEqual(len(index), 5)
+        self.assertTrue(index.contains(np.array([1, 2, 5, 9, 10], dtype=np.uint64)).all())
+
+    def test_empty_index_contains_nothing(self):
+        self.assertFalse(DedupIndex().contains(np.array([0, 1], dtype=np.uint64)).any())
+
+    def test_filter_new_drops_stored_and_repeated_hashes(self):
+        index = DedupIndex(np.array([1, 2], dtype=np.uint64))
+        keep = index.filter_new(np.array([2, 3, 3, 4], dtype=np.uint64))
+        self.assertEqual(keep.tolist(), [False, True, False, True])
+        self.assertEqual(len(index), 4)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "account" / "_dedup.npy"
+            index = DedupIndex(transaction_hashes(_transactions()), path=path)
+            index.save()
+            loaded = DedupIndex.load(path)
+            self.assertEqual(len(loaded), 3)
+            self.assertTrue(loaded.contains(transaction_hashes(_transactions())).all())
+            self.assertEqual(len(DedupIndex.load(Path(tmp) / "missing.npy")), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
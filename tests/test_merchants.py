@@ -0,0 +1,67 @@
+"""Tests for merchant normalization (merchants.py)."""
+
+import unittest
+
+import pandas as pd
+
+from classifier import CategoryMatcher
+from merchants import keyword_warning, merchant_id, merchant_ids, merchant_keyword
+
+
+class MerchantIdTest(unittest.TestCase):
+    def test_store_numbers_are_dropped(self):
+        self.assertEqual(merchant_id("TIM HORTONS #1234"), "TIM HORTONS")
+        self.assertEqual(merchant_id("Shoppers # 12 Toronto"), "SHOPPERS TORONTO")
+
+    def test_processor_separators_are_spaced_one_way(self):
+        for description in ["SQ *CAFE", "SQ*CAFE", "sq * cafe"]:
+            self.assertEqual(merchant_id(description), "SQ* CAFE")
+
+    def test_padding_is_collapsed(self):
+        self.assertEqual(merchant_id("  FN               MTG  "), "FN MTG")
+
+    def test_aliases_fold_whole_spellings(self):
+        self.assertEqual(merchant_id("UBER CANADA/UBEREATS"), "UBER* EATS")
+        self.assertEqual(merchant_id("Uber Canada/UberTrip"), "UBER* TRIP")
+        self.assertEqual(merchant_id("UBER CANADA/UBERCASH"), "UBER CANADA/UBERCASH")
+
+    def test_series_keeps_missing_descriptions_missing(self):
+        ids = merchant_ids(pd.Series(["TIM HORTONS #1", None, "Tim Hortons #2", "SQ *CAFE"], index=[5, 6, 7, 8]))
+        self.assertEqual(ids.index.tolist(), [5, 6, 7, 8])
+        self.assertEqual(ids.astype(object).where(ids.notna(), None).tolist(), ["TIM HORTONS", None, "TIM HORTONS", "SQ* CAFE"])
+        self.assertEqual(list(ids.cat.categories), ["TIM HORTONS", "SQ* CAFE"])
+
+
+class MerchantKeywordTest(unittest.TestCase):
+    def test_keywords_follow_the_rules_but_not_aliases(self):
+        self.assertEqual(merchant_keyword("sq *"), "SQ* ")
+        self.assertEqual(merchant_keyword("FN     MTG"), "FN MTG")
+        self.assertEqual(merchant_keyword("UBEREATS"), "UBEREATS")
+
+    def test_keywords_match_what_they_matched_in_raw_descriptions(self):
+        matcher = CategoryMatcher({"eating_out": ["TST*"], "banking": ["FN   MTG"]})
+        self.assertEqual(matcher.classify("TST* DINER"), "eating_out")
+        self.assertEqual(matcher.classify("TST*DINER #4"), "eating_out")
+        self.assertEqual(matcher.classify("FN               MTG"), "banking")
+
+    def test_store_numbers_in_keywords_match_every_store(self):
+        matcher = CategoryMatcher({"shopping": ["STORE #12"]})
+        self.assertEqual(matcher.classify("STORE #12"), "shopping")
+        self.assertEqual(matcher.classify("STORE #99"), "shopping")
+
+
+class KeywordWarningTest(unittest.TestCase):
+    def test_keywords_that_match_as_written(self):
+        for keyword in ["TIM HORTONS", "SQ *CAFE", "FN     MTG", "SPA ", "UBER", "uber* eats"]:
+            self.assertIsNone(keyword_warning(keyword), keyword)
+
+    def test_dropped_store_numbers(self):
+        self.assertIn('"STORE"', keyword_warning("STORE #12"))
+
+    def test_keywords_only_in_aliased_spellings(self):
+        self.assertIn("UBER* EATS", keyword_warning("UBER CANADA/UBEREATS"))
+        self.assertIsNotNone(keyword_warning("UBER CANADA"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""Tests for incremental re-classification (classifier.rows_affected_by_edit)."""
+
+import unittest
+
+import pandas as pd
+
+from classifier import classify_series, rows_affected_by_edit
+
+CATEGORIES = {
+    "coffee": ["TIM HORTONS", "STARBUCKS"],
+    "transportation": ["UBER* TRIP", "PRESTO"],
+    "groceries": ["LOBLAWS", "METRO"],
+}
+
+DESCRIPTIONS = pd.Series([
+    "TIM HORTONS #1234",
+    "STARBUCKS",
+    "UBER *TRIP",
+    "LOBLAWS",
+    "BALZACS COFFEE",
+    "METRO",
+    None,
+])
+
+
+def _labels(categories: dict) -> pd.Series:
+    return classify_series(DESCRIPTIONS, categories)
+
+
+class RowsAffectedTest(unittest.TestCase):
+    def assertNoMissedRows(self, old: dict, new: dict):
+        """Every row whose label changes between ``old`` and ``new`` is in the mask."""
+        mask = rows_affected_by_edit(DESCRIPTIONS, _labels(old), old, new)
+        moved = _labels(old) != _labels(new)
+        self.assertFalse((moved & ~mask).any())
+        return mask
+
+    def test_unchanged_categories_affect_nothing(self):
+        mask = self.assertNoMissedRows(CATEGORIES, dict(CATEGORIES))
+        self.assertFalse(mask.any())
+
+    def test_added_keyword_marks_rows_containing_it_and_the_edited_category(self):
+        edited = dict(CATEGORIES, coffee=["TIM HORTONS", "STARBUCKS", "BALZACS"])
+        mask = self.assertNoMissedRows(CATEGORIES, edited)
+        self.assertEqual(mask.tolist(), [True, True, False, False, True, False, False])
+
+    def test_removed_keyword_marks_rows_tagged_with_the_edited_category(self):
+        edited = dict(CATEGORIES, groceries=["LOBLAWS"])
+        mask = self.assertNoMissedRows(CATEGORIES, edited)
+        self.assertTrue(mask[5])
+        self.assertFalse(mask[[0, 1, 2, 4, 6]].any())
+
+    def test_keywords_are_matched_on_merchant_ids(self):
+        edited = dict(CATEGORIES, transportation=["PRESTO"])
+        mask = self.assertNoMissedRows(CATEGORIES, edited)
+        self.assertTrue(mask[2])
+
+    def test_reordering_categories_marks_everything(self):
+        reordered = dict(reversed(list(CATEGORIES.items())))
+        self.assertTrue(rows_affected_by_edit(DESCRIPTIONS, _labels(CATEGORIES), CATEGORIES, reordered).all())
+
+    def test_rule_edits_mark_everything(self):
+        edited = dict(CATEGORIES, coffee={"keywords": ["TIM HORTONS", "STARBUCKS"], "priority": 1})
+        self.assertTrue(rows_affected_by_edit(DESCRIPTIONS, _labels(CATEGORIES), CATEGORIES, edited).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""Tests for the description search index (search.py)."""
+
+import re
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+import search
+from search import GRAM, TOKEN_SEPARATOR, SearchIndex, get_search_index
+
+DESCRIPTIONS = [
+    "TIM HORTONS #1234",
+    "Tim  Hortons #88",
+    "UBER CANADA/UBERTRIP",
+    "UBER* EATS",
+    "SQ *CAFÉ CRÈME",
+    "LOBLAWS 1021",
+    "AMZN Mktp CA*2K4",
+    " PRESTO\tFARE ",
+]
+
+
+def _expected(descriptions: list, query: str) -> list:
+    """Brute-force search: every term a substring, or a non-empty token prefix when it ends in * or is short."""
+    matches = []
+    for description in dict.fromkeys(descriptions):
+        text = " ".join(description.lower().split())
+        tokens = [t for t in re.split(TOKEN_SEPARATOR, text) if t]
+        terms = " ".join(query.lower().split()).split()
+        if terms and all(
+            any(t.startswith(term.rstrip("*")) for t in tokens) and term.rstrip("*")
+            if term.endswith("*") or len(term) < GRAM else term in text
+            for term in terms
+        ):
+            matches.append(description)
+    return matches
+
+
+def _random_descriptions(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    words = ["tim", "hortons", "uber", "eats", "trip", "café", "crème", "loblaws", "amzn", "mktp", "#12", "*", "sq", "presto"]
+    return [" ".join(rng.choice(words, rng.integers(1, 5))).upper() for _ in range(n)]
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.add(DESCRIPTIONS)
+
+    def test_substring_queries_ignore_case_and_spacing(self):
+        self.assertEqual(sorted(self.index.search("tim hortons")), ["TIM HORTONS #1234", "Tim  Hortons #88"])
+        self.assertEqual(self.index.search("HORTONS   #88"), ["Tim  Hortons #88"])
+        self.assertEqual(self.index.search("rtrip"), ["UBER CANADA/UBERTRIP"])
+        self.assertEqual(self.index.search("presto fare"), [" PRESTO\tFARE "])
+
+    def test_prefix_queries(self):
+        self.assertEqual(sorted(self.index.search("ub*")), ["UBER CANADA/UBERTRIP", "UBER* EATS"])
+        self.assertEqual(sorted(self.index.search("ub")), ["UBER CANADA/UBERTRIP", "UBER* EATS"])
+        self.assertEqual(self.index.search("amzn ca*"), ["AMZN Mktp CA*2K4"])
+
+    def test_non_ascii_text(self):
+        # Tokens are ASCII letters and digits, so "CRÈME" is the tokens "cr" and "me"
+        self.assertEqual(self.index.search("café cr*"), ["SQ *CAFÉ CRÈME"])
+        self.assertEqual(self.index.search("crè*"), [])
+        self.assertEqual(self.index.search("afé"), ["SQ *CAFÉ CRÈME"])
+
+    def test_no_matches(self):
+        self.assertEqual(self.index.search("zzzq"), [])
+        self.assertEqual(self.index.search("tim eats"), [])
+        self.assertEqual(self.index.search("   "), [])
+        self.assertEqual(self.index.search("*"), [])
+        self.assertEqual(SearchIndex().search("tim"), [])
+
+    def test_adding_only_indexes_new_descriptions(self):
+        self.assertEqual(len(self.index), len(DESCRIPTIONS))
+        self.assertEqual(self.index.add(["UBER* EATS", "DOORDASH", "DOORDASH", None]), 1)
+        self.assertEqual(self.index.search("door"), ["DOORDASH"])
+
+    def test_matches_brute_force_search_across_batches(self):
+        descriptions = _random_descriptions(500)
+        index = SearchIndex()
+        with mock.patch.object(search, "_BATCH_DESCRIPTIONS", 37), mock.patch.object(search, "_MERGE_BLOCK", 64):
+            index.add(descriptions[:300])
+            index.add(descriptions[200:])
+        for query in ["tim", "hortons eats", "ca*", "é c", "#12", "sq *", "uber trip", "x"]:
+            self.assertEqual(sorted(index.search(query)), sorted(_expected(descriptions, query)), query)
+
+
+class PersistenceTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = Path(self._tmp.name) / "visa_search.npz"
+
+    def test_save_and_load(self):
+        index = SearchIndex(path=self.path)
+        index.add(DESCRIPTIONS)
+        index.save()
+        loaded = SearchIndex.load(self.path)
+        self.assertEqual(len(loaded), len(DESCRIPTIONS))
+        for query in ["tim hortons", "ub*", "café", "zzzq"]:
+            self.assertEqual(loaded.search(query), index.search(query))
+        loaded.add(["DOORDASH"])
+        self.assertEqual(loaded.search("doordash"), ["DOORDASH"])
+
+    def test_missing_file_loads_empty(self):
+        self.assertEqual(len(SearchIndex.load(self.path)), 0)
+
+    def test_cached_index_reloads_when_the_version_changes(self):
+        built = get_search_index(self.path, "v1", lambda: DESCRIPTIONS[:2])
+        self.assertTrue(self.path.exists())
+        self.assertIs(get_search_index(self.path, "v1"), built)
+
+        index = SearchIndex.load(self.path)
+        index.add(["DOORDASH"])
+        index.save()
+        self.assertEqual(get_search_index(self.path, "v1").search("doordash"), [])
+        self.assertEqual(get_search_index(self.path, "v2").search("doordash"), ["DOORDASH"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+"""Tests for month-partitioned account storage (storage.py)."""
+
+import datetime
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from storage import (
+    AccountDataWriter,
+    account_date_range,
+    account_partitions,
+    migrate_account_storage,
+    partition_month,
+    read_account_data,
+    write_account_data,
+)
+
+
+def _transactions(start: str, days: int, tag: str = "") -> pd.DataFrame:
+    dates = pd.date_range(start, periods=days, freq="D")
+    return pd.DataFrame({
+        "date": dates,
+        "description": [f"MERCHANT {tag}{i % 7}" for i in range(days)],
+        "debit": np.arange(days, dtype="float64"),
+        "credit": 0.0,
+        "category": ["coffee", "groceries", f"other{tag}"] * (days // 3) + ["coffee"] * (days % 3),
+    })
+
+
+def _rows(df: pd.DataFrame) -> list:
+    return sorted(map(tuple, df[["date", "description", "debit", "category"]].astype(str).values))
+
+
+class StorageTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = Path(self._tmp.name) / "visa_classified"
+
+
+class WriterTest(StorageTestCase):
+    def test_rows_are_split_into_month_partitions(self):
+        df = _transactions("2024-01-20", 45)
+        write_account_data(df, self.path)
+        months = [partition_month(p) for p in account_partitions(self.path)]
+        self.assertEqual(months, [(2024, 1), (2024, 2), (2024, 3)])
+        stored = read_account_data(self.path)
+        self.assertEqual(_rows(stored), _rows(df))
+        self.assertIsInstance(stored["category"].dtype, pd.CategoricalDtype)
+        self.assertNotIn("year", stored.columns)
+
+    def test_date_range_prunes_whole_months(self):
+        write_account_data(_transactions("2024-01-20", 45), self.path)
+        stored = read_account_data(self.path, datetime.date(2024, 2, 10), datetime.date(2024, 2, 20))
+        self.assertEqual(set(stored["date"].dt.month), {2})
+        self.assertEqual(len(stored), 29)
+        empty = read_account_data(self.path, datetime.date(2025, 1, 1), datetime.date(2025, 2, 1))
+        self.assertTrue(empty.empty)
+        self.assertIn("description", empty.columns)
+
+    def test_date_range_of_stored_data(self):
+        write_account_data(_transactions("2024-01-20", 45), self.path)
+        first, last = account_date_range(self.path)
+        self.assertEqual((first, last), (pd.Timestamp("2024-01-20"), pd.Timestamp("2024-03-04")))
+
+    def test_rewrite_replaces_every_partition(self):
+        write_account_data(_transactions("2024-01-20", 45), self.path)
+        write_account_data(_transactions("2024-06-01", 10), self.path)
+        self.assertEqual({partition_month(p) for p in account_partitions(self.path)}, {(2024, 6)})
+        self.assertFalse((self.path / "year=2024" / "month=01").exists())
+
+    def test_failed_write_leaves_stored_data_untouched(self):
+        df = _transactions("2024-01-20", 45)
+        write_account_data(df, self.path)
+        with self.assertRaises(RuntimeError):
+            with AccountDataWriter(self.path) as writer:
+                writer.write(_transactions("2024-06-01", 10))
+                raise RuntimeError("parse error")
+        self.assertEqual(_rows(read_account_data(self.path)), _rows(df))
+        self.assertEqual(list(self.path.rglob("*.tmp")), [])
+
+
+class AppendTest(StorageTestCase):
+    def test_appends_add_new_partitions(self):
+        first, second = _transactions("2024-01-20", 20), _transactions("2024-02-05", 10, tag="B")
+        write_account_data(first, self.path)
+        with AccountDataWriter(self.path, append=True) as writer:
+            writer.write(second)
+        self.assertEqual(_rows(pd.concat([read_account_data(p) for p in writer.partition_paths])), _rows(second))
+        self.assertEqual(_rows(read_account_data(self.path)), _rows(pd.concat([first, second])))
+
+    def test_repeated_appends_compact_earlier_parts(self):
+        frames = [_transactions("2024-01-01", 10)]
+        write_account_data(frames[0], self.path)
+        for i in range(1, 6):
+            frames.append(_transactions(f"2024-01-{1 + 2 * i:02d}", 10, tag=str(i)))
+            with AccountDataWriter(self.path, append=True) as writer:
+                writer.write(frames[-1])
+            # The partitions just written stay separate from the compacted ones
+            self.assertEqual(_rows(read_account_data(writer.partition_paths[0])), _rows(frames[-1]))
+
+        january = [p for p in account_partitions(self.path) if partition_month(p) == (2024, 1)]
+        self.assertEqual(len(january), 2)
+        self.assertEqual(_rows(read_account_data(self.path)), _rows(pd.concat(frames)))
+
+
+class MigrationTest(StorageTestCase):
+    def test_legacy_csv_becomes_month_partitions(self):
+        df = _transactions("2024-01-10", 40)
+        csv_path = self.path.with_suffix(".csv")
+        df.assign(date=df["date"].dt.strftime("%Y-%m-%d")).to_csv(csv_path, index=False)
+
+        config = migrate_account_storage({"name": "Visa", "file_path": str(csv_path)})
+        self.assertEqual(Path(config["file_path"]), self.path)
+        self.assertFalse(csv_path.exists())
+        self.assertEqual(_rows(read_account_data(self.path)), _rows(df))
+        self.assertEqual({partition_month(p) for p in account_partitions(self.path)}, {(2024, 1), (2024, 2)})
+
+    def test_single_parquet_file_and_unpartitioned_directory(self):
+        df = _transactions("2024-01-10", 40)
+        parquet_path = self.path.with_suffix(".parquet")
+        df.to_parquet(parquet_path, index=False)
+        config = migrate_account_storage({"name": "Visa", "file_path": str(parquet_path)})
+        self.assertEqual(Path(config["file_path"]), self.path)
+        self.assertFalse(parquet_path.exists())
+
+        legacy_dir = Path(self._tmp.name) / "amex_classified"
+        legacy_dir.mkdir()
+        df.to_parquet(legacy_dir / "part-00000.parquet", index=False)
+        config = {"name": "Amex", "file_path": str(legacy_dir)}
+        self.assertEqual(migrate_account_storage(config), config)
+        self.assertEqual(list(legacy_dir.glob("part-*.parquet")), [])
+        self.assertEqual(_rows(read_account_data(legacy_dir)), _rows(df))
+
+    def test_partitioned_accounts_are_left_alone(self):
+        write_account_data(_transactions("2024-01-10", 40), self.path)
+        before = account_partitions(self.path)
+        config = {"name": "Visa", "file_path": str(self.path)}
+        self.assertEqual(migrate_account_storage(config), config)
+        self.assertEqual(account_partitions(self.path), before)
+
+
+if __name__ == "__main__":
+    unittest.main()